@@ -1,7 +1,11 @@
 __author__ = 'rainsbp'
 
+import math
 import time
 import os
+import json
+import functools
+import threading
 from os.path import expanduser
 
 import adsk.core
@@ -25,8 +29,9 @@ def variable_message(variables):
 
 
 # Performance time logging function
+# Uses wall time so time spent waiting on the Fusion kernel is included, see Profiler for structured timing
 def perf_log(log, function_reference, command, identifier=''):
-    log.append((function_reference, command, identifier, time.process_time()))
+    log.append((function_reference, command, identifier, time.perf_counter()))
 
 
 def perf_message(log):
@@ -59,7 +64,7 @@ def perf_message(log):
 
 
 # Creates directory and returns file name for log file
-def get_log_file_name():
+def get_log_file_name(log_type='PerfLog', extension='.csv'):
 
     # Get Home directory
     home = expanduser("~")
@@ -72,6 +77,171 @@ def get_log_file_name():
     time_stamp = time.strftime("%Y-%m-%d-%H-%M-%S", time.gmtime())
 
     # Create file name in this path
-    log_file_name = home + 'FusionDebugUtilities-PerfLog-' + time_stamp + '.csv'
+    log_file_name = home + 'FusionDebugUtilities-' + log_type + '-' + time_stamp + extension
     return log_file_name
 
+
+class Profiler:
+    """
+    Collects nested timing spans with wall and cpu time
+    Spans are aggregated per name and can be exported as Chrome trace events (chrome://tracing or Perfetto).
+    """
+    def __init__(self):
+        self.enabled = True
+        self.spans = []
+        self.counters = {}
+        self._depth = 0
+        self._origin = time.perf_counter()
+
+    def reset(self):
+        self.spans = []
+        self.counters = {}
+        self._depth = 0
+        self._origin = time.perf_counter()
+
+    def span(self, name, **args):
+        """
+        Context manager timing the enclosed block
+        :param name: Call site name used for aggregation
+        :param args: Extra values stored with the span and shown in the trace
+        """
+        return _Span(self, name, args)
+
+    def profile(self, name=None):
+        """
+        Decorator timing every call of a function, the name defaults to the function name
+        """
+        def decorator(function):
+            span_name = name or function.__name__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def count(self, name, value=1):
+        """
+        Adds to a named counter reported with the summary
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """
+        Sets a named counter reported with the summary, for values that describe a state rather than add up
+        """
+        self.counters[name] = value
+
+    def summary(self):
+        """
+        Aggregates spans per name
+        :return: Dictionary of name to count, total, cpu, p50 and p95 in seconds, slowest total first
+        :rtype: dict
+        """
+        durations = {}
+        cpu_times = {}
+
+        for span in self.spans:
+            durations.setdefault(span['name'], []).append(span['wall'])
+            cpu_times[span['name']] = cpu_times.get(span['name'], 0.0) + span['cpu']
+
+        results = {}
+        for name, values in durations.items():
+            values.sort()
+            results[name] = {
+                'count': len(values),
+                'total': sum(values),
+                'cpu': cpu_times[name],
+                'p50': _percentile(values, 50),
+                'p95': _percentile(values, 95)
+            }
+
+        return dict(sorted(results.items(), key=lambda item: -item[1]['total']))
+
+    def summary_message(self):
+        message_string = ''
+        for name, stats in self.summary().items():
+            message_string += '%s: n=%d total=%0.3f cpu=%0.3f p50=%0.4f p95=%0.4f\n' % (
+                name, stats['count'], stats['total'], stats['cpu'], stats['p50'], stats['p95'])
+
+        for name, value in self.counters.items():
+            message_string += name + ' = ' + str(value) + '\n'
+
+        return message_string
+
+    def write_chrome_trace(self, file_name=None):
+        """
+        Writes all spans as Chrome trace event JSON
+        :param file_name: Full path of the trace, a time stamped file in the debug log folder if None
+        :return: The file name written
+        :rtype: str
+        """
+        if file_name is None:
+            file_name = get_log_file_name('Trace', '.json')
+
+        process_id = os.getpid()
+        events = []
+
+        for span in self.spans:
+            args = dict(span['args'])
+            args['cpu_ms'] = span['cpu'] * 1000
+            events.append({'name': span['name'], 'ph': 'X', 'ts': span['start'] * 1e6, 'dur': span['wall'] * 1e6,
+                           'pid': process_id, 'tid': span['thread'], 'args': args})
+
+        for name, value in self.counters.items():
+            events.append({'name': name, 'ph': 'C', 'ts': 0, 'pid': process_id, 'args': {name: value}})
+
+        with open(file_name, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file, default=str)
+
+        return file_name
+
+
+class _Span:
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self.profiler._depth += 1
+            self.wall_start = time.perf_counter()
+            self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if self.profiler.enabled:
+            wall = time.perf_counter() - self.wall_start
+            cpu = time.process_time() - self.cpu_start
+            self.profiler._depth -= 1
+            self.profiler.spans.append({'name': self.name, 'start': self.wall_start - self.profiler._origin,
+                                        'wall': wall, 'cpu': cpu, 'depth': self.profiler._depth,
+                                        'thread': threading.get_ident(), 'args': self.args})
+        return False
+
+
+# Nearest rank percentile of sorted values
+def _percentile(sorted_values, percent):
+    if len(sorted_values) == 0:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+# Shared profiler used by profile_span and profiled
+PROFILER = Profiler()
+
+
+# Context manager timing a block with the shared profiler
+def profile_span(name, **args):
+    return PROFILER.span(name, **args)
+
+
+# Decorator timing a function with the shared profiler
+def profiled(name=None):
+    return PROFILER.profile(name)
+
@@ -226,4 +226,25 @@ def combine_feature(target_body, tool_bodies, operation):
     # Create Combine Feature
     combine_input = combine_features.createInput(target_body, combine_tools)
     combine_input.operation = operation
-    combine_features.add(combine_input)
\ No newline at end of file
+    combine_features.add(combine_input)
+
+
+def get_mesh_data(body, surface_tolerance=None):
+    """
+    Calculates a triangle mesh of a body
+    :param body: The body to tessellate
+    :type body: adsk.fusion.BRepBody
+    :param surface_tolerance: Maximum distance between the mesh and the surface. Normal quality if None.
+    :type surface_tolerance: float
+    :return: Flat list of node coordinates and flat list of node indices, three per triangle
+    :rtype: tuple
+    """
+    mesh_calculator = body.meshManager.createMeshCalculator()
+
+    if surface_tolerance is None:
+        mesh_calculator.setQuality(adsk.fusion.TriangleMeshQualityOptions.NormalQualityTriangleMesh)
+    else:
+        mesh_calculator.surfaceTolerance = surface_tolerance
+
+    mesh = mesh_calculator.calculate()
+    return mesh.nodeCoordinatesAsDouble, mesh.nodeIndices
@@ -1,6 +1,14 @@
 # Author-Patrick Rainsberry
 # Description-Simplified Slicer for Fusion 360
 
+import os
+import sys
+
+# Optional packages such as numpy can be installed to the lib folder of the add-in
+lib_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'lib')
+if os.path.isdir(lib_path) and lib_path not in sys.path:
+    sys.path.insert(0, lib_path)
+
 # Importing sample Fusion Command
 # Could import multiple Command definitions here
 from .FusionSlicerLTCommand import FusionSlicerLTCommand, FusionSlicerLTCommand2
@@ -22,13 +30,12 @@ command_definitions.append(cmd)
 
 # Define parameters for 1st command
 cmd = {
-    'cmd_name': 'Fusion Slicer LT 2',
-    'cmd_description': 'Simplified Fusion Slicing App',
+    'cmd_name': 'Fusion Slicer LT Lay Flat',
+    'cmd_description': 'Lays the slices of the last Fusion Slicer LT run flat on the stock sheet',
     'cmd_id': 'cmdID_slicer_lt2',
     'cmd_resources': './resources',
     'workspace': 'FusionSolidEnvironment',
     'toolbar_panel_id': 'SolidScriptsAddinsPanel',
-    'command_visible': False,
     'class': FusionSlicerLTCommand2
 }
 command_definitions.append(cmd)
@@ -1,6 +1,9 @@
 import adsk
 import adsk.core
 import adsk.fusion
+import json
+import math
+import os
 import traceback
 
 from collections import defaultdict, namedtuple
@@ -9,13 +12,96 @@ from typing import List
 from .Fusion360Utilities.Fusion360Utilities import get_app_objects
 from .Fusion360Utilities.Fusion360CommandBase import Fusion360CommandBase
 from .Fusion360Utilities import Fusion360Utilities as futil
+from .Fusion360Utilities.Fusion360DebugUtilities import PROFILER, profiled, profile_span
+
+# The headless slicing kernel needs numpy, without it every profile is classified by the modeling kernel
+try:
+    from .SlicerCore import MeshSection
+    from .SlicerCore import SectionPool
+    from .SlicerCore import SlotPlanner
+    from .SlicerCore import SliceManifest
+    from .SlicerCore import SectionCache
+    from .SlicerCore import Nesting
+    from .SlicerCore import CutFiles
+    from .SlicerCore import Toolpath
+    from .SlicerCore import SliceStore
+    from .SlicerCore import SliceSpacing
+    from .SlicerCore import SliceFamilies
+    from .SlicerCore import StackedLayers
+    from .SlicerCore import SpatialIndex
+    from .SlicerCore import Containment
+    from .SlicerCore import MeshCache
+except ImportError:
+    MeshSection = None
+    SectionPool = None
+    SlotPlanner = None
+    SliceManifest = None
+    SectionCache = None
+    Nesting = None
+    CutFiles = None
+    Toolpath = None
+    SliceStore = None
+    SliceSpacing = None
+    SliceFamilies = None
+    StackedLayers = None
+    SpatialIndex = None
+    Containment = None
+    MeshCache = None
 
 Post = namedtuple('Post', ('top_point', 'bottom_point', 'line', 'length'))
 
-Post_Point = namedtuple('Post_Point', ('point', 'body', 'sketch_face', 'line', 'length'))
+# up, across and width place the slot of a post, posts without them are vertical and cut across the given direction
+Post_Point = namedtuple('Post_Point', ('point', 'body', 'sketch_face', 'line', 'length', 'up', 'across', 'width'),
+                        defaults=(None, None, None))
 
-SliceFace = namedtuple('SliceFace', ('face', 'body'))
-SliceComponent = namedtuple('SliceComponent', ('occurrence', 'end_face'))
+SliceFace = namedtuple('SliceFace', ('face', 'body', 'slice_index'), defaults=(None,))
+SliceComponent = namedtuple('SliceComponent', ('occurrence', 'end_face', 'slice_index'), defaults=(None,))
+PlaneSection = namedtuple('PlaneSection', ('normal', 'offset', 'regions'))
+
+# Construction axis radial slices turn about, the plane their angles start from and the (x, y, z) point the axis
+# passes through
+RadialAxis = namedtuple('RadialAxis', ('axis', 'reference_plane', 'center_plane', 'center'))
+
+# How slice features are built, taken from the Defer Compute and Fast Slices inputs and kept on the SlicerDef
+# compute_deferred solves the three sketches of a slice together and needs no timeline roll, see create_slice
+# fast builds the slice in memory with the temporary B-Rep manager and adds it without sketches, see create_slice_fast
+SliceMode = namedtuple('SliceMode', ('compute_deferred', 'fast'), defaults=(False, False))
+
+# Surface tolerances in cm of the coarse, medium and fine tessellations stages share, see get_cached_mesh
+COARSE_TOLERANCE = .05
+MEDIUM_TOLERANCE = .01
+FINE_TOLERANCE = .002
+
+# Surface tolerance of the mesh used to section slices and classify their profiles
+MESH_TOLERANCE = MEDIUM_TOLERANCE
+
+# Surface tolerance of the mesh used for the live preview and adaptive spacing
+PREVIEW_TOLERANCE = COARSE_TOLERANCE
+
+# Chord tolerance in cm of the profile curve strokes a containment sample point is taken from, see get_profile_point
+PROFILE_STROKE_TOLERANCE = MEDIUM_TOLERANCE
+
+# Tessellations of the most recently used bodies at every tolerance asked for, see get_cached_mesh
+MESH_CACHE = MeshCache.TessellationCache() if MeshCache is not None else None
+
+# On-disk cache of section regions, created on first use by get_section_cache
+SECTION_CACHE = None
+
+# Gap in cm between nested sheets
+SHEET_SPACING = 5.0
+
+# Depth in cm the router cuts below the stock sheet so parts separate cleanly
+CUT_OVERCUT = .02
+
+# Offset difference in cm below which a base plane of the last run is left where it is, see get_offset_plane
+PLANE_TOLERANCE = 1e-6
+
+# Design attribute holding the slice manifest of the last run
+ATTRIBUTE_GROUP = 'FusionSlicerLT'
+MANIFEST_ATTRIBUTE = 'manifest'
+
+# Design attribute holding the state of the last run, read by the lay flat command
+SLICER_DEF_ATTRIBUTE = 'slicer_def'
 
 
 # Should move to utilities
@@ -30,14 +116,150 @@ def add_construction_sketch(sketches, plane):
 
 SLICERDEF = None
 
+# Custom graphics of the last preview
+PREVIEW_GRAPHICS = None
+
 
 # TODO Master list
 # Identify which module each piece is in after dove tails.
 # Show identification? Sketch on the model once its flat.
 # For Dove Tails model flush "body split"
 
+# Changes whenever a body is modified, without revisionId the volume and bounding box stand in for it
+def get_body_revision(body):
+    try:
+        return body.revisionId
+    except AttributeError:
+        bounding_box = body.boundingBox
+        return [body.volume] + list(bounding_box.minPoint.asArray()) + list(bounding_box.maxPoint.asArray())
+
+
+# Returns the welded mesh of a body, tessellating it only the first time for each tolerance
+# The arrays are shared read only, a modified body is tessellated again
+def get_cached_mesh(body, tolerance):
+    def tessellate(surface_tolerance):
+        PROFILER.count('tessellations')
+        return futil.get_mesh_data(body, surface_tolerance)
+
+    return MESH_CACHE.mesh(body.entityToken, get_body_revision(body), tolerance, tessellate)
+
+
+# Occupancy grid of a body from its cached mesh, answers point containment away from the surface without the kernel
+def get_containment_grid(body, tolerance=MESH_TOLERANCE):
+    def build():
+        with profile_span('containment_grid', tolerance=tolerance):
+            return Containment.ContainmentGrid(*get_cached_mesh(body, tolerance), tolerance)
+
+    return MESH_CACHE.derived(body.entityToken, get_body_revision(body), 'containment-' + str(tolerance), build)
+
+
+# Returns the mid plane positions of evenly spaced slices between two bounding box values
+def get_slice_offsets(min_value, max_value, qty):
+    spacing = (max_value - min_value) / (qty + 1)
+    return [min_value + i * spacing for i in range(1, qty + 1)]
+
+
+# Mid plane positions of slices placed where the section of the coarse mesh changes most, see SliceSpacing
+def get_adaptive_offsets(target_body, normal, min_value, max_value, qty, slice_thickness):
+    vertices, faces = get_cached_mesh(target_body, PREVIEW_TOLERANCE)
+    return SliceSpacing.adaptive_offsets(vertices, faces, normal, min_value, max_value, qty, slice_thickness).tolist()
+
+
+# Switches a SlicerDef to adaptive spacing, the slice budget of each direction stays the same
+@profiled()
+def adapt_slice_spacing(slicer_def):
+    bounding_box = slicer_def.target_body.boundingBox
+    min_point = bounding_box.minPoint
+    max_point = bounding_box.maxPoint
+
+    x_offsets = get_adaptive_offsets(slicer_def.target_body, (1, 0, 0), min_point.x, max_point.x, slicer_def.num_x,
+                                     slicer_def.thickness)
+    y_offsets = get_adaptive_offsets(slicer_def.target_body, (0, 1, 0), min_point.y, max_point.y, slicer_def.num_y,
+                                     slicer_def.thickness)
+    z_offsets = get_adaptive_offsets(slicer_def.target_body, (0, 0, 1), min_point.z, max_point.z, slicer_def.num_z,
+                                     slicer_def.thickness)
+
+    slicer_def.x_distances = [offset - min_point.x for offset in x_offsets]
+    slicer_def.y_distances = [offset - min_point.y for offset in y_offsets]
+    slicer_def.z_distances = [offset - min_point.z for offset in z_offsets]
+
+
+# Switches a SlicerDef to stacked layers, Z slices of the sheet thickness filling the body from bottom to top
+@profiled()
+def stack_layers(slicer_def):
+    bounding_box = slicer_def.target_body.boundingBox
+    min_z = bounding_box.minPoint.z
+
+    offsets = StackedLayers.layer_offsets(min_z, bounding_box.maxPoint.z, slicer_def.thickness)
+
+    slicer_def.num_z = len(offsets)
+    slicer_def.z_spacing = slicer_def.thickness
+    slicer_def.z_distances = [offset - min_z for offset in offsets.tolist()]
+
+
+# Point on the axis of radial slices, the fan turns about the vertical line through the bounding box center
+def get_radial_center(bounding_box):
+    min_point = bounding_box.minPoint
+    max_point = bounding_box.maxPoint
+    return (min_point.x + max_point.x) / 2, (min_point.y + max_point.y) / 2, 0.0
+
+
+# Draws the plus and minus outlines of every slice as custom graphics from the cached mesh
+# Stacked layers replace all other slices, see stack_layers
+def draw_slice_preview(target_body, x_qty, y_qty, slice_thickness, adaptive=False, z_qty=0, radial_qty=0,
+                       stacked=False):
+    vertices, faces = get_cached_mesh(target_body, PREVIEW_TOLERANCE)
+    bounding_box = target_body.boundingBox
+    min_point = bounding_box.minPoint
+    max_point = bounding_box.maxPoint
+
+    if stacked:
+        x_qty, y_qty, radial_qty = 0, 0, 0
+
+    families = []
+    for normal, min_value, max_value, qty in (((1, 0, 0), min_point.x, max_point.x, x_qty),
+                                             ((0, 1, 0), min_point.y, max_point.y, y_qty),
+                                             ((0, 0, 1), min_point.z, max_point.z, z_qty)):
+        if stacked and normal[2] == 1:
+            mid_offsets = StackedLayers.layer_offsets(min_value, max_value, slice_thickness)
+        elif adaptive:
+            mid_offsets = get_adaptive_offsets(target_body, normal, min_value, max_value, qty, slice_thickness)
+        else:
+            mid_offsets = get_slice_offsets(min_value, max_value, qty)
+        families.append(SliceFamilies.parallel_family('', normal, mid_offsets))
+
+    if radial_qty > 0:
+        families.append(SliceFamilies.radial_family('', radial_qty, center=get_radial_center(bounding_box)))
+
+    coordinates = []
+    strip_lengths = []
+
+    for family in families:
+        for normal, indices in SliceFamilies.normal_groups(family):
+            offsets = []
+            for mid_offset in family.offsets[indices].tolist():
+                offsets.extend((mid_offset + slice_thickness / 2, mid_offset - slice_thickness / 2))
+
+            normal = normal.tolist()
+            for offset, loops in zip(offsets, MeshSection.section_mesh_batch(vertices, faces, normal, offsets)):
+                loop_coordinates, loop_lengths = MeshSection.loop_polylines(loops, normal, offset)
+                coordinates.extend(loop_coordinates)
+                strip_lengths.extend(loop_lengths)
+
+    if len(strip_lengths) == 0:
+        return None
+
+    graphics = get_app_objects()['root_comp'].customGraphicsGroups.add()
+    lines = graphics.addLines(adsk.fusion.CustomGraphicsCoordinates.create(coordinates), [], True, strip_lengths)
+    lines.color = adsk.fusion.CustomGraphicsSolidColorEffect.create(adsk.core.Color.create(255, 0, 0, 255))
+
+    return graphics
+
+
 # Create slice in a given direction
-def create_slices2(target_body, spacing, qty, base_plane, slice_thickness, name):
+# slice_sections holds the (mid, plus, minus) mesh sections of each slice from get_slice_sections
+def create_slices2(target_body, spacing, qty, base_plane, slice_thickness, name, slice_sections=None,
+                   mode=SliceMode()):
     target_comp = target_body.parentComponent
 
     # Feature Collections
@@ -46,27 +268,251 @@ def create_slices2(target_body, spacing, qty, base_plane, slice_thickness, name)
     component_slices = []
     face_slices = []
 
+    if slice_sections is None:
+        slice_sections = [None] * qty
+
     for i in range(1, qty + 1):
-        offset_value = adsk.core.ValueInput.createByReal(i * spacing)
+        slice_name = name + '-' + str(i)
+
+        plane, new_face_slices, new_component_slices = create_slice_at(target_body, base_plane, i * spacing,
+                                                                       slice_thickness, slice_name,
+                                                                       slice_sections[i - 1], mode)
+
+        # Tag the faces and component of this slice so posts and outlines can be matched to it
+        face_slices.extend(face_slice._replace(slice_index=i - 1) for face_slice in new_face_slices)
+        component_slices.extend(component_slice._replace(slice_index=i - 1)
+                                for component_slice in new_component_slices)
+
+    return component_slices, face_slices
+
+
+# Creates the mid plane of one slice at a distance from the base plane and builds the slice on it
+def create_slice_at(target_body, base_plane, distance, slice_thickness, slice_name, sections=None,
+                    mode=SliceMode()):
+    plane = create_offset_plane(target_body.parentComponent, distance, base_plane)
+    return build_slice(plane, slice_thickness, target_body, slice_name, sections, mode)
+
+
+# Creates the mid plane of one radial slice at an angle about the radial axis and builds the slice on it
+# A plane whose normal came out reversed gets its plus and minus sections swapped, they follow the plane normal
+def create_radial_slice_at(target_body, radial_axis: RadialAxis, angle, slice_thickness, slice_name, sections=None,
+                           mode=SliceMode()):
+    plane, flipped = create_radial_plane(target_body.parentComponent, radial_axis, angle)
+
+    if flipped and sections is not None:
+        sections = (sections[0], sections[2], sections[1])
+
+    return build_slice(plane, slice_thickness, target_body, slice_name, sections, mode)
+
+
+# Builds a slice on a mid plane, returns the plane with the face and component slices of the new slice
+def build_slice(plane, slice_thickness, target_body, slice_name, sections=None, mode=SliceMode()):
+    plane.name = slice_name
+
+    face_slices = []
+    component_slices = []
+
+    if mode.fast:
+        create_slice_fast(plane, slice_thickness, target_body, face_slices, component_slices, slice_name)
+    else:
+        create_slice(plane, slice_thickness, target_body, face_slices, component_slices, slice_name, sections,
+                     mode.compute_deferred)
+
+    return plane, face_slices, component_slices
+
+
+# Brings the slices of one direction in line with the wanted sections, reusing what a previous run built
+# Unchanged slices are kept, slices whose geometry reappears at another offset are moved by editing their plane
+# Radial slices are placed by their angle about radial_axis instead of an offset from base_plane, moved ones are rebuilt
+# Fast slices are base feature bodies that do not follow their plane, so they are rebuilt as well, see get_slice_tokens
+# Returns component slices, face slices and manifest records in offset order
+@profiled()
+def update_slices(target_body, base_plane, slice_thickness, name, slice_sections, old_records,
+                  radial_axis: RadialAxis = None, mode=SliceMode()):
+    design = get_app_objects()['design']
+    base_offset = get_plane_offset(base_plane) if base_plane is not None else 0.0
+
+    wanted = []
+    for i, sections in enumerate(slice_sections):
+        geometry_hash = SliceManifest.section_hash([section.regions for section in sections])
+        offset = sections[0].offset if radial_axis is None else get_radial_angle(sections[0].normal)
+        wanted.append(SliceManifest.SliceRecord(name + '-' + str(i + 1), name, offset, slice_thickness,
+                                                geometry_hash, {}))
+
+    diff = SliceManifest.diff_manifest([record for record in old_records if record.direction == name], wanted)
+
+    if radial_axis is not None or mode.fast:
+        diff = diff._replace(move=[], delete=diff.delete + [old_record for old_record, _ in diff.move])
+    else:
+        fixed = [old_record for old_record, _ in diff.move if not old_record.tokens.get('parametric')]
+        diff = diff._replace(move=[move for move in diff.move if move[0].tokens.get('parametric')],
+                             delete=diff.delete + fixed)
+
+    for record in diff.delete:
+        for token in (record.tokens.get('occurrence'), record.tokens.get('plane')):
+            entity = find_entity(design, token)
+            if entity is not None:
+                entity.deleteMe()
+
+    for old_record, new_record in diff.move:
+        plane = find_entity(design, old_record.tokens.get('plane'))
+        if plane is not None:
+            plane.definition.offset.value += new_record.offset - old_record.offset
+
+    # Reused slices take their new names in two passes so no two slices share a name on the way
+    reused = diff.keep + diff.move
+    for suffix in ('~', ''):
+        for old_record, new_record in reused:
+            rename_slice(design, old_record.tokens, new_record.name + suffix)
+
+    tokens = {new_record.name: old_record.tokens for old_record, new_record in reused}
+
+    for i, new_record in enumerate(wanted):
+        if new_record.name not in tokens and radial_axis is not None:
+            created = create_radial_slice_at(target_body, radial_axis, new_record.offset, slice_thickness,
+                                             new_record.name, slice_sections[i], mode)
+            tokens[new_record.name] = get_slice_tokens(*created, parametric=not mode.fast)
+        elif new_record.name not in tokens:
+            created = create_slice_at(target_body, base_plane, new_record.offset - base_offset, slice_thickness,
+                                      new_record.name, slice_sections[i], mode)
+            tokens[new_record.name] = get_slice_tokens(*created, parametric=not mode.fast)
+
+    records = []
+    component_slices = []
+    face_slices = []
+
+    for i, new_record in enumerate(wanted):
+        slice_tokens = tokens[new_record.name]
+        records.append(new_record._replace(tokens=slice_tokens))
+
+        occurrence = find_entity(design, slice_tokens.get('occurrence'))
+        end_face = find_entity(design, slice_tokens.get('end_face'))
+        if occurrence is not None and end_face is not None:
+            component_slices.append(SliceComponent(occurrence, end_face, i))
+
+        for face_token, body_token in slice_tokens.get('faces', []):
+            face = find_entity(design, face_token)
+            body = find_entity(design, body_token)
+            if face is not None and body is not None:
+                face_slices.append(SliceFace(face, body, i))
+
+    return component_slices, face_slices, records
+
+
+# Entity tokens of everything create_slice_at built for one slice
+# parametric is set for slices built from sketches and extrudes, only those follow their plane when it moves
+def get_slice_tokens(plane, face_slices, component_slices, parametric=True):
+    tokens = {
+        'parametric': parametric,
+        'plane': plane.entityToken,
+        'faces': [[face_slice.face.entityToken, face_slice.body.entityToken] for face_slice in face_slices],
+        'slots': {}
+    }
+
+    if len(component_slices) > 0:
+        tokens['occurrence'] = component_slices[0].occurrence.entityToken
+        tokens['end_face'] = component_slices[0].end_face.entityToken
+
+    return tokens
 
-        # Create construction plane input
-        plane_input = planes.createInput()
 
-        # Add construction plane by offset
+# Renames the mid plane and component of a slice from the previous run
+def rename_slice(design, tokens, name):
+    plane = find_entity(design, tokens.get('plane'))
+    if plane is not None:
+        plane.name = name
 
-        plane_input.setByOffset(base_plane, offset_value)
+    occurrence = find_entity(design, tokens.get('occurrence'))
+    if occurrence is not None:
+        occurrence.component.name = name
+
+
+# Returns the entity for a token or None if it no longer exists
+def find_entity(design, token):
+    if token is None:
+        return None
+
+    entities = design.findEntityByToken(token)
+    if len(entities) == 0:
+        return None
+
+    return entities[0]
+
+
+# Returns the header and slice records stored by the last run
+def read_manifest(design):
+    attribute = design.attributes.itemByName(ATTRIBUTE_GROUP, MANIFEST_ATTRIBUTE)
+
+    if attribute is None:
+        return {}, []
+
+    return SliceManifest.from_json(attribute.value)
+
+
+def write_manifest(design, records, header=None):
+    design.attributes.add(ATTRIBUTE_GROUP, MANIFEST_ATTRIBUTE, SliceManifest.to_json(records, header))
+
+
+# Angle of a radial slice about the vertical radial axis from the normal of its mid plane
+def get_radial_angle(normal):
+    return math.atan2(normal[1], normal[0])
+
+
+# Vertical construction axis through a point, the line where two base plane offsets cross
+# The planes and axis of the last run are reused when all of them are in last_planes, see get_last_planes
+# Returns the axis and whether a plane had to be moved
+def create_radial_axis(target_comp, center, last_planes=None):
+    axis, zero_plane, center_plane = (last_planes or {}).get('radial', (None, None, None))
+    if axis is None or zero_plane is None or center_plane is None:
+        axis, zero_plane, center_plane = None, None, None
+
+    x_plane, x_moved = get_offset_plane(target_comp, center[0], target_comp.yZConstructionPlane, 'R_Zero_Plane',
+                                        zero_plane)
+    y_plane, y_moved = get_offset_plane(target_comp, center[1], target_comp.xZConstructionPlane, 'R_Center_Plane',
+                                        center_plane)
+
+    if axis is None:
+        axis_input = target_comp.constructionAxes.createInput()
+        axis_input.setByTwoPlanes(x_plane, y_plane)
+        axis = target_comp.constructionAxes.add(axis_input)
+        axis.name = 'R_Axis'
+        axis.isLightBulbOn = False
+
+    return RadialAxis(axis, x_plane, y_plane, center), x_moved or y_moved
+
+
+# Creates the plane through the radial axis with the normal (cos angle, sin angle, 0)
+# The sense of the angle follows the axis direction, a plane turned the wrong way is created again at -angle
+# Returns the plane and whether its normal points away from the wanted normal
+def create_radial_plane(target_comp, radial_axis: RadialAxis, angle):
+    planes = target_comp.constructionPlanes
+    normal = (math.cos(angle), math.sin(angle), 0.0)
+
+    for signed_angle in (angle, -angle):
+        plane_input = planes.createInput()
+        plane_input.setByAngle(radial_axis.axis, adsk.core.ValueInput.createByReal(signed_angle),
+                               radial_axis.reference_plane)
         plane = planes.add(plane_input)
-        plane.name = name + '-' + str(i)
 
-        slice_name = name + '-' + str(i)
+        plane_normal = plane.geometry.normal
+        alignment = plane_normal.x * normal[0] + plane_normal.y * normal[1]
+        if abs(alignment) > 1 - 1e-6:
+            return plane, alignment < 0
 
-        create_slice(plane, slice_thickness, target_body, face_slices, component_slices, slice_name)
+        plane.deleteMe()
 
-    return component_slices, face_slices
+    raise ValueError('Radial plane could not be placed at ' + str(angle))
 
 
+# Signed distance of a construction plane from the origin along its normal
+def get_plane_offset(plane):
+    geometry = plane.geometry
+    return geometry.origin.asVector().dotProduct(geometry.normal)
+
+
+@profiled()
 def create_slice(plane: adsk.fusion.ConstructionPlane, slice_thickness: float, target_body: adsk.fusion.BRepBody,
-                 face_slices, component_slices, slice_name):
+                 face_slices, component_slices, slice_name, sections=None, compute_deferred=False):
     ao = get_app_objects()
     design = ao['design']
 
@@ -85,26 +531,38 @@ def create_slice(plane: adsk.fusion.ConstructionPlane, slice_thickness: float, t
     # todo fix plane creation
     mid_plane = plane
     mid_sketch = add_construction_sketch(sketches, mid_plane)
+    mid_sketch.isComputeDeferred = compute_deferred
     mid_sketch.projectCutEdges(target_body)
     mid_sketch.name = 'Mid_Sketch'
 
     plus_plane = create_offset_plane(new_occurrence.component, slice_thickness / 2, plane)
     plus_plane.name = 'Plus_Plane'
     plus_sketch = add_construction_sketch(sketches, plus_plane)
+    plus_sketch.isComputeDeferred = compute_deferred
     plus_sketch.projectCutEdges(target_body)
     plus_sketch.name = 'Plus_Sketch'
 
     minus_plane = create_offset_plane(new_occurrence.component, -slice_thickness / 2, plane)
     minus_plane.name = 'Minus_Plane'
     minus_sketch = add_construction_sketch(sketches, minus_plane)
+    minus_sketch.isComputeDeferred = compute_deferred
     minus_sketch.projectCutEdges(target_body)
     minus_sketch.name = 'Minus_Sketch'
 
+    # Deferred sketches solve together here, their profiles are needed from now on
+    # Every slice is fully computed when create_slice returns, so the design needs no recompute afterwards
+    if compute_deferred:
+        mid_sketch.isComputeDeferred = False
+        plus_sketch.isComputeDeferred = False
+        minus_sketch.isComputeDeferred = False
+
+    mid_section, plus_section, minus_section = sections if sections is not None else (None, None, None)
+
     mid_slices = []
-    get_contained_profiles(mid_sketch, patches, target_body, True, mid_slices)
+    get_contained_profiles(mid_sketch, patches, target_body, True, mid_slices, mid_section)
 
-    plus_profiles = get_contained_profiles(plus_sketch, patches, target_body)
-    minus_profiles = get_contained_profiles(minus_sketch, patches, target_body)
+    plus_profiles = get_contained_profiles(plus_sketch, patches, target_body, section=plus_section)
+    minus_profiles = get_contained_profiles(minus_sketch, patches, target_body, section=minus_section)
 
     thickness_value = adsk.core.ValueInput.createByReal(slice_thickness)
     negative_thickness_value = adsk.core.ValueInput.createByReal(-slice_thickness)
@@ -129,14 +587,23 @@ def create_slice(plane: adsk.fusion.ConstructionPlane, slice_thickness: float, t
         minus_sketch.name += '----FIX__ME'
         return
 
-    minus_extrude = extrude_features.addSimple(minus_profiles, thickness_value,
-                                               adsk.fusion.FeatureOperations.IntersectFeatureOperation)
+    # Deferred mode limits the intersect to the plus bodies up front instead of rolling the timeline back to it
+    if compute_deferred:
+        minus_input = extrude_features.createInput(minus_profiles,
+                                                   adsk.fusion.FeatureOperations.IntersectFeatureOperation)
+        minus_input.setDistanceExtent(False, thickness_value)
+        minus_input.participantBodies = plus_bodies
+        extrude_features.add(minus_input)
+
+    else:
+        minus_extrude = extrude_features.addSimple(minus_profiles, thickness_value,
+                                                   adsk.fusion.FeatureOperations.IntersectFeatureOperation)
 
-    # Get the current position of the timeline.
-    start_position = design.timeline.markerPosition
-    minus_extrude.timelineObject.rollTo(True)
-    minus_extrude.participantBodies = plus_bodies
-    design.timeline.markerPosition = start_position
+        # Get the current position of the timeline.
+        start_position = design.timeline.markerPosition
+        minus_extrude.timelineObject.rollTo(True)
+        minus_extrude.participantBodies = plus_bodies
+        design.timeline.markerPosition = start_position
 
     design.activateRootComponent()
 
@@ -160,59 +627,316 @@ def create_slice(plane: adsk.fusion.ConstructionPlane, slice_thickness: float, t
     component_slices.append(SliceComponent(new_occurrence, end_face))
 
 
+# Fast non-parametric slice, the target body intersected with a box of the slice thickness
+# The boolean and the mid plane section run in memory, only the finished bodies are added to the design.
+# Slab sides follow the body surface instead of being extruded square through the thickness.
+@profiled()
+def create_slice_fast(plane: adsk.fusion.ConstructionPlane, slice_thickness: float, target_body: adsk.fusion.BRepBody,
+                      face_slices, component_slices, slice_name):
+    design = get_app_objects()['design']
+    temp_brep = adsk.fusion.TemporaryBRepManager.get()
+
+    new_occurrence = target_body.parentComponent.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+    new_occurrence.component.name = slice_name
+
+    plane_geometry = plane.geometry
+    slab = temp_brep.copy(target_body)
+    box = temp_brep.createBox(get_slab_box(plane_geometry, slice_thickness, target_body.boundingBox))
+
+    if not temp_brep.booleanOperation(slab, box, adsk.fusion.BooleanTypes.IntersectionBooleanType):
+        new_occurrence.component.name += '----FIX__ME'
+        return
+
+    # Each island of the slice is its own body with its own mid section
+    temporary_bodies = []
+    for lump in slab.lumps:
+        lump_body = temp_brep.copy(lump)
+        temporary_bodies.append(lump_body)
+        temporary_bodies.append(temp_brep.planeIntersection(lump_body, plane_geometry))
+
+    if len(temporary_bodies) == 0:
+        new_occurrence.component.name += '----FIX__ME'
+        return
+
+    bodies = add_temporary_bodies(new_occurrence.component, temporary_bodies, design)
+
+    mid_faces = []
+    for slab_body, mid_body in zip(bodies[::2], bodies[1::2]):
+        for face in mid_body.faces:
+            face_slices.append(SliceFace(face, slab_body))
+            mid_faces.append(face)
+
+    if len(mid_faces) > 0:
+        component_slices.append(SliceComponent(new_occurrence, mid_faces[-1]))
+
+
+# Box of the slice thickness centered on a plane, large enough to cover a bounding box in every direction
+def get_slab_box(plane_geometry, thickness, bounding_box):
+    min_point = bounding_box.minPoint.asArray()
+    max_point = bounding_box.maxPoint.asArray()
+    origin = plane_geometry.origin.asArray()
+    normal = plane_geometry.normal.asArray()
+
+    center = [(low + high) / 2 for low, high in zip(min_point, max_point)]
+    height = sum((c - o) * n for c, o, n in zip(center, origin, normal))
+    center = [c - height * n for c, n in zip(center, normal)]
+
+    size = 2 * bounding_box.minPoint.distanceTo(bounding_box.maxPoint) + thickness
+
+    return adsk.core.OrientedBoundingBox3D.create(adsk.core.Point3D.create(*center), plane_geometry.uDirection,
+                                                  plane_geometry.vDirection, size, size, thickness)
+
+
+# Adds temporary bodies to a component, parametric designs hold them in one base feature
+# Returns the new bodies in the order of temporary_bodies
+def add_temporary_bodies(component, temporary_bodies, design):
+    if design.designType == adsk.fusion.DesignTypes.DirectDesignType:
+        return [component.bRepBodies.add(body) for body in temporary_bodies]
+
+    base_feature = component.features.baseFeatures.add()
+    base_feature.startEdit()
+    for body in temporary_bodies:
+        component.bRepBodies.add(body, base_feature)
+    base_feature.finishEdit()
+
+    return list(base_feature.bodies)
+
+
+# Area, centroid and bounding box of every face as arrays for MeshSection.match_faces
+def get_face_properties(faces):
+    areas = []
+    centroids = []
+    boxes = []
+
+    for face in faces:
+        bounding_box = face.boundingBox
+        areas.append(face.area)
+        centroids.append(face.centroid.asArray())
+        boxes.append((bounding_box.minPoint.asArray(), bounding_box.maxPoint.asArray()))
+
+    return areas, centroids, boxes
+
+
+# Pairs every mid face of a slice with the body of the extrude end face below it
+# With numpy faces pair by centroid, so islands of equal area keep their own body
 def create_face_slices(extrude_faces, mid_faces, face_slices):
-    extrude_bodies = []
-    mid_bodies = []
+    extrude_faces = list(extrude_faces)
 
-    for e_face in extrude_faces:
-        extrude_dict = {'body': e_face.body, 'area': e_face.evaluator.area, 'face': e_face}
-        extrude_bodies.append(extrude_dict)
+    if MeshSection is not None:
+        normal = mid_faces[0].geometry.normal.asArray() if len(mid_faces) > 0 else (0.0, 0.0, 1.0)
+        matches = MeshSection.match_faces(*get_face_properties(mid_faces), *get_face_properties(extrude_faces),
+                                          normal)
 
-    for m_face in mid_faces:
-        extrude_dict = {'body': m_face.body, 'area': m_face.evaluator.area, 'face': m_face}
-        mid_bodies.append(extrude_dict)
+        for mid_face, match in zip(mid_faces, matches.tolist()):
+            if match != -1:
+                face_slices.append(SliceFace(mid_face, extrude_faces[match].body))
+        return
 
-        extrude_bodies = sorted(extrude_bodies, key=lambda k: k["area"])
-        mid_bodies = sorted(mid_bodies, key=lambda k: k["area"])
+    extrude_bodies = sorted(({'body': e_face.body, 'area': e_face.evaluator.area} for e_face in extrude_faces),
+                            key=lambda k: k['area'])
+    mid_bodies = sorted(({'area': m_face.evaluator.area, 'face': m_face} for m_face in mid_faces),
+                        key=lambda k: k['area'])
 
-    for i, mid_body in enumerate(mid_bodies):
-        new_slice = SliceFace(mid_bodies[i]['face'], extrude_bodies[i]['body'])
-        face_slices.append(new_slice)
+    for mid_body, extrude_body in zip(mid_bodies, extrude_bodies):
+        face_slices.append(SliceFace(mid_body['face'], extrude_body['body']))
 
 
-def get_contained_profiles(sketch, patches, target_body, is_mid_plane=False, mid_slices=None):
-    extrude_profiles = adsk.core.ObjectCollection.create()
+# Computes the mid, plus and minus mesh sections of every slice in a direction in one batched pass
+# distances places the slices from the base plane instead of spacing them evenly
+def get_slice_sections(mesh, base_plane, spacing, qty, slice_thickness, parallel=False, distances=None):
+    if mesh is None:
+        return [None] * qty
 
-    # Account for potential of multiple resulting faces in the slice
-    for profile in sketch.profiles:
+    base_offset = get_plane_offset(base_plane)
 
-        # Create the patch feature
-        patch_input = patches.createInput(profile, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        patch_feature = patches.add(patch_input)
+    if distances is None:
+        distances = [i * spacing for i in range(1, qty + 1)]
 
-        # Possibly patch could create multiple faces, although unlikely in this application
-        # for patch_face in patch_feature.faces:
+    family = SliceFamilies.parallel_family('', base_plane.geometry.normal.asArray(),
+                                           [base_offset + distance for distance in distances])
+    return get_family_sections(mesh, [family], slice_thickness, parallel)[0]
 
-        patch_face = patch_feature.faces[0]
 
-        # Check if surface is actually in solid
-        point = patch_face.pointOnFace
-        containment = target_body.pointContainment(point)
+# Computes the mid, plus and minus mesh sections of every slice of every family in one batched pass
+# Planes of all families that share a normal are sectioned together, see SliceFamilies.family_sections
+# In parallel mode the planes are spread over a process pool, feature creation stays on this thread
+@profiled()
+def get_family_sections(mesh, families, slice_thickness, parallel=False):
+    if mesh is None:
+        return [[None] * len(family.offsets) for family in families]
 
-        if containment == adsk.fusion.PointContainment.PointInsidePointContainment:
-            extrude_profiles.add(profile)
+    if parallel:
+        compute = SectionPool.section_regions_parallel
+    else:
+        compute = MeshSection.section_regions_batch
 
-            if is_mid_plane:
-                mid_slices.append(patch_face)
+    # Sections of a body seen before are read from the on-disk cache instead of being recomputed
+    section_cache = get_section_cache()
 
-            else:
-                patch_feature.deleteMe()
+    def compute_regions(normal, offsets):
+        if section_cache is not None:
+            return section_cache.section_regions(mesh[0], mesh[1], normal, offsets, MESH_TOLERANCE, compute)
+        return compute(mesh[0], mesh[1], normal, offsets)
+
+    return [[tuple(PlaneSection(*section) for section in sections) for sections in family_sections]
+            for family_sections in SliceFamilies.family_sections(families, slice_thickness, compute_regions)]
+
+
+# Slice families of a SlicerDef in slotting order, X, Y and Z slices from their base planes and the radial fan
+def get_slice_families(slicer_def):
+    families = []
+
+    for name, base_plane, distances in (('X_Slice', slicer_def.x_plane, slicer_def.x_distances),
+                                        ('Y_Slice', slicer_def.y_plane, slicer_def.y_distances),
+                                        ('Z_Slice', slicer_def.z_plane, slicer_def.z_distances)):
+        # Z slices of a state whose base plane is gone
+        if base_plane is None:
+            families.append(SliceFamilies.parallel_family(name, (0.0, 0.0, 1.0), []))
+            continue
+
+        base_offset = get_plane_offset(base_plane)
+        families.append(SliceFamilies.parallel_family(name, base_plane.geometry.normal.asArray(),
+                                                      [base_offset + distance for distance in distances]))
+
+    center = slicer_def.radial_axis.center if slicer_def.radial_axis is not None else (0.0, 0.0, 0.0)
+    families.append(SliceFamilies.radial_family('R_Slice', slicer_def.num_radial, center=center))
+
+    return families
+
+
+# Returns the shared section cache or None if the cache directory cannot be created
+def get_section_cache():
+    global SECTION_CACHE
+
+    if SECTION_CACHE is None:
+        try:
+            SECTION_CACHE = SectionCache.SectionCache()
+        except OSError:
+            return None
+
+    return SECTION_CACHE
+
+
+# Classifies all profiles of a sketch against a mesh section
+# Returns contained and matched flags, unmatched profiles still need a kernel containment query
+def classify_sketch_profiles(sketch, section):
+    areas = []
+    centroids = []
+
+    for profile in sketch.profiles:
+        area_properties = profile.areaProperties(adsk.fusion.CalculationAccuracy.LowCalculationAccuracy)
+        centroid = sketch.sketchToModelSpace(area_properties.centroid)
+        areas.append(area_properties.area)
+        centroids.append(centroid.asArray())
+
+    centroids = MeshSection.project_points(centroids, section.normal)
+    return MeshSection.classify_profiles(areas, centroids, section.regions)
+
+
+# Profiles the section cannot classify are sampled at a point inside their loops, the points are classified by the
+# containment grid in one call and only points near the body surface are left to the kernel
+@profiled()
+def get_contained_profiles(sketch, patches, target_body, is_mid_plane=False, mid_slices=None, section=None):
+    extrude_profiles = adsk.core.ObjectCollection.create()
+    profiles = list(sketch.profiles)
+
+    if section is not None:
+        contained, matched = classify_sketch_profiles(sketch, section)
+    else:
+        contained, matched = [False] * len(profiles), [False] * len(profiles)
+
+    # Sample points of all unmatched profiles come from their loop curves, so they are classified together
+    sample_points = {}
+    if MeshSection is not None:
+        sample_points = {i: get_profile_point(sketch, profile) for i, profile in enumerate(profiles) if not matched[i]}
+
+    grid_contained, grid_matched = {}, {}
+    if Containment is not None and len(sample_points) > 0:
+        indices = list(sample_points)
+        classified = get_containment_grid(target_body).classify([sample_points[i].asArray() for i in indices])
+        grid_contained = dict(zip(indices, classified[0].tolist()))
+        grid_matched = dict(zip(indices, classified[1].tolist()))
+        PROFILER.count('grid_containment', sum(grid_matched.values()))
+
+    for i, profile in enumerate(profiles):
+        patch_feature = None
+
+        if matched[i]:
+            is_inside = contained[i]
+        elif grid_matched.get(i):
+            is_inside = grid_contained[i]
         else:
+            # Without numpy the point comes from a patch of the profile
+            if i in sample_points:
+                point = sample_points[i]
+            else:
+                patch_input = patches.createInput(profile, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+                patch_feature = patches.add(patch_input)
+                point = patch_feature.faces[0].pointOnFace
+
+            # Check if surface is actually in solid, the kernel decides near the surface
+            PROFILER.count('kernel_containment')
+            containment = target_body.pointContainment(point)
+            is_inside = containment == adsk.fusion.PointContainment.PointInsidePointContainment
+
+        if is_inside:
+            extrude_profiles.add(profile)
+
+        # Only kept mid plane profiles need a patch, its face is matched to the extruded bodies
+        if is_inside and is_mid_plane:
+            if patch_feature is None:
+                patch_input = patches.createInput(profile, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+                patch_feature = patches.add(patch_input)
+            mid_slices.append(patch_feature.faces[0])
+        elif patch_feature is not None:
             patch_feature.deleteMe()
 
     return extrude_profiles
 
 
+# A point inside a sketch profile in model space, taken from the strokes of its loop curves
+# Profile curves come in no particular order or direction, the scanline in interior_point does not need them to
+def get_profile_point(sketch, profile):
+    strokes = []
+    for loop in profile.profileLoops:
+        for profile_curve in loop.profileCurves:
+            evaluator = profile_curve.geometry.evaluator
+            _, start, end = evaluator.getParameterExtents()
+            _, points = evaluator.getStrokes(start, end, PROFILE_STROKE_TOLERANCE)
+            strokes.append([point.asArray()[:2] for point in points])
+
+    point = MeshSection.interior_point(strokes)
+    if point is None:
+        return sketch.sketchToModelSpace(
+            profile.areaProperties(adsk.fusion.CalculationAccuracy.LowCalculationAccuracy).centroid)
+
+    return sketch.sketchToModelSpace(adsk.core.Point3D.create(float(point[0]), float(point[1]), 0.0))
+
+
+# Indices of the intersect slices whose body bounding box overlaps each target face, in intersect slice order
+# The box index is built once over all intersect bodies, without numpy every body is a candidate
+def get_intersect_candidates(target_slices: List[SliceFace], intersect_slices: List[SliceFace], tolerance=1e-4):
+    if SpatialIndex is None:
+        return [list(range(len(intersect_slices))) for _ in target_slices]
+
+    candidates = [[] for _ in target_slices]
+    if len(target_slices) == 0 or len(intersect_slices) == 0:
+        return candidates
+
+    body_boxes = [intersect_slice.face.body.boundingBox for intersect_slice in intersect_slices]
+    index = SpatialIndex.BoxIndex([box.minPoint.asArray() for box in body_boxes],
+                                  [box.maxPoint.asArray() for box in body_boxes])
+
+    face_boxes = [target_slice.face.boundingBox for target_slice in target_slices]
+    targets, bodies = index.overlaps([box.minPoint.asArray() for box in face_boxes],
+                                     [box.maxPoint.asArray() for box in face_boxes], tolerance)
+
+    for target, body in zip(targets.tolist(), bodies.tolist()):
+        candidates[target].append(body)
+
+    return [sorted(indices) for indices in candidates]
+
+
 def project_all_entities(sketch, entities):
     for entity in entities:
         sketch.project(entity)
@@ -220,16 +944,26 @@ def project_all_entities(sketch, entities):
 
 # Create vertical lines at intersections of two face sets
 # Post_Point = namedtuple('Post_Point', ('point', 'body', 'sketch_face', 'line', 'length'))
-def make_posts(target_slices: List[SliceFace], intersect_slices: List[SliceFace]):
+# The top point of a line is the end furthest along up, Z by default
+# Only bodies whose bounding box reaches the target face are projected, the pruned pairs are counted
+@profiled()
+def make_posts(target_slices: List[SliceFace], intersect_slices: List[SliceFace], up=None):
     top_points = []
     bottom_points = []
 
+    if up is None:
+        up = adsk.core.Vector3D.create(0, 0, 1)
+
+    candidates = get_intersect_candidates(target_slices, intersect_slices)
+    PROFILER.count('pruned_post_pairs', len(target_slices) * len(intersect_slices) -
+                   sum(len(indices) for indices in candidates))
+
     for i, target_slice in enumerate(target_slices):
         sketches = target_slice.face.body.parentComponent.sketches
         post_sketch = add_construction_sketch(sketches, target_slice.face)
 
-        for intersect_slice in intersect_slices:
-            post_sketch.projectCutEdges(intersect_slice.face.body)
+        for index in candidates[i]:
+            post_sketch.projectCutEdges(intersect_slices[index].face.body)
 
         lines = post_sketch.sketchCurves.sketchLines
 
@@ -241,7 +975,7 @@ def make_posts(target_slices: List[SliceFace], intersect_slices: List[SliceFace]
                 start_point = line.startSketchPoint.worldGeometry
                 end_point = line.endSketchPoint.worldGeometry
 
-                if start_point.z > end_point.z:
+                if start_point.asVector().dotProduct(up) > end_point.asVector().dotProduct(up):
                     top_points.append(Post_Point(start_point, target_slice.body, target_slice.face, line, length))
                     bottom_points.append(Post_Point(end_point, target_slice.body, target_slice.face, line, length))
 
@@ -256,8 +990,131 @@ def make_posts(target_slices: List[SliceFace], intersect_slices: List[SliceFace]
     return top_points, bottom_points
 
 
+# Face rows and entity tokens of slice faces for post tables, the faces themselves are kept as resolved entities
+def get_face_table(slice_faces: List[SliceFace]):
+    design = get_app_objects()['design']
+    tokens = SliceStore.TokenTable(lambda token: find_entity(design, token))
+    rows = []
+
+    for slice_face in slice_faces:
+        bounding_box = slice_face.face.boundingBox
+        rows.append((slice_face.slice_index, tokens.add(slice_face.face.entityToken, slice_face.face),
+                     tokens.add(slice_face.body.entityToken, slice_face.body), bounding_box.minPoint.asArray(),
+                     bounding_box.maxPoint.asArray()))
+
+    return SliceStore.face_rows(rows), tokens
+
+
+# Computes the same posts as make_posts analytically from the mesh sections of both slice families
+# No intersection sketches are created, so the posts have no line
+# Returns post tables of the top and bottom post ends, see SliceStore.PostTable
+@profiled()
+def make_planned_posts(target_slices: List[SliceFace], intersect_slices: List[SliceFace], target_sections,
+                       intersect_sections, thickness):
+    faces, tokens = get_face_table(target_slices)
+    empty = SliceStore.PostTable(SliceStore.empty_posts(), faces, tokens)
+
+    if len(target_sections) == 0 or len(intersect_sections) == 0:
+        return empty, empty
+
+    posts = SlotPlanner.plan_posts(target_sections[0][0].normal, [sections[0].offset for sections in target_sections],
+                                   intersect_sections[0][0].normal,
+                                   [sections[0].offset for sections in intersect_sections],
+                                   [sections[1].regions for sections in intersect_sections],
+                                   [sections[2].regions for sections in intersect_sections], thickness)
+
+    # A slice can have several islands, only keep posts that can reach the island
+    top_posts = SliceStore.posts_on_faces(faces, posts.target, posts.top, posts.length, posts.top, posts.bottom,
+                                          posts.up, posts.across, posts.width)
+    bottom_posts = SliceStore.posts_on_faces(faces, posts.target, posts.bottom, posts.length, posts.top,
+                                             posts.bottom, posts.up, posts.across, posts.width)
+
+    return SliceStore.PostTable(top_posts, faces, tokens), SliceStore.PostTable(bottom_posts, faces, tokens)
+
+
+# Slice family of the mid planes of one direction from its (mid, plus, minus) sections
+def get_section_family(name, slice_sections):
+    return SliceFamilies.family_from_planes(name, [sections[0].normal for sections in slice_sections],
+                                            [sections[0].offset for sections in slice_sections])
+
+
+# Posts of the slices of every direction against the slices of all other directions, planned in one pass
+# Of two crossing directions the one listed first is notched at the top of its posts, see plan_family_posts
+# Returns one post table per direction holding the notched end of every post
+@profiled()
+def make_family_posts(face_slice_groups, section_groups, thickness):
+    families = [get_section_family(str(i), slice_sections) for i, slice_sections in enumerate(section_groups)]
+    plans = SliceFamilies.plan_family_posts(families,
+                                            [[sections[1].regions for sections in slice_sections]
+                                             for slice_sections in section_groups],
+                                            [[sections[2].regions for sections in slice_sections]
+                                             for slice_sections in section_groups], thickness)
+
+    post_tables = []
+    for face_slices, (posts, use_top) in zip(face_slice_groups, plans):
+        faces, tokens = get_face_table(face_slices)
+        notched = SliceStore.posts_on_faces(faces, posts.target, SlotPlanner.notched_ends(posts, use_top),
+                                            posts.length, posts.top, posts.bottom, posts.up, posts.across,
+                                            posts.width)
+        post_tables.append(SliceStore.PostTable(notched, faces, tokens))
+
+    return post_tables
+
+
+# Dowel hole centers of every stacked layer, a pair of adjacent layers shares its dowels
+# Layer k lies between the minus and plus planes of its section, the plus plane of one layer is the minus plane of
+# the next. The outer planes of the end layers can touch the body surface, where the mid section stands in for them.
+@profiled()
+def get_layer_holes(slice_sections, dowel_diameter):
+    if len(slice_sections) == 0:
+        return []
+
+    boundary_regions = [slice_sections[0][2].regions] + [sections[1].regions for sections in slice_sections]
+    if len(boundary_regions[0]) == 0:
+        boundary_regions[0] = slice_sections[0][0].regions
+    if len(boundary_regions[-1]) == 0:
+        boundary_regions[-1] = slice_sections[-1][0].regions
+
+    dowels = StackedLayers.stack_dowels(boundary_regions, dowel_diameter / 2)
+    PROFILER.count('dowels', len(dowels))
+
+    return StackedLayers.layer_holes(dowels, len(slice_sections))
+
+
+# Dowel holes as a post table, a hole is a post of no length along the layer normal whose width is the diameter
+# make_slots_batched cuts posts of no length as round holes
+def make_dowel_posts(face_slices: List[SliceFace], slice_sections, layer_holes, dowel_diameter):
+    faces, tokens = get_face_table(face_slices)
+
+    targets, points, ups, acrosses = StackedLayers.hole_posts(layer_holes,
+                                                              [sections[0].normal for sections in slice_sections],
+                                                              [sections[0].offset for sections in slice_sections])
+    posts = SliceStore.posts_on_faces(faces, targets, points, [0.0] * len(targets), points, points, ups, acrosses,
+                                      [dowel_diameter] * len(targets))
+
+    return SliceStore.PostTable(posts, faces, tokens)
+
+
+# Resolves a post table to Post_Point records for make_slots and make_custom_slots
+def get_post_points(post_table):
+    post_points = []
+    posts = post_table.posts
+
+    for point, length, face, up, across, width in zip(posts['point'].tolist(), posts['length'].tolist(),
+                                                      posts['face'].tolist(), posts['up'].tolist(),
+                                                      posts['across'].tolist(), posts['width'].tolist()):
+        face_row = post_table.faces[face]
+        post_points.append(Post_Point(adsk.core.Point3D.create(*point), post_table.tokens.entity(face_row['body']),
+                                      post_table.tokens.entity(face_row['face']), None, length,
+                                      adsk.core.Vector3D.create(*up), adsk.core.Vector3D.create(*across), width))
+
+    return post_points
+
+
+# direction is the slot width direction of posts without their own, see Post_Point
+@profiled()
 def make_slots(target_body: adsk.fusion.BRepBody, post_points: List[Post_Point], thickness: float,
-               direction: adsk.core.Vector3D):
+               direction: adsk.core.Vector3D = None):
     root_comp = target_body.parentComponent
 
     # Get extrude features
@@ -275,27 +1132,33 @@ def make_slots(target_body: adsk.fusion.BRepBody, post_points: List[Post_Point],
 
         sketch_lines = slot_sketch.sketchCurves.sketchLines
 
-        center_point = slot_sketch.modelToSketchSpace(post_point.point)
-        center_point.z = 0
-
-        x_vector = direction.copy()
-        x_vector.scaleBy(thickness / 2)
-
-        y_vector = adsk.core.Vector3D.create(0, 0, 1)
+        # Planned posts carry their own slot directions, projected posts are vertical
+        if post_point.across is not None:
+            x_vector = post_point.across.copy()
+            x_vector.scaleBy(post_point.width / 2)
+            y_vector = post_point.up.copy()
+        else:
+            x_vector = direction.copy()
+            x_vector.scaleBy(thickness / 2)
+            y_vector = adsk.core.Vector3D.create(0, 0, 1)
         y_vector.scaleBy(post_point.length / 2)
         # trans_vector = adsk.core.Vector3D.create(post_point.length / 2, thickness / 2, 0)
 
-        corner_point = post_point.point.copy()
-        corner_point.translateBy(x_vector)
-        corner_point.translateBy(y_vector)
-
-        corner_point_sketch = slot_sketch.modelToSketchSpace(corner_point)
-        corner_point_sketch.z = 0
+        # Three corners around the rectangle, so slots turned in the sketch plane are drawn too
+        corner_points = []
+        for x_sign, y_sign in ((-1, -1), (1, -1), (1, 1)):
+            corner_point = post_point.point.copy()
+            corner_point.translateBy(adsk.core.Vector3D.create(x_sign * x_vector.x + y_sign * y_vector.x,
+                                                               x_sign * x_vector.y + y_sign * y_vector.y,
+                                                               x_sign * x_vector.z + y_sign * y_vector.z))
+            corner_point_sketch = slot_sketch.modelToSketchSpace(corner_point)
+            corner_point_sketch.z = 0
+            corner_points.append(corner_point_sketch)
 
         # corner_point.translateBy(adsk.core.Vector3D.create(post_point.length/2, thickness/2, 0))
         # corner_point_sketch = sketch_points.add(corner_point)
 
-        rectangle_list = sketch_lines.addCenterPointRectangle(center_point, corner_point_sketch)
+        rectangle_list = sketch_lines.addThreePointRectangle(*corner_points)
 
         # Get the profile defined by the rectangle
         prof = slot_sketch.profiles.item(0)
@@ -317,6 +1180,131 @@ def make_slots(target_body: adsk.fusion.BRepBody, post_points: List[Post_Point],
         slot_sketch.isVisible = False
 
 
+# Cuts all slots of each body with one sketch and one cut extrude instead of one of each per slot
+# Returns a SlotBatch with the feature counts of both approaches
+# If created is a dictionary the slot sketch and extrude of each body are added to it by body token
+# Every post carries its own slot directions and width, see SlotPlanner.plan_posts
+# Posts of no length are round holes of the post width, see make_dowel_posts
+@profiled()
+def make_slots_batched(post_table, thickness: float, created=None):
+    groups = SliceStore.group_posts(post_table)
+    thickness_value = adsk.core.ValueInput.createByReal(thickness)
+
+    for i, (body_row, indices) in enumerate(groups):
+        posts = post_table.posts[indices]
+
+        # Entities are only resolved here, where the features are created
+        body = post_table.tokens.entity(body_row)
+        sketch_face = post_table.tokens.entity(post_table.faces['face'][posts['face'][0]])
+
+        sketches = body.parentComponent.sketches
+        extrudes = body.parentComponent.features.extrudeFeatures
+
+        slot_sketch = add_construction_sketch(sketches, sketch_face)
+        sketch_lines = slot_sketch.sketchCurves.sketchLines
+        sketch_circles = slot_sketch.sketchCurves.sketchCircles
+
+        holes = posts[posts['length'] <= 0]
+        posts = posts[posts['length'] > 0]
+        rectangles = SlotPlanner.slot_corners(posts['point'], posts['length'], posts['across'], posts['width'],
+                                              posts['up'])
+
+        # Draw every rectangle before the sketch solves its profiles
+        slot_sketch.isComputeDeferred = True
+        for corners in rectangles.tolist():
+            corner_points = []
+            for corner in corners:
+                corner_point = slot_sketch.modelToSketchSpace(adsk.core.Point3D.create(*corner))
+                corner_point.z = 0
+                corner_points.append(corner_point)
+            sketch_lines.addThreePointRectangle(*corner_points)
+        for center, width in zip(holes['point'].tolist(), holes['width'].tolist()):
+            center_point = slot_sketch.modelToSketchSpace(adsk.core.Point3D.create(*center))
+            center_point.z = 0
+            sketch_circles.addByCenterRadius(center_point, width / 2)
+        slot_sketch.isComputeDeferred = False
+
+        # Overlapping rectangles split into several profiles, all of them are slot
+        profiles = adsk.core.ObjectCollection.create()
+        for profile in slot_sketch.profiles:
+            profiles.add(profile)
+
+        extrude_input = extrudes.createInput(profiles, adsk.fusion.FeatureOperations.CutFeatureOperation)
+        extrude_input.setSymmetricExtent(thickness_value, True)
+        extrude_input.participantBodies = [body]
+        extrude = extrudes.add(extrude_input)
+
+        slot_sketch.name = 'slot_sketch-' + str(i)
+        slot_sketch.isVisible = False
+
+        if created is not None:
+            created[post_table.tokens.token(body_row)] = (slot_sketch, extrude)
+
+    return SlotPlanner.summarize_batch(groups)
+
+
+# Cuts batched slots only into bodies whose slots differ from the ones recorded in the manifest
+# Old slot features of those bodies are deleted first, the records are updated in place
+# Bodies are compared by token, so unchanged bodies are never resolved
+@profiled()
+def recut_slots(post_table, thickness: float, records):
+    design = get_app_objects()['design']
+
+    body_slots = {}
+    for record in records:
+        for face_token, body_token in record.tokens.get('faces', []):
+            body_slots[body_token] = record.tokens.setdefault('slots', {})
+
+    changed_posts = []
+    new_hashes = {}
+    current_bodies = set()
+
+    for body_row, indices in SliceStore.group_posts(post_table):
+        body_token = post_table.tokens.token(body_row)
+        current_bodies.add(body_token)
+
+        posts = post_table.posts[indices]
+        centers, corners = SlotPlanner.slot_rectangles(posts['point'], posts['length'], posts['across'],
+                                                       posts['width'], posts['up'])
+        slot_hash = SliceManifest.slot_hash(centers, corners)
+
+        slots = body_slots.get(body_token, {})
+        previous = slots.get(body_token)
+        if previous is not None and previous['hash'] == slot_hash:
+            continue
+
+        if previous is not None:
+            delete_entities(design, previous['features'])
+
+        changed_posts.extend(indices.tolist())
+        new_hashes[body_token] = slot_hash
+
+    # Bodies that lost all of their slots
+    for body_token, slots in body_slots.items():
+        if body_token not in current_bodies and body_token in slots:
+            delete_entities(design, slots.pop(body_token)['features'])
+
+    created = {}
+    batch = make_slots_batched(SliceStore.select_posts(post_table, changed_posts), thickness, created)
+
+    for body_token, features in created.items():
+        if body_token in body_slots:
+            body_slots[body_token][body_token] = {
+                'hash': new_hashes[body_token],
+                'features': [feature.entityToken for feature in reversed(features)]
+            }
+
+    return batch
+
+
+# Deletes the entities of a list of tokens that still exist
+def delete_entities(design, tokens):
+    for token in tokens:
+        entity = find_entity(design, token)
+        if entity is not None:
+            entity.deleteMe()
+
+
 # Make slots from template body
 def make_custom_slots(target_body, points, template_bodies):
     target_component = target_body.parentComponent
@@ -419,6 +1407,7 @@ def transform_along_vector(occurrence, directionVector, magnatude):
 
 
 # Arranges components on a plane with a given spacing
+@profiled()
 def arrange_components(component_slices: List[SliceComponent], plane, spacing, direction_vector):
 
     # app = adsk.core.Application.get()
@@ -458,7 +1447,7 @@ def arrange_components(component_slices: List[SliceComponent], plane, spacing, d
 
 
 class StockSheet:
-    def __init__(self, target_body: adsk.fusion.BRepBody, thickness):
+    def __init__(self, target_body: adsk.fusion.BRepBody, thickness, width=100.0, height=100.0):
         target_comp = get_app_objects()['root_comp']
 
         new_occurrence = target_comp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
@@ -471,7 +1460,7 @@ class StockSheet:
         sketch = sketches.add(new_occurrence.component.xYConstructionPlane)
 
         sketch.sketchCurves.sketchLines.addTwoPointRectangle(sketch.originPoint.geometry,
-                                                             adsk.core.Point3D.create(100, 100, 0))
+                                                             adsk.core.Point3D.create(width, height, 0))
 
         # Get the profile defined by the rectangle
         profile = sketch.profiles.item(0)
@@ -489,6 +1478,8 @@ class StockSheet:
         self.occurrence = new_occurrence
 
         self.end_face = extrude.endFaces[0]
+        self.width = width
+        self.height = height
         # self.end_face = extrude.endFaces[0].createForAssemblyContext(self.occurrence)
 
         # adsk.fusion.Occurrence.cast(target_body).isGrounded = True
@@ -498,6 +1489,149 @@ class StockSheet:
         new_occurrence.isGrounded = True
         new_occurrence.isLightBulbOn = False
 
+    # Stock sheet of an earlier run from its entities, nothing is created
+    @classmethod
+    def from_entities(cls, occurrence, body, end_face, width, height):
+        stock_sheet = cls.__new__(cls)
+        stock_sheet.occurrence = occurrence
+        stock_sheet.body = body
+        stock_sheet.new_component = body.parentComponent
+        stock_sheet.end_face = end_face
+        stock_sheet.width = width
+        stock_sheet.height = height
+        return stock_sheet
+
+
+# Returns the outer loops of the mid section of a slice component in world XY after it was laid flat
+def get_flat_outline(component_slice: SliceComponent, slice_sections):
+    mid_section = slice_sections[component_slice.slice_index][0]
+    return Nesting.flat_outline(mid_section.regions, mid_section.normal, mid_section.offset,
+                                component_slice.occurrence.transform.asArray())
+
+
+# Nests the laid flat slices of every direction on the stock sheet and moves them into place
+# Extra sheets continue to the right of the stock sheet, parts larger than a sheet stay where they are
+# A placement only rotates about Z and moves in the sheet plane, which the planar lay flat joints allow
+@profiled()
+def nest_components(slice_groups, stock_sheet: StockSheet, kerf):
+    component_slices = []
+    parts = []
+
+    for group_slices, slice_sections in slice_groups:
+        for component_slice in group_slices:
+            if component_slice.slice_index is None:
+                continue
+            loops = get_flat_outline(component_slice, slice_sections)
+            if len(loops) > 0:
+                component_slices.append(component_slice)
+                parts.append(loops)
+
+    result = Nesting.nest_parts(parts, stock_sheet.width, stock_sheet.height, kerf, kerf)
+
+    z_axis = adsk.core.Vector3D.create(0, 0, 1)
+    origin = adsk.core.Point3D.create(0, 0, 0)
+
+    for placement in result.placements:
+        matrix = adsk.core.Matrix3D.create()
+        matrix.setToRotation(math.radians(placement.rotation), z_axis, origin)
+        sheet_offset = placement.sheet * (stock_sheet.width + SHEET_SPACING)
+        matrix.translation = adsk.core.Vector3D.create(placement.x + sheet_offset, placement.y, 0)
+
+        occurrence = component_slices[placement.part].occurrence
+        transform = occurrence.transform
+        transform.transformBy(matrix)
+        occurrence.transform = transform
+
+    return result
+
+
+# Lays the slices flat and nests them on the stock sheet by setting occurrence transforms, no joints are created
+# Each transform maps the mid plane of a slice onto the sheet and applies its placement, see Nesting.sheet_transform
+# All transforms are computed before the first occurrence is moved and captured by a single snapshot
+@profiled()
+def lay_flat_direct(slice_groups, stock_sheet: StockSheet, thickness, kerf):
+    component_slices = []
+    sections = []
+    parts = []
+
+    for group_slices, slice_sections in slice_groups:
+        for component_slice in group_slices:
+            if component_slice.slice_index is None:
+                continue
+            mid_section = slice_sections[component_slice.slice_index][0]
+            loops = Nesting.section_outline(mid_section.regions)
+            if len(loops) > 0:
+                component_slices.append(component_slice)
+                sections.append(mid_section)
+                parts.append(loops)
+
+    result = Nesting.nest_parts(parts, stock_sheet.width, stock_sheet.height, kerf, kerf)
+
+    transforms = []
+    for placement in result.placements:
+        mid_section = sections[placement.part]
+        origin = (placement.sheet * (stock_sheet.width + SHEET_SPACING), 0.0, thickness)
+        matrix = Nesting.sheet_transform(mid_section.normal, mid_section.offset, placement, origin, thickness / 2)
+
+        transform = adsk.core.Matrix3D.create()
+        transform.setWithArray(matrix.flatten().tolist())
+        transforms.append((component_slices[placement.part].occurrence, transform))
+
+    # Slice components are created in place, so the new transform replaces the current one
+    for occurrence, transform in transforms:
+        occurrence.transform = transform
+
+    design = get_app_objects()['design']
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType and design.snapshots.hasPendingSnapshot:
+        design.snapshots.add()
+
+    return result
+
+
+# Flat parts of every slice straight from the mesh sections, no components are needed
+# named_sections holds a (name, slice sections) pair per direction in slotting order
+# Slot notches come from the same planned posts the slots are cut with, earlier directions are notched on the top
+# part_holes maps a direction name to the hole loops of each of its slices, for example dowel holes
+def get_cut_parts(named_sections, thickness, part_holes=None):
+    section_groups = [slice_sections for _, slice_sections in named_sections]
+    families = [get_section_family(name, slice_sections) for name, slice_sections in named_sections]
+    plans = SliceFamilies.plan_family_posts(families,
+                                            [[sections[1].regions for sections in slice_sections]
+                                             for slice_sections in section_groups],
+                                            [[sections[2].regions for sections in slice_sections]
+                                             for slice_sections in section_groups], thickness)
+
+    parts = []
+    for (name, slice_sections), family, (posts, use_top) in zip(named_sections, families, plans):
+        notches = CutFiles.slot_notches(posts, len(slice_sections), family.normals, use_top)
+        holes = (part_holes or {}).get(name, [[] for _ in slice_sections])
+        for i, sections in enumerate(slice_sections):
+            part = CutFiles.cut_part(name + '-' + str(i + 1), sections[0].regions, notches[i], holes[i])
+            if len(part.outers) > 0:
+                parts.append(part)
+
+    return parts
+
+
+# Nests the flat parts and writes DXF and SVG cut files, plus G-code when tool settings are given
+# The parts are spaced by at least the tool diameter so the outer tool paths of neighbours never overlap
+# Returns the written file names
+@profiled()
+def export_cut_files(named_sections, thickness, sheet_width, sheet_height, kerf, tool_settings=None, directory=None,
+                     part_holes=None):
+    parts = get_cut_parts(named_sections, thickness, part_holes)
+    spacing = kerf if tool_settings is None else max(kerf, 2 * tool_settings.radius)
+    result = Nesting.nest_parts([part.outers for part in parts], sheet_width, sheet_height, spacing, spacing)
+    directory = directory or CutFiles.default_cut_directory()
+
+    file_names = CutFiles.write_cut_files(parts, result, directory, sheet_width, sheet_height)
+
+    if tool_settings is not None:
+        with profile_span('toolpaths', parts=len(parts)):
+            file_names.extend(Toolpath.write_gcode(parts, result, directory, tool_settings))
+
+    return file_names
+
 
 def create_offset_plane(target_comp, distance, base_plane):
     planes = target_comp.constructionPlanes
@@ -512,8 +1646,45 @@ def create_offset_plane(target_comp, distance, base_plane):
     return planes.add(plane_input)
 
 
+# Offset plane of the last run moved to distance when it is elsewhere, or a new plane when there is none
+# Slices of the last run are placed from the plane and move with it
+# Returns the plane and whether an existing plane had to be moved
+def get_offset_plane(target_comp, distance, base_plane, name, plane=None):
+    if plane is None:
+        plane = create_offset_plane(target_comp, distance, base_plane)
+        plane.name = name
+        plane.isLightBulbOn = False
+        return plane, False
+
+    offset = plane.definition.offset
+    if abs(offset.value - distance) <= PLANE_TOLERANCE:
+        return plane, False
+
+    offset.value = distance
+    return plane, True
+
+
+# Base planes and radial axis of the last run by SlicerDef attribute, see SlicerDef and create_radial_axis
+# Planes are only reused by an incremental run of the body the last run sliced, otherwise this is empty
+# Planes deleted since map to None and are created again
+def get_last_planes(design, state, target_body):
+    if state is None or state['target_body'] != target_body.entityToken:
+        return {}
+
+    last_planes = {name: find_entity(design, state.get(name)) for name in ('x_plane', 'y_plane', 'z_plane')}
+
+    # States written before the radial center plane was stored have no radial planes to reuse
+    if state.get('radial_axis') is not None and state.get('radial_center_plane') is not None:
+        axis_token, reference_token = state['radial_axis'][:2]
+        last_planes['radial'] = (find_entity(design, axis_token), find_entity(design, reference_token),
+                                 find_entity(design, state['radial_center_plane']))
+
+    return last_planes
+
+
 class SlicerDef:
-    def __init__(self, target_body=None, num_x=None, num_y=None, thickness=None, lay_this_flat=None):
+    def __init__(self, target_body=None, num_x=None, num_y=None, thickness=None, lay_this_flat=None,
+                 sheet_width=100.0, sheet_height=100.0, kerf=0.0, num_z=0, num_radial=0, last_planes=None):
         if target_body is not None:
             bounding_box = target_body.boundingBox
 
@@ -521,28 +1692,266 @@ class SlicerDef:
 
             self.target_body = target_body
 
-            self.target_body = target_body
-            self.x_plane = create_offset_plane(target_comp, bounding_box.minPoint.x, target_comp.yZConstructionPlane)
-            self.x_plane.name = 'X_Zero_Plane'
-            self.x_plane.isLightBulbOn = False
-
-            self.y_plane = create_offset_plane(target_comp, bounding_box.minPoint.y, target_comp.xZConstructionPlane)
-            self.y_plane.name = 'Y_Zero_Plane'
-            self.y_plane.isLightBulbOn = False
+            # Base planes of the last run given in last_planes are reused, see get_last_planes
+            # moved_planes is set when one of them had to follow the body
+            last_planes = last_planes or {}
+            self.x_plane, x_moved = get_offset_plane(target_comp, bounding_box.minPoint.x,
+                                                     target_comp.yZConstructionPlane, 'X_Zero_Plane',
+                                                     last_planes.get('x_plane'))
+            self.y_plane, y_moved = get_offset_plane(target_comp, bounding_box.minPoint.y,
+                                                     target_comp.xZConstructionPlane, 'Y_Zero_Plane',
+                                                     last_planes.get('y_plane'))
+
+            # Stacked horizontal layers
+            self.z_plane, z_moved = get_offset_plane(target_comp, bounding_box.minPoint.z,
+                                                     target_comp.xYConstructionPlane, 'Z_Zero_Plane',
+                                                     last_planes.get('z_plane'))
+            self.moved_planes = x_moved or y_moved or z_moved
+
+            # Fan of slices about the vertical axis through the bounding box center
+            self.radial_axis = None
+            if num_radial > 0:
+                self.radial_axis, radial_moved = create_radial_axis(target_comp, get_radial_center(bounding_box),
+                                                                    last_planes)
+                self.moved_planes = self.moved_planes or radial_moved
 
             self.x_spacing = (bounding_box.maxPoint.x - bounding_box.minPoint.x) / (num_x + 1)
             self.y_spacing = (bounding_box.maxPoint.y - bounding_box.minPoint.y) / (num_y + 1)
+            self.z_spacing = (bounding_box.maxPoint.z - bounding_box.minPoint.z) / (num_z + 1)
+            self.num_x = num_x
+            self.num_y = num_y
+            self.num_z = num_z
+            self.num_radial = num_radial
+
+            # Mid plane distance of each slice from its base plane, see adapt_slice_spacing
+            self.x_distances = [i * self.x_spacing for i in range(1, num_x + 1)]
+            self.y_distances = [i * self.y_spacing for i in range(1, num_y + 1)]
+            self.z_distances = [i * self.z_spacing for i in range(1, num_z + 1)]
 
             self.x_component_slices = []
             self.y_component_slices = []
+            self.z_component_slices = []
+            self.radial_component_slices = []
+
+            # Mesh sections of each slice, their outlines are nested on the stock sheet
+            self.x_sections = []
+            self.y_sections = []
+            self.z_sections = []
+            self.radial_sections = []
+            self.kerf = kerf
+            self.sheet_width = sheet_width
+            self.sheet_height = sheet_height
 
             self.thickness = thickness
 
+            # Feature counts of batched slot cuts, see make_slots_batched
+            self.slot_batches = []
+
+            # Write a Chrome trace of the profiled functions after each stage, see write_profile
+            self.write_profile = False
+
+            # Position the flat parts with transforms instead of planar joints, see lay_flat_direct
+            self.joint_free = False
+
+            # Deferred compute and fast slices are off unless the inputs ask for them
+            self.slice_mode = SliceMode()
+
+            # Tessellate once so every slice can be classified without kernel queries
+            if MeshSection is not None:
+                with profile_span('tessellate', tolerance=MESH_TOLERANCE):
+                    self.mesh = get_cached_mesh(target_body, MESH_TOLERANCE)
+            else:
+                self.mesh = None
+
             if lay_this_flat:
-                self.stock_sheet = StockSheet(target_body, thickness)
+                self.stock_sheet = StockSheet(target_body, thickness, sheet_width, sheet_height)
             else:
                 self.stock_sheet = None
 
+
+# Component slices and mesh sections of every direction, the slice groups lay flat and nesting work on
+def get_slice_groups(slicer_def: SlicerDef):
+    return [(slicer_def.x_component_slices, slicer_def.x_sections),
+            (slicer_def.y_component_slices, slicer_def.y_sections),
+            (slicer_def.z_component_slices, slicer_def.z_sections),
+            (slicer_def.radial_component_slices, slicer_def.radial_sections)]
+
+
+def write_profile(slicer_def: SlicerDef):
+    """
+    Writes the spans collected so far as a Chrome trace when requested for this run
+    :return: The trace file name or None
+    """
+    if not slicer_def.write_profile:
+        return None
+
+    PROFILER.set('slot_features', sum(batch.features for batch in slicer_def.slot_batches))
+    PROFILER.set('unbatched_slot_features', sum(batch.unbatched_features for batch in slicer_def.slot_batches))
+
+    return PROFILER.write_chrome_trace()
+
+
+# Entity tokens and settings of a SlicerDef, everything the lay flat command needs to continue later
+def get_slicer_state(slicer_def: SlicerDef):
+    def slice_tokens(component_slices):
+        return [[component_slice.occurrence.entityToken, component_slice.end_face.entityToken,
+                 component_slice.slice_index] for component_slice in component_slices]
+
+    state = {
+        'target_body': slicer_def.target_body.entityToken,
+        'x_plane': slicer_def.x_plane.entityToken,
+        'y_plane': slicer_def.y_plane.entityToken,
+        'z_plane': slicer_def.z_plane.entityToken if slicer_def.z_plane is not None else None,
+        'radial_axis': None,
+        'radial_center_plane': None,
+        'num_x': slicer_def.num_x,
+        'num_y': slicer_def.num_y,
+        'num_z': slicer_def.num_z,
+        'num_radial': slicer_def.num_radial,
+        'x_spacing': slicer_def.x_spacing,
+        'y_spacing': slicer_def.y_spacing,
+        'z_spacing': slicer_def.z_spacing,
+        'x_distances': slicer_def.x_distances,
+        'y_distances': slicer_def.y_distances,
+        'z_distances': slicer_def.z_distances,
+        'thickness': slicer_def.thickness,
+        'kerf': slicer_def.kerf,
+        'sheet_width': slicer_def.sheet_width,
+        'sheet_height': slicer_def.sheet_height,
+        'joint_free': slicer_def.joint_free,
+        'write_profile': slicer_def.write_profile,
+        'x_slices': slice_tokens(slicer_def.x_component_slices),
+        'y_slices': slice_tokens(slicer_def.y_component_slices),
+        'z_slices': slice_tokens(slicer_def.z_component_slices),
+        'radial_slices': slice_tokens(slicer_def.radial_component_slices),
+        'stock_sheet': None
+    }
+
+    if slicer_def.radial_axis is not None:
+        state['radial_axis'] = [slicer_def.radial_axis.axis.entityToken,
+                                slicer_def.radial_axis.reference_plane.entityToken, list(slicer_def.radial_axis.center)]
+        if slicer_def.radial_axis.center_plane is not None:
+            state['radial_center_plane'] = slicer_def.radial_axis.center_plane.entityToken
+
+    if slicer_def.stock_sheet is not None:
+        state['stock_sheet'] = [slicer_def.stock_sheet.occurrence.entityToken,
+                                slicer_def.stock_sheet.body.entityToken,
+                                slicer_def.stock_sheet.end_face.entityToken]
+
+    return state
+
+
+def write_slicer_def(design, slicer_def: SlicerDef):
+    design.attributes.add(ATTRIBUTE_GROUP, SLICER_DEF_ATTRIBUTE, json.dumps(get_slicer_state(slicer_def)))
+
+
+# Returns the state written by the last run or None
+def read_slicer_state(design):
+    attribute = design.attributes.itemByName(ATTRIBUTE_GROUP, SLICER_DEF_ATTRIBUTE)
+    if attribute is None:
+        return None
+
+    return json.loads(attribute.value)
+
+
+# Resolves many entity tokens in one pass, tokens of deleted entities map to None
+def find_entities(design, tokens):
+    return {token: find_entity(design, token) for token in set(tokens) if token is not None}
+
+
+# Rebuilds the SlicerDef of the last run from the design, so lay flat works after a restart, undo or document switch
+# Slices that were deleted since are left out, returns None when the source body or base planes are gone
+# Sections come from the mesh again, the section cache makes that a disk read
+def read_slicer_def(design):
+    state = read_slicer_state(design)
+    if state is None:
+        return None
+
+    # States written before Z and radial slices have neither
+    state.setdefault('z_plane', None)
+    state.setdefault('radial_axis', None)
+    state.setdefault('radial_center_plane', None)
+    state.setdefault('num_z', 0)
+    state.setdefault('num_radial', 0)
+    state.setdefault('z_spacing', 0.0)
+    state.setdefault('z_slices', [])
+    state.setdefault('radial_slices', [])
+
+    tokens = [state['target_body'], state['x_plane'], state['y_plane'], state['z_plane']] + \
+        (state['stock_sheet'] or []) + (state['radial_axis'] or [])[:2] + [state['radial_center_plane']]
+    for occurrence_token, end_face_token, _ in state['x_slices'] + state['y_slices'] + state['z_slices'] + \
+            state['radial_slices']:
+        tokens.extend((occurrence_token, end_face_token))
+    entities = find_entities(design, tokens)
+
+    slicer_def = SlicerDef()
+    slicer_def.target_body = entities.get(state['target_body'])
+    slicer_def.x_plane = entities.get(state['x_plane'])
+    slicer_def.y_plane = entities.get(state['y_plane'])
+    if slicer_def.target_body is None or slicer_def.x_plane is None or slicer_def.y_plane is None:
+        return None
+
+    for name in ('num_x', 'num_y', 'num_z', 'num_radial', 'x_spacing', 'y_spacing', 'z_spacing', 'thickness',
+                 'kerf', 'sheet_width', 'sheet_height', 'joint_free', 'write_profile'):
+        setattr(slicer_def, name, state[name])
+
+    # Z and radial slices are left out when their base plane or axis is gone
+    slicer_def.z_plane = entities.get(state['z_plane'])
+    if slicer_def.z_plane is None:
+        slicer_def.num_z = 0
+
+    slicer_def.radial_axis = None
+    if state['radial_axis'] is not None:
+        axis_token, reference_token, center = state['radial_axis']
+        if entities.get(axis_token) is not None and entities.get(reference_token) is not None:
+            slicer_def.radial_axis = RadialAxis(entities[axis_token], entities[reference_token],
+                                                entities.get(state['radial_center_plane']), tuple(center))
+    if slicer_def.radial_axis is None:
+        slicer_def.num_radial = 0
+
+    # States written before adaptive spacing hold evenly spaced slices
+    slicer_def.x_distances = state.get('x_distances') or [i * slicer_def.x_spacing
+                                                          for i in range(1, slicer_def.num_x + 1)]
+    slicer_def.y_distances = state.get('y_distances') or [i * slicer_def.y_spacing
+                                                          for i in range(1, slicer_def.num_y + 1)]
+    slicer_def.z_distances = [i * slicer_def.z_spacing for i in range(1, slicer_def.num_z + 1)]
+    if slicer_def.z_plane is not None and state.get('z_distances'):
+        slicer_def.z_distances = state['z_distances']
+
+    def component_slices(slice_tokens):
+        return [SliceComponent(entities[occurrence_token], entities[end_face_token], slice_index)
+                for occurrence_token, end_face_token, slice_index in slice_tokens
+                if entities.get(occurrence_token) is not None and entities.get(end_face_token) is not None]
+
+    slicer_def.x_component_slices = component_slices(state['x_slices'])
+    slicer_def.y_component_slices = component_slices(state['y_slices'])
+    slicer_def.z_component_slices = component_slices(state['z_slices'])
+    slicer_def.radial_component_slices = component_slices(state['radial_slices'])
+    slicer_def.slot_batches = []
+
+    slicer_def.stock_sheet = None
+    if state['stock_sheet'] is not None:
+        occurrence, body, end_face = (entities.get(token) for token in state['stock_sheet'])
+        if occurrence is not None and body is not None and end_face is not None:
+            slicer_def.stock_sheet = StockSheet.from_entities(occurrence, body, end_face, state['sheet_width'],
+                                                              state['sheet_height'])
+
+    slicer_def.x_sections = []
+    slicer_def.y_sections = []
+    slicer_def.z_sections = []
+    slicer_def.radial_sections = []
+    slicer_def.mesh = None
+    if MeshSection is not None:
+        with profile_span('tessellate', tolerance=MESH_TOLERANCE):
+            slicer_def.mesh = get_cached_mesh(slicer_def.target_body, MESH_TOLERANCE)
+
+        slicer_def.x_sections, slicer_def.y_sections, slicer_def.z_sections, slicer_def.radial_sections = \
+            get_family_sections(slicer_def.mesh, get_slice_families(slicer_def), slicer_def.thickness)
+
+    return slicer_def
+
+
+@profiled()
 def lay_flat(component_slices: List[SliceComponent], stock_sheet: StockSheet):
 
     # Get the root component of the active design
@@ -585,7 +1994,19 @@ class FusionSlicerLTCommand(Fusion360CommandBase):
     # Run whenever a user makes any change to a value or selection in the addin UI
     # Commands in here will be run through the Fusion processor and changes will be reflected in  Fusion graphics area
     def on_preview(self, command, inputs, args, input_values):
-        pass
+        global PREVIEW_GRAPHICS
+
+        if PREVIEW_GRAPHICS is not None and PREVIEW_GRAPHICS.isValid:
+            PREVIEW_GRAPHICS.deleteMe()
+        PREVIEW_GRAPHICS = None
+
+        if MeshSection is None or not input_values['show_preview'] or 'target_input' not in input_values:
+            return
+
+        PREVIEW_GRAPHICS = draw_slice_preview(input_values['target_input'][0], input_values['x_qty'],
+                                              input_values['y_qty'], input_values['slice_thickness'],
+                                              input_values['adaptive_spacing'], input_values['z_qty'],
+                                              input_values['radial_qty'], input_values['stacked_layers'])
 
     # Run when any input is changed.
     # Can be used to check a value and then update the add-in UI accordingly
@@ -605,24 +2026,95 @@ class FusionSlicerLTCommand(Fusion360CommandBase):
         # Get the target body
         target_body = input_values['target_input'][0]
 
+        # Only an incremental run of the body the last run sliced picks up its base planes and slices
+        last_planes = {}
+        if input_values['incremental']:
+            last_planes = get_last_planes(app_objects['design'], read_slicer_state(app_objects['design']),
+                                          target_body)
+
         # Start Feature group
         start_index = futil.start_group()
 
-        SLICERDEF = SlicerDef(target_body, input_values['x_qty'], input_values['y_qty'],
-                              input_values['slice_thickness'], input_values['lay_flat'])
+        PROFILER.reset()
+
+        # Z and radial slices need the mesh sections to be slotted
+        num_z = input_values['z_qty'] if MeshSection is not None else 0
+        num_radial = input_values['radial_qty'] if MeshSection is not None else 0
+
+        # Stacked layers are the only slices, they are pinned with dowels instead of slotted
+        stacked = input_values['stacked_layers'] and MeshSection is not None
+        num_x = input_values['x_qty'] if not stacked else 0
+        num_y = input_values['y_qty'] if not stacked else 0
+        if stacked:
+            num_radial = 0
+
+        SLICERDEF = SlicerDef(target_body, num_x, num_y, input_values['slice_thickness'], input_values['lay_flat'],
+                              input_values['sheet_width'], input_values['sheet_height'], input_values['kerf'], num_z,
+                              num_radial, last_planes)
+        SLICERDEF.write_profile = input_values['write_profile']
+        SLICERDEF.joint_free = input_values['joint_free']
+        SLICERDEF.slice_mode = SliceMode(input_values['defer_compute'], input_values['fast_slices'])
+
+        if stacked:
+            stack_layers(SLICERDEF)
+        elif input_values['adaptive_spacing'] and SLICERDEF.mesh is not None:
+            adapt_slice_spacing(SLICERDEF)
+
+        # Section the mesh for all slices of every direction up front, in one batched pass
+        x_sections, y_sections, z_sections, radial_sections = [], [], [], []
+        if SLICERDEF.mesh is not None:
+            x_sections, y_sections, z_sections, radial_sections = get_family_sections(
+                SLICERDEF.mesh, get_slice_families(SLICERDEF), input_values['slice_thickness'],
+                input_values['parallel'])
+
+        if SLICERDEF.mesh is not None:
+            # In incremental mode slices of the last run on this body are reused where their geometry has not changed
+            design = app_objects['design']
+            header, old_records = read_manifest(design) if len(last_planes) > 0 else ({}, [])
+
+            # Slots cut one feature per post are not tracked and slices move with their base planes, so the slices
+            # of a run with untracked slots or of a body whose base planes moved are all rebuilt
+            if not header.get('batched_slots') or SLICERDEF.moved_planes:
+                old_records = [record._replace(geometry_hash=None) for record in old_records]
+
+            x_component_slices, x_face_slices, x_records = update_slices(target_body, SLICERDEF.x_plane,
+                                                                         input_values['slice_thickness'], 'X_Slice',
+                                                                         x_sections, old_records,
+                                                                         mode=SLICERDEF.slice_mode)
+
+            y_component_slices, y_face_slices, y_records = update_slices(target_body, SLICERDEF.y_plane,
+                                                                         input_values['slice_thickness'], 'Y_Slice',
+                                                                         y_sections, old_records,
+                                                                         mode=SLICERDEF.slice_mode)
+
+            z_component_slices, z_face_slices, z_records = update_slices(target_body, SLICERDEF.z_plane,
+                                                                         input_values['slice_thickness'], 'Z_Slice',
+                                                                         z_sections, old_records,
+                                                                         mode=SLICERDEF.slice_mode)
+
+            radial_component_slices, radial_face_slices, radial_records = update_slices(
+                target_body, None, input_values['slice_thickness'], 'R_Slice', radial_sections, old_records,
+                SLICERDEF.radial_axis, SLICERDEF.slice_mode)
+
+        else:
+            # Make X Slices
+            x_component_slices, x_face_slices = create_slices2(target_body, SLICERDEF.x_spacing,
+                                                               num_x, SLICERDEF.x_plane,
+                                                               input_values['slice_thickness'], 'X_Slice',
+                                                               mode=SLICERDEF.slice_mode)
 
-        # Make X Slices
-        x_component_slices, x_face_slices = create_slices2(target_body, SLICERDEF.x_spacing, input_values['x_qty'],
-                                                           SLICERDEF.x_plane, input_values['slice_thickness'],
-                                                           'X_Slice')
+            # Make Y Slices
+            y_component_slices, y_face_slices = create_slices2(target_body, SLICERDEF.y_spacing,
+                                                               num_y, SLICERDEF.y_plane,
+                                                               input_values['slice_thickness'], 'Y_Slice',
+                                                               mode=SLICERDEF.slice_mode)
 
-        # Make Y Slices
-        y_component_slices, y_face_slices = create_slices2(target_body, SLICERDEF.y_spacing, input_values['y_qty'],
-                                                           SLICERDEF.y_plane, input_values['slice_thickness'],
-                                                           'Y_Slice')
+            z_component_slices, radial_component_slices = [], []
 
         custom_slots = False
 
+        layer_holes = []
+
         if custom_slots:
 
             top_points, bottom_points = make_posts(x_face_slices, y_face_slices)
@@ -631,6 +2123,32 @@ class FusionSlicerLTCommand(Fusion360CommandBase):
             top_points, bottom_points = make_posts(y_face_slices, x_face_slices)
             make_custom_slots(target_body, bottom_points, input_values['y_template'])
 
+        elif SLICERDEF.mesh is not None:
+            # Posts of every pair of crossing directions in one pass, X slices are notched on the top
+            slot_tables = make_family_posts([x_face_slices, y_face_slices, z_face_slices, radial_face_slices],
+                                            [x_sections, y_sections, z_sections, radial_sections],
+                                            input_values['slice_thickness'])
+            slice_records = [x_records, y_records, z_records, radial_records]
+
+            # Stacked layers cross no other slices, their dowel holes are cut where the slots would be
+            if stacked:
+                layer_holes = get_layer_holes(z_sections, input_values['dowel_diameter'])
+                slot_tables[2] = make_dowel_posts(z_face_slices, z_sections, layer_holes,
+                                                  input_values['dowel_diameter'])
+
+            # Incremental runs always use batched slots, they are tracked per body in the manifest
+            # Dowel holes are only drawn by batched slots
+            batched_slots = input_values['batch_slots'] or input_values['incremental'] or stacked
+            if batched_slots:
+                SLICERDEF.slot_batches = [recut_slots(slot_table, input_values['slice_thickness'], records)
+                                          for slot_table, records in zip(slot_tables, slice_records)]
+            else:
+                for slot_table in slot_tables:
+                    make_slots(target_body, get_post_points(slot_table), input_values['slice_thickness'])
+
+            write_manifest(design, [record for records in slice_records for record in records],
+                           {'batched_slots': batched_slots})
+
         else:
             top_points, bottom_points = make_posts(x_face_slices, y_face_slices)
             make_slots(target_body, top_points, input_values['slice_thickness'],
@@ -649,11 +2167,46 @@ class FusionSlicerLTCommand(Fusion360CommandBase):
 
         SLICERDEF.y_component_slices = y_component_slices
 
+        SLICERDEF.z_component_slices = z_component_slices
+
+        SLICERDEF.radial_component_slices = radial_component_slices
+
+        # Compare create_slice in the trace of a deferred and an eager run
+        PROFILER.set('deferred_compute', int(input_values['defer_compute']))
+
+        if SLICERDEF.mesh is not None:
+            SLICERDEF.x_sections = x_sections
+            SLICERDEF.y_sections = y_sections
+            SLICERDEF.z_sections = z_sections
+            SLICERDEF.radial_sections = radial_sections
+
+        # The lay flat command reads this back instead of relying on SLICERDEF still being valid
+        write_slicer_def(app_objects['design'], SLICERDEF)
+
+        if (input_values['cut_files'] or input_values['gcode']) and SLICERDEF.mesh is not None:
+            tool_settings = None
+            if input_values['gcode']:
+                tool_settings = Toolpath.ToolSettings(input_values['tool_diameter'] / 2,
+                                                      input_values['slice_thickness'] + CUT_OVERCUT)
+
+            dowel_loops = [StackedLayers.hole_loops(centers, input_values['dowel_diameter'] / 2)
+                           for centers in layer_holes]
+
+            file_names = export_cut_files([('X_Slice', x_sections), ('Y_Slice', y_sections),
+                                           ('Z_Slice', z_sections), ('R_Slice', radial_sections)],
+                                          input_values['slice_thickness'], input_values['sheet_width'],
+                                          input_values['sheet_height'], input_values['kerf'], tool_settings,
+                                          part_holes={'Z_Slice': dowel_loops} if stacked else None)
+            if len(file_names) > 0:
+                ui.messageBox('Cut files written to:\n' + os.path.dirname(file_names[0]))
+
         # Todo needs to be a new command.  Need to do it with tagging
 
         # End Feature Group
         futil.end_group(start_index)
 
+        write_profile(SLICERDEF)
+
     def on_destroy(self, command, inputs, reason, input_values):
 
         if input_values['lay_flat']:
@@ -689,8 +2242,57 @@ class FusionSlicerLTCommand(Fusion360CommandBase):
         # body_select.addSelectionFilter('SolidBodies')
         # body_select.setSelectionLimits(1, 1)
 
+        # Stacked horizontal layers and a fan of slices about the vertical center axis, requires numpy
+        command_inputs.addIntegerSpinnerCommandInput('z_qty', 'Z Quantity', 0, 1000, 1, 0)
+        command_inputs.addIntegerSpinnerCommandInput('radial_qty', 'Radial Quantity', 0, 1000, 1, 0)
+
+        # Horizontal layers of the slice thickness pinned with dowels instead of slotted slices, requires numpy
+        command_inputs.addBoolValueInput('stacked_layers', 'Stacked Layers?', True, '', False)
+        command_inputs.addValueInput('dowel_diameter', 'Dowel Diameter', 'in',
+                                     adsk.core.ValueInput.createByString('.25 in'))
+
         command_inputs.addBoolValueInput('lay_flat', 'Lay Parts Flat?', True, '', False)
 
+        # Same number of slices, placed closer together where the shape changes most, requires numpy
+        command_inputs.addBoolValueInput('adaptive_spacing', 'Adaptive Spacing?', True, '', False)
+
+        # Stock sheet the flat parts are nested on, more sheets are used when the parts do not fit
+        command_inputs.addValueInput('sheet_width', 'Sheet Width', 'in', adsk.core.ValueInput.createByString('48 in'))
+        command_inputs.addValueInput('sheet_height', 'Sheet Height', 'in', adsk.core.ValueInput.createByString('24 in'))
+        command_inputs.addValueInput('kerf', 'Part Spacing', 'in', adsk.core.ValueInput.createByString('.125 in'))
+
+        # Move the flat parts into place without joints, requires numpy
+        command_inputs.addBoolValueInput('joint_free', 'Lay Flat Without Joints?', True, '', False)
+
+        # Slice outlines drawn from a cached mesh while inputs change, requires numpy
+        command_inputs.addBoolValueInput('show_preview', 'Preview Slices?', True, '', False)
+
+        # Sections are computed in worker processes, requires numpy
+        command_inputs.addBoolValueInput('parallel', 'Parallel Sections?', True, '', False)
+
+        # One sketch and cut per slice body instead of one per slot, requires numpy
+        command_inputs.addBoolValueInput('batch_slots', 'Batch Slot Cuts?', True, '', False)
+
+        # Reuse the slices of the last run that did not change, requires numpy
+        command_inputs.addBoolValueInput('incremental', 'Update Previous Slices?', True, '', False)
+
+        # DXF and SVG files of the nested slices with slot notches and engraved names, requires numpy
+        command_inputs.addBoolValueInput('cut_files', 'Write Cut Files?', True, '', False)
+
+        # CNC router programs of the same sheets, the tool runs outside the parts and relieves slot corners
+        command_inputs.addBoolValueInput('gcode', 'Write G-code?', True, '', False)
+        command_inputs.addValueInput('tool_diameter', 'Tool Diameter', 'in',
+                                     adsk.core.ValueInput.createByString('.125 in'))
+
+        # Solve the sketches of each slice together and skip timeline rolls
+        command_inputs.addBoolValueInput('defer_compute', 'Defer Compute?', True, '', False)
+
+        # Fast, non-parametric slices from in-memory booleans, slab sides follow the body surface
+        command_inputs.addBoolValueInput('fast_slices', 'Fast Non-Parametric Slices?', True, '', False)
+
+        # Chrome trace of where the time went, written to the Fusion360DebugUtilities folder
+        command_inputs.addBoolValueInput('write_profile', 'Write Performance Trace?', True, '', False)
+
 
 # Lite version of Fusion 360 Slicer
 class FusionSlicerLTCommand2(Fusion360CommandBase):
@@ -713,14 +2315,45 @@ class FusionSlicerLTCommand2(Fusion360CommandBase):
         # for joint in joints:
         #     joint.deleteMe()
 
-        lay_flat(SLICERDEF.x_component_slices, SLICERDEF.stock_sheet)
-        lay_flat(SLICERDEF.y_component_slices, SLICERDEF.stock_sheet)
+        app_objects = get_app_objects()
+        SLICERDEF = read_slicer_def(app_objects['design'])
+
+        if SLICERDEF is None:
+            app_objects['ui'].messageBox('No slices found in this design, run Fusion Slicer LT first')
+            return
+
+        PROFILER.reset()
+
+        # Lay flat can run after a slicing run without a stock sheet
+        if SLICERDEF.stock_sheet is None:
+            SLICERDEF.stock_sheet = StockSheet(SLICERDEF.target_body, SLICERDEF.thickness, SLICERDEF.sheet_width,
+                                               SLICERDEF.sheet_height)
+            write_slicer_def(app_objects['design'], SLICERDEF)
+
+        slice_groups = get_slice_groups(SLICERDEF)
+        has_sections = Nesting is not None and sum(len(slice_sections) for _, slice_sections in slice_groups) > 0
+
+        # Transforms only, the joints below are what breaks the snapshot
+        if SLICERDEF.joint_free and has_sections:
+            lay_flat_direct(slice_groups, SLICERDEF.stock_sheet, SLICERDEF.thickness, SLICERDEF.kerf)
+            write_profile(SLICERDEF)
+            return
+
+        for component_slices, _ in slice_groups:
+            lay_flat(component_slices, SLICERDEF.stock_sheet)
+
+        # Nest the actual slice outlines when the mesh sections are available
+        if has_sections:
+            nest_components(slice_groups, SLICERDEF.stock_sheet, SLICERDEF.kerf)
+
+        else:
+            direction_vector = adsk.core.Vector3D.create(1, 0, 0)
+            arrange_components(SLICERDEF.x_component_slices, SLICERDEF.stock_sheet.end_face, 1.0, direction_vector)
 
-        direction_vector = adsk.core.Vector3D.create(1, 0, 0)
-        arrange_components(SLICERDEF.x_component_slices, SLICERDEF.stock_sheet.end_face, 1.0, direction_vector)
+            direction_vector = adsk.core.Vector3D.create(0, 1, 0)
+            arrange_components(SLICERDEF.y_component_slices, SLICERDEF.stock_sheet.end_face, 1.0, direction_vector)
 
-        direction_vector = adsk.core.Vector3D.create(0, 1, 0)
-        arrange_components(SLICERDEF.y_component_slices, SLICERDEF.stock_sheet.end_face, 1.0, direction_vector)
+        write_profile(SLICERDEF)
 
 
         # design.snapshots.add()
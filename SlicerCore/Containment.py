@@ -0,0 +1,119 @@
+import numpy as np
+
+# Grid cells along the longest side of the body
+GRID_CELLS = 64
+
+# Fraction of a cell the column sample points are moved off the cell centers, so rays miss mesh edges and vertices
+RAY_JITTER = (0.0131, 0.0173)
+
+
+class ContainmentGrid:
+    """
+    Occupancy grid of a closed triangle mesh answering point containment for many points in one vectorized call
+    Cells are filled by casting one ray per column along z and toggling at every crossing. Cells the surface can
+    reach are left unknown, so every answered point is at least the mesh tolerance away from the body surface.
+    Columns with an odd number of crossings, where a ray grazed the mesh, are unknown as a whole.
+    """
+    def __init__(self, vertices, faces, tolerance=0.0, cells=GRID_CELLS):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+
+        if len(faces) == 0:
+            self.lo = np.zeros(3)
+            self.size = 1.0
+            self.inside = np.zeros((1, 1, 1), dtype=bool)
+            self.known = np.ones((1, 1, 1), dtype=bool)
+            return
+
+        margin = tolerance + 1e-9
+        lo = vertices.min(axis=0) - margin
+        hi = vertices.max(axis=0) + margin
+        self.size = float((hi - lo).max() / cells)
+        self.lo = lo
+        shape = np.maximum(np.ceil((hi - lo) / self.size).astype(np.int64), 1)
+
+        triangles = vertices[faces]
+        self.inside = self._fill(triangles, shape)
+        self.known = ~self._near_surface(triangles, shape, tolerance)
+
+    # Parity fill from one ray per column, a crossing toggles every cell whose center is above it
+    def _fill(self, triangles, shape):
+        toggles = np.zeros((shape[0], shape[1], shape[2] + 1), dtype=np.int64)
+
+        jitter = np.asarray(RAY_JITTER) * self.size
+        first = np.ceil((triangles[:, :, :2].min(axis=1) - self.lo[:2] - jitter) / self.size - 0.5)
+        last = np.floor((triangles[:, :, :2].max(axis=1) - self.lo[:2] - jitter) / self.size - 0.5)
+        first = np.maximum(first, 0).astype(np.int64)
+        last = np.minimum(last, shape[:2] - 1).astype(np.int64)
+        counts = np.maximum(last - first + 1, 0)
+        totals = counts[:, 0] * counts[:, 1]
+
+        # Every column whose ray falls in the bounding box of a triangle
+        owners = np.repeat(np.arange(len(triangles)), totals)
+        local = np.arange(int(totals.sum())) - np.repeat(np.cumsum(totals) - totals, totals)
+        rows = first[owners, 0] + local // np.maximum(counts[owners, 1], 1)
+        cols = first[owners, 1] + local % np.maximum(counts[owners, 1], 1)
+
+        x = self.lo[0] + (rows + 0.5) * self.size + jitter[0]
+        y = self.lo[1] + (cols + 0.5) * self.size + jitter[1]
+
+        a, b, c = triangles[owners, 0], triangles[owners, 1], triangles[owners, 2]
+        denominator = (b[:, 1] - c[:, 1]) * (a[:, 0] - c[:, 0]) + (c[:, 0] - b[:, 0]) * (a[:, 1] - c[:, 1])
+        flat = np.abs(denominator) < 1e-18
+        denominator = np.where(flat, 1.0, denominator)
+        u = ((b[:, 1] - c[:, 1]) * (x - c[:, 0]) + (c[:, 0] - b[:, 0]) * (y - c[:, 1])) / denominator
+        v = ((c[:, 1] - a[:, 1]) * (x - c[:, 0]) + (a[:, 0] - c[:, 0]) * (y - c[:, 1])) / denominator
+        hit = ~flat & (u >= 0) & (v >= 0) & (u + v <= 1)
+
+        z = u[hit] * a[hit, 2] + v[hit] * b[hit, 2] + (1 - u[hit] - v[hit]) * c[hit, 2]
+        above = np.clip(np.ceil((z - self.lo[2]) / self.size - 0.5), 0, shape[2]).astype(np.int64)
+        np.add.at(toggles, (rows[hit], cols[hit], above), 1)
+
+        crossings = toggles.sum(axis=2)
+        self.odd_columns = crossings % 2 == 1
+
+        return (np.cumsum(toggles, axis=2)[:, :, :-1] % 2 == 1) & ~self.odd_columns[:, :, None]
+
+    # Cells the bounding box of a triangle grown by the tolerance touches, and every cell of an odd column
+    def _near_surface(self, triangles, shape, tolerance):
+        near = np.zeros(tuple(shape), dtype=bool)
+
+        first = np.floor((triangles.min(axis=1) - tolerance - self.lo) / self.size).astype(np.int64)
+        last = np.floor((triangles.max(axis=1) + tolerance - self.lo) / self.size).astype(np.int64)
+        first = np.clip(first, 0, shape - 1)
+        last = np.clip(last, 0, shape - 1)
+        counts = last - first + 1
+        totals = counts.prod(axis=1)
+
+        owners = np.repeat(np.arange(len(triangles)), totals)
+        local = np.arange(int(totals.sum())) - np.repeat(np.cumsum(totals) - totals, totals)
+        steps = counts[owners]
+        i = first[owners, 0] + local // (steps[:, 1] * steps[:, 2])
+        j = first[owners, 1] + (local // steps[:, 2]) % steps[:, 1]
+        k = first[owners, 2] + local % steps[:, 2]
+        near[i, j, k] = True
+
+        near |= self.odd_columns[:, :, None]
+        return near
+
+    def classify(self, points):
+        """
+        Classifies points as inside or outside the body where the grid is sure
+        Points outside the grid are outside the body.
+        :param points: Points (n, 3) in the mesh coordinates
+        :return: Boolean arrays (contained, matched) like MeshSection.classify_profiles. Unmatched points are too
+                 close to the surface and should be resolved by an exact query.
+        :rtype: tuple
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        cells = np.floor((points - self.lo) / self.size).astype(np.int64)
+        in_grid = np.all((cells >= 0) & (cells < self.inside.shape), axis=1)
+
+        contained = np.zeros(len(points), dtype=bool)
+        matched = ~in_grid
+
+        i, j, k = cells[in_grid].T
+        contained[in_grid] = self.inside[i, j, k]
+        matched[in_grid] = self.known[i, j, k]
+
+        return contained & matched, matched
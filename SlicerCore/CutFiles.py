@@ -0,0 +1,231 @@
+import os
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from . import MeshSection
+from .Nesting import apply_placement
+from .SlotPlanner import notched_ends
+
+# One flat part in its section plane basis. outers and holes are the material loops, slots the slot notch loops.
+CutPart = namedtuple('CutPart', ('name', 'outers', 'holes', 'slots'))
+
+# Layers of the cut files, inner loops and slots are kept apart from outer loops so they can be cut first
+CUT_OUTER = 'CUT_OUTER'
+CUT_INNER = 'CUT_INNER'
+CUT_SLOT = 'CUT_SLOT'
+ENGRAVE = 'ENGRAVE'
+
+# DXF color index and SVG stroke of every layer
+LAYER_COLORS = {CUT_OUTER: (1, '#ff0000'), CUT_INNER: (5, '#0000ff'), CUT_SLOT: (3, '#00a000'),
+                ENGRAVE: (7, '#000000')}
+
+# Largest label height in cm, labels of small parts are scaled down to fit
+LABEL_HEIGHT = 0.5
+
+
+def default_cut_directory():
+    """
+    Returns the cut file directory in the home folder, next to the section cache
+    :rtype: str
+    """
+    return os.path.join(os.path.expanduser('~'), 'FusionSlicerLT', 'CutFiles')
+
+
+def cut_part(name, regions, slots=(), holes=()):
+    """
+    Collects the loops of one slice from its mid section regions
+    :param name: Label engraved on the part, for example X_Slice-3
+    :param regions: Section regions in the plane basis
+    :param slots: Slot notch loops in the plane basis, see slot_notches
+    :param holes: Drilled hole loops in the plane basis cut with the section holes, for example dowel holes
+    :rtype: CutPart
+    """
+    outers = []
+    holes = list(holes)
+
+    for region in regions:
+        if region.is_material:
+            outers.append(region.outer)
+            holes.extend(region.holes)
+
+    return CutPart(name, outers, holes, list(slots))
+
+
+def slot_notches(posts, target_count, target_normals, use_top):
+    """
+    Slot notch rectangles of every target slice in its plane basis, the geometry make_slots cuts
+    Every post gives one notch as wide as its slot. A notch is centered on the post end, so half of it lies outside
+    of the part and its mouth overlaps the outer loop.
+    :param posts: SlotPosts from SlotPlanner.plan_posts with up, across and width
+    :param target_count: Number of target slices
+    :param target_normals: Normal of the target slices, one for all (3,) or one per slice (target_count, 3)
+    :param use_top: Notch at the top end of each post instead of the bottom end, one for all or one per post
+    :return: One list of loops (4, 2) per target slice
+    :rtype: list
+    """
+    notches = [[] for _ in range(target_count)]
+
+    if len(posts.target) == 0:
+        return notches
+
+    centers = notched_ends(posts, use_top)
+    across = posts.across * (posts.width[:, None] / 2)
+    along = posts.up * (posts.length[:, None] / 2)
+    corners = np.stack((centers - across - along, centers + across - along, centers + across + along,
+                        centers - across + along), axis=1)
+
+    # Plane basis of the target slice of every notch
+    target_normals = np.broadcast_to(np.asarray(target_normals, dtype=np.float64).reshape(-1, 3), (target_count, 3))
+    bases = np.array([MeshSection.plane_basis(normal) for normal in target_normals])
+    loops = np.einsum('kcj,kij->kci', corners, bases[posts.target])
+
+    for target, loop in zip(posts.target.tolist(), loops):
+        if MeshSection.loop_area(loop) < 0:
+            loop = loop[::-1]
+        notches[target].append(loop)
+
+    return notches
+
+
+def placed_parts(parts, placements):
+    """
+    Maps parts to sheet coordinates one at a time
+    :param parts: Sequence of CutPart indexed by placement.part
+    :param placements: Placements of one sheet
+    :rtype: generator
+    """
+    for placement in placements:
+        part = parts[placement.part]
+        yield CutPart(part.name, apply_placement(part.outers, placement), apply_placement(part.holes, placement),
+                      apply_placement(part.slots, placement))
+
+
+def label_position(part, label_height=LABEL_HEIGHT):
+    """
+    Position and height of the label of a part, centered on its largest outer loop
+    :return: Point (2,) and text height
+    :rtype: tuple
+    """
+    outer = max(part.outers, key=lambda loop: abs(MeshSection.loop_area(loop)))
+    extent = outer.max(axis=0) - outer.min(axis=0)
+    return MeshSection.loop_centroid(outer), min(label_height, float(extent.min()) / 4)
+
+
+def dxf_lines(parts, scale=10.0, label_height=LABEL_HEIGHT):
+    """
+    Streams the lines of a DXF R12 file with one closed polyline per loop and one text entity per label
+    :param parts: Iterable of CutPart in sheet coordinates
+    :param scale: Output units per cm, 10 writes millimeters
+    :rtype: generator
+    """
+    yield from _dxf_pairs(0, 'SECTION', 2, 'HEADER', 9, '$ACADVER', 1, 'AC1009', 0, 'ENDSEC')
+    yield from _dxf_pairs(0, 'SECTION', 2, 'TABLES', 0, 'TABLE', 2, 'LAYER', 70, len(LAYER_COLORS))
+    for layer, (color, _) in LAYER_COLORS.items():
+        yield from _dxf_pairs(0, 'LAYER', 2, layer, 70, 0, 62, color, 6, 'CONTINUOUS')
+    yield from _dxf_pairs(0, 'ENDTAB', 0, 'ENDSEC', 0, 'SECTION', 2, 'ENTITIES')
+
+    for part in parts:
+        for layer, loops in ((CUT_SLOT, part.slots), (CUT_INNER, part.holes), (CUT_OUTER, part.outers)):
+            for loop in loops:
+                yield from _dxf_pairs(0, 'POLYLINE', 8, layer, 66, 1, 70, 1, 10, 0.0, 20, 0.0, 30, 0.0)
+                for x, y in (np.asarray(loop) * scale).tolist():
+                    yield from _dxf_pairs(0, 'VERTEX', 8, layer, 10, x, 20, y, 30, 0.0)
+                yield from _dxf_pairs(0, 'SEQEND', 8, layer)
+
+        if part.name and part.outers:
+            (x, y), height = label_position(part, label_height)
+            yield from _dxf_pairs(0, 'TEXT', 8, ENGRAVE, 10, x * scale, 20, y * scale, 30, 0.0, 40, height * scale,
+                                  1, part.name, 72, 1, 73, 2, 11, x * scale, 21, y * scale, 31, 0.0)
+
+    yield from _dxf_pairs(0, 'ENDSEC', 0, 'EOF')
+
+
+def _dxf_pairs(*values):
+    for code, value in zip(values[::2], values[1::2]):
+        yield '%3d\n' % code
+        yield ('%.6f\n' % value) if isinstance(value, float) else '%s\n' % value
+
+
+def svg_lines(parts, width, height, scale=10.0, label_height=LABEL_HEIGHT):
+    """
+    Streams the lines of an SVG file of one sheet, one path per layer of each part
+    Sheet Y points up, so it is flipped into the SVG Y down convention.
+    :param parts: Iterable of CutPart in sheet coordinates
+    :param width: Sheet width in cm
+    :param height: Sheet height in cm
+    :param scale: Millimeters per cm of the output, 10 writes real size
+    :rtype: generator
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<svg xmlns="http://www.w3.org/2000/svg" width="%.3fmm" height="%.3fmm" viewBox="0 0 %.3f %.3f">\n' % (
+        width * scale, height * scale, width * scale, height * scale)
+
+    for part in parts:
+        yield '<g id="%s">\n' % escape(part.name or '')
+        for layer, loops in ((CUT_SLOT, part.slots), (CUT_INNER, part.holes), (CUT_OUTER, part.outers)):
+            if loops:
+                yield '<path class="%s" fill="none" stroke="%s" stroke-width="0.1" d="%s"/>\n' % (
+                    layer, LAYER_COLORS[layer][1], _svg_path(loops, height, scale))
+
+        if part.name and part.outers:
+            (x, y), text_height = label_position(part, label_height)
+            yield ('<text class="%s" x="%.4f" y="%.4f" font-size="%.4f" text-anchor="middle" '
+                   'dominant-baseline="middle" fill="%s">%s</text>\n') % (
+                ENGRAVE, x * scale, (height - y) * scale, text_height * scale, LAYER_COLORS[ENGRAVE][1],
+                escape(part.name))
+        yield '</g>\n'
+
+    yield '</svg>\n'
+
+
+def _svg_path(loops, height, scale):
+    commands = []
+    for loop in loops:
+        points = np.asarray(loop) * scale
+        points[:, 1] = height * scale - points[:, 1]
+        commands.append('M' + ' L'.join('%.4f %.4f' % (x, y) for x, y in points.tolist()) + ' Z')
+    return ' '.join(commands)
+
+
+def write_cut_files(parts, nest_result, directory, sheet_width, sheet_height, base_name='Sheet',
+                    formats=('dxf', 'svg'), scale=10.0):
+    """
+    Writes one cut file per sheet and format
+    Files are written line by line while the parts of a sheet are placed, so only one placed part is held at once.
+    :param parts: Sequence of CutPart, the parts that were nested
+    :param nest_result: NestResult of the part outer loops
+    :param directory: Output folder, created when missing
+    :param sheet_width: Sheet width in cm
+    :param sheet_height: Sheet height in cm
+    :param base_name: File name prefix, the sheet number is appended
+    :param formats: Any of 'dxf' and 'svg'
+    :param scale: Output units per cm, 10 writes millimeters
+    :return: The written file names
+    :rtype: list
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    sheets = [[] for _ in range(nest_result.sheet_count)]
+    for placement in nest_result.placements:
+        sheets[placement.sheet].append(placement)
+
+    file_names = []
+    for index, placements in enumerate(sheets):
+        for file_format in formats:
+            file_name = os.path.join(directory, '%s-%d.%s' % (base_name, index + 1, file_format))
+
+            if file_format == 'dxf':
+                lines = dxf_lines(placed_parts(parts, placements), scale)
+            elif file_format == 'svg':
+                lines = svg_lines(placed_parts(parts, placements), sheet_width, sheet_height, scale)
+            else:
+                raise ValueError('Unknown cut file format: %s' % file_format)
+
+            with open(file_name, 'w') as cut_file:
+                cut_file.writelines(lines)
+            file_names.append(file_name)
+
+    return file_names
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+from . import MeshSection
+
+# Bodies whose tessellations are kept, the least recently used body is dropped first
+MAX_BODIES = 4
+
+
+class TessellationCache:
+    """
+    Tessellations of recently used bodies at any number of surface tolerances, shared by every stage
+    A body is known by a key, for example its entity token, and a revision that changes whenever the body is
+    modified. A new revision drops the meshes and derived objects of the old one. Meshes are read only arrays, so
+    stages share them without copies.
+    """
+    def __init__(self, max_bodies=MAX_BODIES):
+        self.max_bodies = max_bodies
+        self.bodies = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def _entry(self, key, revision):
+        entry = self.bodies.get(key)
+
+        if entry is not None and entry['revision'] != revision:
+            del self.bodies[key]
+            self.invalidations += 1
+            entry = None
+
+        if entry is None:
+            entry = {'revision': revision, 'meshes': {}, 'derived': {}}
+            self.bodies[key] = entry
+            while len(self.bodies) > self.max_bodies:
+                self.bodies.popitem(last=False)
+
+        self.bodies.move_to_end(key)
+        return entry
+
+    def mesh(self, key, revision, tolerance, tessellate):
+        """
+        The welded mesh of a body at a surface tolerance, tessellated on the first request only
+        :param key: Body key
+        :param revision: Body revision
+        :param tolerance: Surface tolerance in cm
+        :param tessellate: tessellate(tolerance) returning flat coordinate and index lists, see
+                           MeshSection.mesh_from_flat
+        :return: Read only vertices (n, 3) and triangle indices (m, 3)
+        :rtype: tuple
+        """
+        meshes = self._entry(key, revision)['meshes']
+        tolerance_key = round(float(tolerance), 9)
+        mesh = meshes.get(tolerance_key)
+
+        if mesh is not None:
+            self.hits += 1
+            return mesh
+
+        self.misses += 1
+        vertices, faces = MeshSection.mesh_from_flat(*tessellate(tolerance))
+        vertices.flags.writeable = False
+        faces.flags.writeable = False
+        meshes[tolerance_key] = (vertices, faces)
+
+        return vertices, faces
+
+    def derived(self, key, revision, name, build):
+        """
+        An object computed from the meshes of a body, kept and dropped together with them
+        :param key: Body key
+        :param revision: Body revision
+        :param name: Name of the object, for example containment-0.01
+        :param build: build() returning the object
+        """
+        derived = self._entry(key, revision)['derived']
+
+        if name not in derived:
+            derived[name] = build()
+
+        return derived[name]
+
+    def invalidate(self, key):
+        """
+        Drops everything cached for a body
+        """
+        if self.bodies.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.bodies.clear()
@@ -0,0 +1,629 @@
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# A closed material or void region of a planar section.
+# outer and holes are (n, 2) arrays in the plane basis returned by plane_basis
+SectionRegion = namedtuple('SectionRegion', ('outer', 'holes', 'area', 'centroid', 'is_material'))
+
+
+def read_stl(file_name, weld_tolerance=1e-6):
+    """
+    Reads an ASCII or binary STL file into a welded triangle mesh
+    :param file_name: The full path to the STL file
+    :type file_name: str
+    :param weld_tolerance: Distance below which vertices are merged
+    :type weld_tolerance: float
+    :return: Vertices (n, 3) and triangle indices (m, 3)
+    :rtype: tuple
+    """
+    with open(file_name, 'rb') as stl_file:
+        data = stl_file.read()
+
+    triangle_count = struct.unpack('<I', data[80:84])[0] if len(data) >= 84 else 0
+
+    if len(data) == 84 + triangle_count * 50:
+        records = np.frombuffer(data, dtype=np.dtype([('normal', '<f4', 3), ('points', '<f4', (3, 3)),
+                                                      ('attribute', '<u2')]), count=triangle_count, offset=84)
+        points = records['points'].astype(np.float64).reshape(-1, 3)
+
+    else:
+        points = [line.split()[1:4] for line in data.decode('ascii', 'ignore').splitlines()
+                  if line.strip().startswith('vertex')]
+        points = np.array(points, dtype=np.float64).reshape(-1, 3)
+
+    faces = np.arange(len(points)).reshape(-1, 3)
+    return weld_vertices(points, faces, weld_tolerance)
+
+
+def mesh_from_flat(coordinates, indices, weld_tolerance=1e-6):
+    """
+    Builds a welded mesh from flat coordinate and index lists such as a Fusion TriangleMesh returns
+    :param coordinates: Flat list of node coordinates x0, y0, z0, x1, ...
+    :type coordinates: list
+    :param indices: Flat list of node indices, three per triangle
+    :type indices: list
+    :param weld_tolerance: Distance below which vertices are merged
+    :type weld_tolerance: float
+    :return: Vertices (n, 3) and triangle indices (m, 3)
+    :rtype: tuple
+    """
+    vertices = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    return weld_vertices(vertices, faces, weld_tolerance)
+
+
+def weld_vertices(vertices, faces, tolerance=1e-6):
+    """
+    Merges coincident vertices so that adjacent triangles share edges
+    Tessellations are generated face by face, so without this the section loops would not close.
+    :param vertices: Vertex array (n, 3)
+    :param faces: Triangle index array (m, 3)
+    :param tolerance: Distance below which vertices are merged
+    :return: Welded vertices and triangles with degenerate triangles removed
+    :rtype: tuple
+    """
+    keys = np.round(vertices / tolerance).astype(np.int64)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    welded_faces = inverse.reshape(-1)[faces]
+
+    degenerate = ((welded_faces[:, 0] == welded_faces[:, 1]) | (welded_faces[:, 1] == welded_faces[:, 2]) |
+                  (welded_faces[:, 0] == welded_faces[:, 2]))
+
+    return vertices[first], welded_faces[~degenerate]
+
+
+def plane_basis(normal):
+    """
+    Returns an orthonormal in-plane basis for a plane normal
+    The basis only depends on the normal so sections and sketch points project consistently.
+    :param normal: Plane normal, does not need to be unit length
+    :return: Unit vectors u and v
+    :rtype: tuple
+    """
+    normal = np.asarray(normal, dtype=np.float64)
+    normal = normal / np.linalg.norm(normal)
+
+    # Prefer world Z as the in-plane v direction so vertical slices read as (horizontal, z)
+    reference = np.array([0.0, 0.0, 1.0])
+    if abs(normal.dot(reference)) > 0.9:
+        reference = np.array([0.0, 1.0, 0.0])
+
+    u = np.cross(reference, normal)
+    u /= np.linalg.norm(u)
+    v = np.cross(normal, u)
+
+    return u, v
+
+
+def project_points(points, normal):
+    """
+    Projects 3D points into the 2D basis of a plane with the given normal
+    :param points: Points (n, 3)
+    :param normal: Plane normal
+    :return: Points (n, 2)
+    """
+    u, v = plane_basis(normal)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return np.column_stack((points.dot(u), points.dot(v)))
+
+
+def unproject_points(points, normal, offset):
+    """
+    Maps 2D points in the basis of a plane back to world space
+    :param points: Points (n, 2)
+    :param normal: Plane normal
+    :param offset: Plane offset along the normal
+    :return: Points (n, 3)
+    """
+    normal = np.asarray(normal, dtype=np.float64)
+    normal = normal / np.linalg.norm(normal)
+    u, v = plane_basis(normal)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return points[:, :1] * u + points[:, 1:2] * v + offset * normal
+
+
+def loop_polylines(loops, normal, offset):
+    """
+    Converts section loops to closed world space polylines, the layout custom graphics line strips use
+    :param loops: List of loops (k, 2)
+    :param normal: Plane normal
+    :param offset: Plane offset along the normal
+    :return: Flat coordinate list x0, y0, z0, x1, ... and the point count of each strip
+    :rtype: tuple
+    """
+    if len(loops) == 0:
+        return [], []
+
+    closed = [np.vstack((loop, loop[:1])) for loop in loops]
+    points = unproject_points(np.vstack(closed), normal, offset)
+    return points.reshape(-1).tolist(), [len(loop) for loop in closed]
+
+
+def section_mesh(vertices, faces, normal, offset):
+    """
+    Cuts a closed triangle mesh with a plane and returns the closed section loops
+    :param vertices: Vertex array (n, 3)
+    :param faces: Triangle index array (m, 3)
+    :param normal: Plane normal
+    :param offset: Signed distance of the plane from the origin along the normal
+    :type offset: float
+    :return: List of closed loops as (k, 2) arrays in the plane basis
+    :rtype: list
+    """
+    return section_mesh_batch(vertices, faces, normal, [offset])[0]
+
+
+def section_mesh_batch(vertices, faces, normal, offsets):
+    """
+    Cuts a closed triangle mesh with a family of parallel planes in a single pass
+    Triangle extents along the normal are located in the sorted offsets, so each triangle is only visited for
+    the planes it actually spans and the cost is linear in triangles plus section size.
+    Vertices exactly on a plane are treated as being on the positive side, which keeps the loops manifold.
+    :param vertices: Vertex array (n, 3)
+    :param faces: Triangle index array (m, 3)
+    :param normal: Common plane normal
+    :param offsets: Signed distances of the planes from the origin along the normal, in any order
+    :return: One list of closed loops, as (k, 2) arrays in the plane basis, per offset
+    :rtype: list
+    """
+    normal = np.asarray(normal, dtype=np.float64)
+    normal = normal / np.linalg.norm(normal)
+    offsets = np.asarray(offsets, dtype=np.float64).reshape(-1)
+    sections = [[] for _ in range(len(offsets))]
+
+    if len(offsets) == 0 or len(faces) == 0:
+        return sections
+
+    heights = vertices.dot(normal)
+    face_heights = heights[faces]
+
+    order = np.argsort(offsets, kind='stable')
+    sorted_offsets = offsets[order]
+
+    # A triangle crosses plane d when min height < d <= max height
+    first = np.searchsorted(sorted_offsets, face_heights.min(axis=1), side='right')
+    last = np.searchsorted(sorted_offsets, face_heights.max(axis=1), side='right')
+    counts = last - first
+
+    pair_count = int(counts.sum())
+    if pair_count == 0:
+        return sections
+
+    pair_faces = np.repeat(np.arange(len(faces)), counts)
+    pair_slots = np.arange(pair_count) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(first, counts)
+    pair_offsets = sorted_offsets[pair_slots]
+
+    cut_faces = faces[pair_faces]
+    face_positive = face_heights[pair_faces] >= pair_offsets[:, None]
+    edge_from, edge_to = _crossing_edges(cut_faces, face_positive)
+
+    points_3d, node_slots, segment_nodes = _edge_points(vertices, heights, pair_slots, sorted_offsets,
+                                                        edge_from, edge_to)
+    points = project_points(points_3d, normal)
+
+    for nodes in _chain_nodes(segment_nodes):
+        sections[order[node_slots[nodes[0]]]].append(points[nodes])
+
+    return sections
+
+
+# Returns the two edges of every cut triangle that change side, as (m, 2) vertex pairs
+# The pair is ordered so that consistently wound triangles give head to tail segments
+def _crossing_edges(cut_faces, face_positive):
+
+    # The odd vertex is the one on its own side of the plane
+    odd_positive = face_positive.sum(axis=1) == 1
+    odd = np.where(odd_positive, np.argmax(face_positive, axis=1), np.argmin(face_positive, axis=1))
+
+    rows = np.arange(len(cut_faces))
+    odd_vertex = cut_faces[rows, odd]
+    next_vertex = cut_faces[rows, (odd + 1) % 3]
+    prev_vertex = cut_faces[rows, (odd + 2) % 3]
+
+    edge_next = np.column_stack((odd_vertex, next_vertex))
+    edge_prev = np.column_stack((odd_vertex, prev_vertex))
+
+    edge_from = np.where(odd_positive[:, None], edge_prev, edge_next)
+    edge_to = np.where(odd_positive[:, None], edge_next, edge_prev)
+
+    return edge_from, edge_to
+
+
+# Interpolates the crossing point on each unique (plane, edge) and returns segments as node index pairs
+# Nodes of different planes never coincide, so all planes can be chained together
+def _edge_points(vertices, heights, pair_slots, plane_offsets, edge_from, edge_to):
+    slots = np.concatenate((pair_slots, pair_slots))
+    edges = np.sort(np.vstack((edge_from, edge_to)), axis=1)
+
+    # Scalar keys sort much faster than unique rows, fall back to rows if they could overflow
+    vertex_count = len(vertices)
+    if len(plane_offsets) * float(vertex_count) ** 2 < 2 ** 62:
+        keys = (slots * vertex_count + edges[:, 0]) * vertex_count + edges[:, 1]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        unique_keys = np.column_stack((unique_keys // vertex_count ** 2, unique_keys // vertex_count % vertex_count,
+                                       unique_keys % vertex_count))
+    else:
+        unique_keys, inverse = np.unique(np.column_stack((slots, edges)), axis=0, return_inverse=True)
+
+    inverse = inverse.reshape(-1)
+
+    offset = plane_offsets[unique_keys[:, 0]]
+    start = unique_keys[:, 1]
+    end = unique_keys[:, 2]
+    t = (heights[start] - offset) / (heights[start] - heights[end])
+    points = vertices[start] + t[:, None] * (vertices[end] - vertices[start])
+
+    segment_count = len(edge_from)
+    segment_nodes = np.column_stack((inverse[:segment_count], inverse[segment_count:]))
+
+    return points, unique_keys[:, 0], segment_nodes
+
+
+def chain_segments(segment_nodes, points):
+    """
+    Chains segments into closed loops
+    Chains that do not close (open or non-manifold meshes) are discarded.
+    :param segment_nodes: Segments as (m, 2) node indices
+    :param points: Node coordinates (n, 2)
+    :return: List of closed loops as (k, 2) arrays
+    :rtype: list
+    """
+    return [points[nodes] for nodes in _chain_nodes(segment_nodes)]
+
+
+# Returns the node indices of every closed loop
+def _chain_nodes(segment_nodes):
+    if len(segment_nodes) == 0:
+        return []
+
+    node_count = int(segment_nodes.max()) + 1
+    successor = np.full(node_count, -1, dtype=np.int64)
+    successor[segment_nodes[:, 0]] = segment_nodes[:, 1]
+
+    # Consistently wound meshes give every node one outgoing and one incoming segment
+    outgoing = np.bincount(segment_nodes[:, 0], minlength=node_count)
+    incoming = np.bincount(segment_nodes[:, 1], minlength=node_count)
+    used = (outgoing + incoming) > 0
+
+    if np.all(outgoing[used] == 1) and np.all(incoming[used] == 1):
+        return _chain_directed(successor, used)
+
+    return _chain_undirected(segment_nodes, node_count)
+
+
+# Splits a successor permutation into cycles with pointer jumping, O(n log n) with no per node python work
+def _chain_directed(successor, used):
+    node_count = len(successor)
+    successor = np.where(used, successor, np.arange(node_count))
+
+    # Label every node with the smallest node index in its cycle
+    label = np.arange(node_count)
+    jump = successor.copy()
+    while True:
+        new_label = np.minimum(label, label[jump])
+        if np.array_equal(new_label, label):
+            break
+        label = new_label
+        jump = jump[jump]
+
+    # Open every cycle before its smallest node and rank nodes by distance to the end of the chain
+    head = label == np.arange(node_count)
+    tail = head[successor] & used
+    jump = np.where(tail, np.arange(node_count), successor)
+    rank = (~tail & used).astype(np.int64)
+    while True:
+        finished = jump[jump] == jump
+        if np.all(finished):
+            break
+        rank = rank + rank[jump]
+        jump = jump[jump]
+
+    nodes = np.flatnonzero(used)
+    nodes = nodes[np.lexsort((-rank[nodes], label[nodes]))]
+    breaks = np.flatnonzero(np.diff(label[nodes])) + 1
+
+    return [loop for loop in np.split(nodes, breaks) if len(loop) >= 3]
+
+
+# Walks the segment graph ignoring direction, used when the mesh winding is not consistent
+def _chain_undirected(segment_nodes, node_count):
+    flat_nodes = segment_nodes.reshape(-1)
+    order = np.argsort(flat_nodes, kind='stable')
+    first_slot = np.searchsorted(flat_nodes[order], np.arange(node_count))
+    counts = np.bincount(flat_nodes, minlength=node_count)
+
+    # Each node of a manifold section is shared by exactly two segments
+    incident = np.full((node_count, 2), -1, dtype=np.int64)
+    has_one = counts >= 1
+    has_two = counts >= 2
+    incident[has_one, 0] = order[first_slot[has_one]] // 2
+    incident[has_two, 1] = order[first_slot[has_two] + 1] // 2
+
+    incident = incident.tolist()
+    segments = segment_nodes.tolist()
+    visited = [False] * len(segments)
+    loops = []
+
+    for first in range(len(segments)):
+        if visited[first]:
+            continue
+
+        visited[first] = True
+        start_node, node = segments[first]
+        loop = [start_node]
+
+        while node != start_node:
+            loop.append(node)
+            segment_a, segment_b = incident[node]
+            segment = segment_a if segment_a != -1 and not visited[segment_a] else segment_b
+
+            if segment == -1 or visited[segment]:
+                break
+
+            visited[segment] = True
+            node_a, node_b = segments[segment]
+            node = node_b if node_a == node else node_a
+
+        if node == start_node and len(loop) >= 3:
+            loops.append(np.array(loop))
+
+    return loops
+
+
+def loop_area(loop):
+    """
+    Signed area of a closed loop, positive when counter-clockwise
+    :param loop: Loop points (k, 2)
+    :rtype: float
+    """
+    x = loop[:, 0]
+    y = loop[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def loop_centroid(loop):
+    """
+    Area centroid of a closed loop
+    :param loop: Loop points (k, 2)
+    :return: Centroid (2,)
+    """
+    x = loop[:, 0]
+    y = loop[:, 1]
+    x_next = np.roll(x, -1)
+    y_next = np.roll(y, -1)
+    cross = x * y_next - x_next * y
+    area = cross.sum() / 2
+
+    if abs(area) < 1e-15:
+        return loop.mean(axis=0)
+
+    return np.array([((x + x_next) * cross).sum(), ((y + y_next) * cross).sum()]) / (6 * area)
+
+
+def points_in_polygon(points, polygon, chunk_size=4096):
+    """
+    Vectorized even-odd point in polygon test
+    :param points: Query points (n, 2)
+    :param polygon: Closed polygon (k, 2), the closing edge is implied
+    :param chunk_size: Number of points tested per broadcast block to bound memory
+    :return: Boolean array (n,), True where the point is inside
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    x0 = polygon[:, 0][None, :]
+    y0 = polygon[:, 1][None, :]
+    x1 = np.roll(polygon[:, 0], -1)[None, :]
+    y1 = np.roll(polygon[:, 1], -1)[None, :]
+
+    result = np.zeros(len(points), dtype=bool)
+
+    for start in range(0, len(points), chunk_size):
+        x = points[start:start + chunk_size, 0][:, None]
+        y = points[start:start + chunk_size, 1][:, None]
+
+        spans = (y0 > y) != (y1 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+
+        crossings = np.count_nonzero(spans & (x < x_cross), axis=1)
+        result[start:start + chunk_size] = crossings % 2 == 1
+
+    return result
+
+
+def interior_point(polylines, scanlines=5):
+    """
+    Point inside the region a set of polylines bounds by the even-odd rule, kept away from the boundary
+    The polylines can come in any order and direction as long as together they close every loop. Horizontal
+    scanlines cross the region and the middle of the widest inside span is returned.
+    :param polylines: Sequence of polylines (k, 2)
+    :param scanlines: Number of scanlines spread over the height of the region
+    :return: The point (2,) or None when no scanline crosses the region
+    """
+    segments = [np.stack((line[:-1], line[1:]), axis=1)
+                for line in (np.asarray(polyline, dtype=np.float64).reshape(-1, 2) for polyline in polylines)
+                if len(line) > 1]
+    if len(segments) == 0:
+        return None
+
+    segments = np.concatenate(segments)
+    start, end = segments[:, 0], segments[:, 1]
+    low = min(start[:, 1].min(), end[:, 1].min())
+    high = max(start[:, 1].max(), end[:, 1].max())
+
+    best, best_width = None, 0.0
+    for height in (low + (high - low) * (np.arange(scanlines) + 0.5) / scanlines).tolist():
+        spans = (start[:, 1] > height) != (end[:, 1] > height)
+        t = (height - start[spans, 1]) / (end[spans, 1] - start[spans, 1])
+        crossings = np.sort(start[spans, 0] + t * (end[spans, 0] - start[spans, 0]))
+
+        pairs = len(crossings) // 2
+        if pairs == 0:
+            continue
+
+        widths = crossings[1:2 * pairs:2] - crossings[:2 * pairs:2]
+        widest = int(np.argmax(widths))
+        if widths[widest] > best_width:
+            best_width = float(widths[widest])
+            best = np.array([(crossings[2 * widest] + crossings[2 * widest + 1]) / 2, height])
+
+    return best
+
+
+def build_regions(loops):
+    """
+    Nests section loops and returns the material and void regions they bound
+    A loop nested inside an even number of loops is the outer boundary of material, odd nesting bounds a void.
+    :param loops: List of closed loops (k, 2)
+    :return: List of SectionRegion, outer loops counter-clockwise and holes clockwise
+    :rtype: list
+    """
+    if len(loops) == 0:
+        return []
+
+    areas = np.array([loop_area(loop) for loop in loops])
+    centroids = np.array([loop_centroid(loop) for loop in loops])
+    samples = np.array([loop[0] for loop in loops])
+    minimums = np.array([loop.min(axis=0) for loop in loops])
+    maximums = np.array([loop.max(axis=0) for loop in loops])
+
+    count = len(loops)
+    contains = np.zeros((count, count), dtype=bool)
+
+    for j, loop in enumerate(loops):
+        candidates = np.all((samples >= minimums[j]) & (samples <= maximums[j]), axis=1)
+        candidates[j] = False
+        candidates &= np.abs(areas) < abs(areas[j])
+
+        if candidates.any():
+            contains[candidates, j] = points_in_polygon(samples[candidates], loop)
+
+    depth = contains.sum(axis=1)
+    absolute_areas = np.abs(areas)
+
+    parent = np.full(count, -1)
+    for i in range(count):
+        containers = np.flatnonzero(contains[i])
+        if len(containers):
+            parent[i] = containers[np.argmin(absolute_areas[containers])]
+
+    regions = []
+    for i, loop in enumerate(loops):
+        children = np.flatnonzero(parent == i)
+
+        outer = loop if areas[i] > 0 else loop[::-1]
+        holes = [loops[c] if areas[c] < 0 else loops[c][::-1] for c in children]
+
+        area = absolute_areas[i] - absolute_areas[children].sum()
+        moment = absolute_areas[i] * centroids[i] - (absolute_areas[children, None] * centroids[children]).sum(axis=0)
+        centroid = moment / area if area > 1e-15 else centroids[i]
+
+        regions.append(SectionRegion(outer, holes, float(area), centroid, bool(depth[i] % 2 == 0)))
+
+    return regions
+
+
+def section_regions(vertices, faces, normal, offset):
+    """
+    Convenience wrapper returning the nested regions of a single planar section
+    :rtype: list
+    """
+    return build_regions(section_mesh(vertices, faces, normal, offset))
+
+
+def section_regions_batch(vertices, faces, normal, offsets):
+    """
+    Returns the nested regions of a family of parallel sections computed in one pass
+    :return: One list of SectionRegion per offset
+    :rtype: list
+    """
+    return [build_regions(loops) for loops in section_mesh_batch(vertices, faces, normal, offsets)]
+
+
+def classify_profiles(areas, centroids, regions, tolerance=0.25):
+    """
+    Classifies sketch profiles against section regions without querying the modeling kernel
+    Each profile is matched to the region with the closest centroid and area.
+    :param areas: Profile areas (n,)
+    :param centroids: Profile centroids (n, 2) in the same plane basis as the regions
+    :param regions: List of SectionRegion for the same plane
+    :param tolerance: Maximum normalized matching cost for a profile to count as matched
+    :return: Boolean arrays (contained, matched). Unmatched profiles should be resolved by an exact query.
+    :rtype: tuple
+    """
+    areas = np.asarray(areas, dtype=np.float64).reshape(-1)
+    centroids = np.asarray(centroids, dtype=np.float64).reshape(-1, 2)
+
+    if len(regions) == 0 or len(areas) == 0:
+        return np.zeros(len(areas), dtype=bool), np.zeros(len(areas), dtype=bool)
+
+    region_areas = np.array([region.area for region in regions])
+    region_centroids = np.array([region.centroid for region in regions])
+    region_material = np.array([region.is_material for region in regions])
+
+    larger = np.maximum(areas[:, None], region_areas[None, :])
+    larger = np.maximum(larger, 1e-12)
+    distance = np.linalg.norm(centroids[:, None, :] - region_centroids[None, :, :], axis=2)
+    cost = distance / np.sqrt(larger) + np.abs(areas[:, None] - region_areas[None, :]) / larger
+
+    best = np.argmin(cost, axis=1)
+    matched = cost[np.arange(len(areas)), best] < tolerance
+
+    return region_material[best] & matched, matched
+
+
+def match_faces(areas, centroids, boxes, other_areas, other_centroids, other_boxes, normal, tolerance=1e-4):
+    """
+    Pairs two sets of faces one to one, for example the mid faces of a slice with the end faces of its bodies
+    Pairs whose bounding boxes overlap in the plane come first, then the closest centroids. The faces of both sets
+    lie in parallel planes at different heights, so boxes are compared in the plane basis without the normal axis.
+    Centroids closer than tolerance count as equal and the closer area decides, so islands of the same area still
+    pair with their own body.
+    :param areas: Face areas (m,)
+    :param centroids: Face centroids (m, 3)
+    :param boxes: Face bounding boxes (m, 2, 3) as minimum and maximum point
+    :param other_areas: Areas of the faces to pair with (n,)
+    :param other_centroids: Centroids of the faces to pair with (n, 3)
+    :param other_boxes: Bounding boxes of the faces to pair with (n, 2, 3)
+    :param normal: Normal of the face planes
+    :param tolerance: Distance in cm below which centroids and boxes are treated as touching
+    :return: Index into the other faces for every face, -1 when no face was left to pair with
+    :rtype: np.ndarray
+    """
+    areas = np.asarray(areas, dtype=np.float64).reshape(-1)
+    other_areas = np.asarray(other_areas, dtype=np.float64).reshape(-1)
+    matches = np.full(len(areas), -1, dtype=np.int64)
+
+    if len(areas) == 0 or len(other_areas) == 0:
+        return matches
+
+    centroids = np.asarray(centroids, dtype=np.float64).reshape(-1, 3)
+    other_centroids = np.asarray(other_centroids, dtype=np.float64).reshape(-1, 3)
+    basis = np.array(plane_basis(normal))
+    boxes = _plane_boxes(boxes, basis)
+    other_boxes = _plane_boxes(other_boxes, basis)
+
+    distance = np.linalg.norm(centroids[:, None, :] - other_centroids[None, :, :], axis=2)
+    area_difference = np.abs(areas[:, None] - other_areas[None, :])
+    overlap = np.all((boxes[:, None, 0] <= other_boxes[None, :, 1] + tolerance) &
+                     (other_boxes[None, :, 0] <= boxes[:, None, 1] + tolerance), axis=2)
+
+    order = np.lexsort((area_difference.ravel(), np.floor(distance / tolerance).ravel(), ~overlap.ravel()))
+    rows, columns = np.divmod(order, len(other_areas))
+
+    used = np.zeros(len(other_areas), dtype=bool)
+    for row, column in zip(rows.tolist(), columns.tolist()):
+        if matches[row] == -1 and not used[column]:
+            matches[row] = column
+            used[column] = True
+
+    return matches
+
+
+# Bounding boxes (n, 2, 3) as boxes (n, 2, 2) in the plane basis, from the projections of their corners
+def _plane_boxes(boxes, basis):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 2, 3)
+    corners = np.stack([boxes[:, [i, j, k], [0, 1, 2]] for i in (0, 1) for j in (0, 1) for k in (0, 1)], axis=1)
+    projected = corners @ basis.T
+    return np.stack((projected.min(axis=1), projected.max(axis=1)), axis=1)
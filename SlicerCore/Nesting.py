@@ -0,0 +1,422 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from . import MeshSection
+from .SpatialIndex import GridIndex
+
+# Where one part goes, its loops are rotated about the origin by rotation degrees and then translated by (x, y)
+Placement = namedtuple('Placement', ('part', 'sheet', 'rotation', 'x', 'y'))
+
+# Result of nest_parts, utilization holds the used area fraction of every sheet
+NestResult = namedtuple('NestResult', ('placements', 'sheet_count', 'unplaced', 'utilization'))
+
+# Iterations of the bisection that slides a placed part down and left
+SLIDE_STEPS = 8
+
+
+def rotate_loops(loops, rotation):
+    """
+    Rotates loops about the origin
+    :param loops: List of loops (k, 2)
+    :param rotation: Angle in degrees, counter-clockwise
+    :rtype: list
+    """
+    angle = math.radians(rotation)
+    matrix = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
+    return [np.asarray(loop, dtype=np.float64).dot(matrix.T) for loop in loops]
+
+
+def placement_matrix(placement):
+    """
+    Homogeneous 3x3 matrix of a placement, maps part coordinates to sheet coordinates
+    :rtype: np.ndarray
+    """
+    angle = math.radians(placement.rotation)
+    return np.array([[math.cos(angle), -math.sin(angle), placement.x],
+                     [math.sin(angle), math.cos(angle), placement.y],
+                     [0.0, 0.0, 1.0]])
+
+
+def apply_placement(loops, placement):
+    """
+    Maps the loops of a part to sheet coordinates
+    :rtype: list
+    """
+    return [loop + np.array([placement.x, placement.y]) for loop in rotate_loops(loops, placement.rotation)]
+
+
+def flat_outline(regions, normal, offset, transform):
+    """
+    Outer loops of the material regions of a section after a rigid transform, projected to the XY plane
+    :param regions: Section regions in the plane basis
+    :param normal: Section plane normal
+    :param offset: Section plane offset along the normal
+    :param transform: Row major 4x4 matrix as 16 values, for example Matrix3D.asArray()
+    :return: List of loops (k, 2)
+    :rtype: list
+    """
+    matrix = np.asarray(transform, dtype=np.float64).reshape(4, 4)
+    loops = []
+
+    for region in regions:
+        if region.is_material:
+            points = MeshSection.unproject_points(region.outer, normal, offset)
+            loops.append(points.dot(matrix[:2, :3].T) + matrix[:2, 3])
+
+    return loops
+
+
+def section_outline(regions):
+    """
+    Outer loops of the material regions of a section in its plane basis, the outline a flat part is nested with
+    :rtype: list
+    """
+    return [region.outer for region in regions if region.is_material]
+
+
+def flat_transform(normal, offset, lift=0.0):
+    """
+    Rigid transform that lays a section plane flat on the XY plane
+    The plane basis of MeshSection.plane_basis maps to X and Y and the normal to Z, so section loops keep their
+    2D coordinates. The plane ends up at height lift.
+    :param normal: Section plane normal
+    :param offset: Section plane offset along the normal
+    :param lift: Height of the section plane above XY, half the slice thickness puts a slice on top of XY
+    :return: Row major 4x4 matrix
+    :rtype: np.ndarray
+    """
+    normal = np.asarray(normal, dtype=np.float64)
+    normal = normal / np.linalg.norm(normal)
+    u, v = MeshSection.plane_basis(normal)
+
+    matrix = np.identity(4)
+    matrix[:3, :3] = np.vstack((u, v, normal))
+    matrix[2, 3] = lift - offset
+    return matrix
+
+
+def sheet_transform(normal, offset, placement, origin=(0.0, 0.0, 0.0), lift=0.0):
+    """
+    Transform of a slice from its modeled position to its nested position on a sheet
+    :param normal: Section plane normal of the slice
+    :param offset: Section plane offset along the normal
+    :param placement: Placement of the section outline on the sheet
+    :param origin: World position of the sheet corner
+    :param lift: Height of the section plane above the sheet
+    :return: Row major 4x4 matrix
+    :rtype: np.ndarray
+    """
+    sheet = np.identity(4)
+    sheet[:2, :2] = placement_matrix(placement)[:2, :2]
+    sheet[:3, 3] = np.asarray(origin, dtype=np.float64) + np.array([placement.x, placement.y, 0.0])
+    return sheet.dot(flat_transform(normal, offset, lift))
+
+
+class _Shape:
+    """
+    One rotation of a part, loops are shifted so the bounding box starts at the origin
+    """
+    def __init__(self, loops, rotation):
+        loops = rotate_loops(loops, rotation)
+        points = np.vstack(loops)
+        self.rotation = rotation
+        self.shift = -points.min(axis=0)
+        self.loops = [loop + self.shift for loop in loops]
+        self.size = points.max(axis=0) - points.min(axis=0)
+        self.starts = np.vstack(self.loops)
+        self.ends = np.vstack([np.roll(loop, -1, axis=0) for loop in self.loops])
+
+
+class _Sheet:
+    """
+    Placed parts of one sheet, a skyline of their kerf inflated boxes and a grid index over the boxes
+    The skyline is a list of [x, width, y] segments covering the usable width of the sheet.
+    """
+    def __init__(self, width, height, margin, cell_size):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.index = GridIndex(cell_size)
+        self.placed = []
+        self.skyline = [[margin, width - 2 * margin, margin]]
+        self.area = 0.0
+
+
+def nest_parts(parts, sheet_width, sheet_height, kerf=0.0, margin=0.0, rotations=(0, 90, 180, 270)):
+    """
+    Nests part outlines onto rectangular sheets with bottom-left-fill placement
+    Parts are placed largest first. Each part tries every rotation on the skyline of the placed bounding boxes,
+    lowest top edge first, and is then slid down and left against the actual outlines of its neighbours so concave
+    and round parts interlock. Sheets are filled in order and a new sheet is opened when a part fits nowhere else.
+    :param parts: One list of outer loops (k, 2) per part, holes are not used for nesting
+    :param sheet_width: Usable sheet size along x
+    :param sheet_height: Usable sheet size along y
+    :param kerf: Minimum distance between the outlines of two parts
+    :param margin: Minimum distance between a part and the sheet edge
+    :param rotations: Allowed rotations in degrees
+    :rtype: NestResult
+    """
+    shapes = [[_Shape(loops, rotation) for rotation in rotations] for loops in parts]
+    areas = [sum(abs(MeshSection.loop_area(np.asarray(loop, dtype=np.float64))) for loop in loops) for loops in parts]
+
+    sizes = [shape[0].size for shape in shapes]
+    cell_size = max(float(np.median([size.max() for size in sizes])) + kerf, 1e-6) if sizes else 1.0
+
+    order = sorted(range(len(parts)), key=lambda i: -sizes[i][0] * sizes[i][1])
+    sheets = []
+    placements = [None] * len(parts)
+    unplaced = []
+
+    for part in order:
+        fits = [shape for shape in shapes[part] if shape.size[0] <= sheet_width - 2 * margin + 1e-9 and
+                shape.size[1] <= sheet_height - 2 * margin + 1e-9]
+
+        if len(fits) == 0:
+            unplaced.append(part)
+            continue
+
+        for sheet_index in range(len(sheets) + 1):
+            if sheet_index == len(sheets):
+                sheets.append(_Sheet(sheet_width, sheet_height, margin, cell_size))
+
+            # A sheet without enough free area cannot take the part
+            sheet = sheets[sheet_index]
+            if sheet.area + areas[part] > (sheet_width - 2 * margin) * (sheet_height - 2 * margin) + 1e-9:
+                continue
+
+            found = _place_on_sheet(sheet, fits, kerf)
+            if found is not None:
+                shape, position = found
+                _add_part(sheet, part, shape, position, kerf)
+                sheet.area += areas[part]
+                offset = position + shape.shift
+                placements[part] = Placement(part, sheet_index, shape.rotation, float(offset[0]), float(offset[1]))
+                break
+
+    utilization = [sheet.area / (sheet_width * sheet_height) for sheet in sheets]
+    return NestResult([placement for placement in placements if placement is not None], len(sheets), unplaced,
+                      utilization)
+
+
+# Best skyline position of any rotation on a sheet, the lowest top edge wins and ties go to the leftmost
+# Only the winning rotation is slid against the outlines of its neighbours
+def _place_on_sheet(sheet, shapes, kerf):
+    best = None
+
+    for shape in shapes:
+        width = shape.size[0] + kerf
+        for i, (x, _, _) in enumerate(sheet.skyline):
+            if x + shape.size[0] > sheet.width - sheet.margin + 1e-9:
+                break
+
+            y = _skyline_height(sheet.skyline, i, width)
+            score = (y + shape.size[1], x)
+            if y + shape.size[1] <= sheet.height - sheet.margin + 1e-9 and (best is None or score < best[0]):
+                best = (score, shape, np.array([x, y]))
+
+    if best is None:
+        return None
+
+    return best[1], _slide(sheet, best[1], best[2], kerf)
+
+
+# Highest skyline segment under a box starting at segment start
+def _skyline_height(skyline, start, width):
+    x_end = skyline[start][0] + width
+    height = 0.0
+
+    for x, _, y in skyline[start:]:
+        if x >= x_end - 1e-9:
+            break
+        height = max(height, y)
+
+    return height
+
+
+# Moves a free position down and then left as far as the neighbours allow, twice
+# Moves that only pass boxes are taken directly, the outlines are only probed beyond the nearest box
+def _slide(sheet, shape, position, kerf):
+    for _ in range(2):
+        moved = False
+
+        for axis in (1, 0):
+            high = position[axis] - sheet.margin
+            if high <= 1e-9:
+                continue
+
+            step = np.zeros(2)
+            step[axis] = -1.0
+            low = min(_free_move(sheet, shape, position, axis, high, kerf), high)
+
+            if low < high and not _collides(sheet, shape, position + step * high, kerf):
+                low = high
+            elif low < high:
+                for _ in range(SLIDE_STEPS):
+                    middle = (low + high) / 2
+                    if _collides(sheet, shape, position + step * middle, kerf):
+                        high = middle
+                    else:
+                        low = middle
+
+            if low > 1e-9:
+                position = position + step * low
+                moved = True
+
+        if not moved:
+            break
+
+    return position
+
+
+# Distance a part can move towards the origin along an axis before its box meets another box
+def _free_move(sheet, shape, position, axis, limit, kerf):
+    lo = position.copy()
+    lo[axis] -= limit
+    hi = position + shape.size
+    other = 1 - axis
+    free = limit
+
+    for item in sheet.index.query(lo - kerf, hi + kerf):
+        other_lo, other_hi = sheet.placed[item][3], sheet.placed[item][4]
+        if other_hi[other] + kerf <= position[other] or other_lo[other] - kerf >= hi[other]:
+            continue
+        if other_hi[axis] + kerf > position[axis]:
+            return 0.0
+        free = min(free, position[axis] - other_hi[axis] - kerf)
+
+    return max(free, 0.0)
+
+
+def _add_part(sheet, part, shape, position, kerf):
+    lo = position - kerf
+    hi = position + shape.size + kerf
+    starts = shape.starts + position
+    ends = shape.ends + position
+
+    sheet.index.insert(len(sheet.placed), lo, hi)
+    sheet.placed.append((part, starts, ends, position, position + shape.size))
+
+    _raise_skyline(sheet, lo[0] + kerf, hi[0], hi[1])
+
+
+# Raises the skyline to height over [x0, x1), the segments stay sorted and neighbours of equal height merge
+def _raise_skyline(sheet, x0, x1, height):
+    x0 = max(x0, sheet.margin)
+    x1 = min(x1, sheet.width - sheet.margin)
+    if x1 <= x0:
+        return
+
+    segments = []
+    for x, width, y in sheet.skyline:
+        end = x + width
+        if end <= x0 or x >= x1:
+            segments.append([x, width, y])
+            continue
+        if x < x0:
+            segments.append([x, x0 - x, y])
+        if end > x1:
+            segments.append([x1, end - x1, y])
+
+    segments.append([x0, x1 - x0, max(height, max(y for x, width, y in sheet.skyline
+                                                  if x < x1 and x + width > x0))])
+    segments.sort()
+
+    merged = [segments[0]]
+    for segment in segments[1:]:
+        if abs(segment[2] - merged[-1][2]) < 1e-12:
+            merged[-1][1] = segment[0] + segment[1] - merged[-1][0]
+        else:
+            merged.append(segment)
+
+    sheet.skyline = merged
+
+
+def _collides(sheet, shape, position, kerf):
+    lo = position - kerf
+    hi = position + shape.size + kerf
+
+    for item in sheet.index.query(lo, hi):
+        _, starts, ends, other_lo, other_hi = sheet.placed[item]
+        own_starts = shape.starts + position
+        own_ends = shape.ends + position
+
+        # Deep overlaps leave a vertex of one part inside the other, cheaper to find than close segments
+        if _any_inside(own_starts, other_lo, other_hi, starts, ends) or \
+                _any_inside(starts, lo, hi, own_starts, own_ends):
+            return True
+
+        if _outlines_close(own_starts, own_ends, starts, ends, lo, hi, other_lo - kerf, other_hi + kerf, kerf):
+            return True
+
+    return False
+
+
+# Checks if any of the points within a box is inside an outline
+def _any_inside(points, lo, hi, starts, ends):
+    points = points[np.all((points >= lo) & (points <= hi), axis=1)]
+    if len(points) == 0:
+        return False
+
+    x = points[:, 0][:, None]
+    y = points[:, 1][:, None]
+    spans = (starts[:, 1] > y) != (ends[:, 1] > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = starts[:, 0] + (y - starts[:, 1]) * (ends[:, 0] - starts[:, 0]) / (ends[:, 1] - starts[:, 1])
+
+    return bool(np.any(np.count_nonzero(spans & (x < x_cross), axis=1) % 2 == 1))
+
+
+# Checks if any segment of one outline comes closer than kerf to any segment of the other
+def _outlines_close(a_starts, a_ends, b_starts, b_ends, a_lo, a_hi, b_lo, b_hi, kerf, chunk_size=512):
+    a_keep = _segments_in_box(a_starts, a_ends, b_lo, b_hi)
+    b_keep = _segments_in_box(b_starts, b_ends, a_lo, a_hi)
+    a_starts, a_ends = a_starts[a_keep], a_ends[a_keep]
+    b_starts, b_ends = b_starts[b_keep], b_ends[b_keep]
+
+    if len(a_starts) == 0 or len(b_starts) == 0:
+        return False
+
+    for start in range(0, len(a_starts), chunk_size):
+        p0 = a_starts[start:start + chunk_size, None, :]
+        p1 = a_ends[start:start + chunk_size, None, :]
+        q0 = b_starts[None, :, :]
+        q1 = b_ends[None, :, :]
+
+        if np.any(_segments_cross(p0, p1, q0, q1)):
+            return True
+
+        if kerf > 0:
+            distance = np.minimum(np.minimum(_point_segment_distance(p0, q0, q1), _point_segment_distance(p1, q0, q1)),
+                                  np.minimum(_point_segment_distance(q0, p0, p1), _point_segment_distance(q1, p0, p1)))
+            if np.any(distance < kerf - 1e-9):
+                return True
+
+    return False
+
+
+def _segments_in_box(starts, ends, lo, hi):
+    return ((np.minimum(starts[:, 0], ends[:, 0]) <= hi[0]) & (np.maximum(starts[:, 0], ends[:, 0]) >= lo[0]) &
+            (np.minimum(starts[:, 1], ends[:, 1]) <= hi[1]) & (np.maximum(starts[:, 1], ends[:, 1]) >= lo[1]))
+
+
+def _cross(o, a, b):
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+
+# Proper crossings only, touching outlines are allowed when there is no kerf
+def _segments_cross(p0, p1, q0, q1):
+    d1 = _cross(q0, q1, p0)
+    d2 = _cross(q0, q1, p1)
+    d3 = _cross(p0, p1, q0)
+    d4 = _cross(p0, p1, q1)
+    return (d1 * d2 < -1e-12) & (d3 * d4 < -1e-12)
+
+
+def _point_segment_distance(points, starts, ends):
+    direction = ends - starts
+    length = np.maximum((direction ** 2).sum(axis=-1), 1e-18)
+    t = np.clip(((points - starts) * direction).sum(axis=-1) / length, 0.0, 1.0)
+    closest = starts + t[..., None] * direction
+    return np.sqrt(((points - closest) ** 2).sum(axis=-1))
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import tempfile
+from os.path import expanduser
+
+import numpy as np
+
+from . import MeshSection
+from .MeshSection import SectionRegion
+
+
+def default_cache_directory():
+    """
+    Returns the section cache directory in the home folder, next to the Fusion360DebugUtilities log folder
+    :rtype: str
+    """
+    return os.path.join(expanduser('~'), 'FusionSlicerLT', 'SectionCache')
+
+
+def mesh_hash(vertices, faces):
+    """
+    Content hash of a mesh, identical tessellations of the same body hash the same
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(vertices, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(faces, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+class SectionCache:
+    """
+    Content addressed on-disk cache of section regions
+    Each entry holds the regions of one plane of one mesh in a .npz file. When the cache grows past max_bytes the
+    least recently used entries are removed.
+    """
+    def __init__(self, directory=None, max_bytes=512 * 1024 * 1024):
+        self.directory = directory or default_cache_directory()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    @staticmethod
+    def key(body_hash, normal, offset, tolerance):
+        """
+        Cache key of one section
+        :param body_hash: Result of mesh_hash
+        :param normal: Plane normal
+        :param offset: Plane offset along the normal
+        :param tolerance: Surface tolerance of the mesh
+        :rtype: str
+        """
+        normal = np.asarray(normal, dtype=np.float64)
+        normal = np.round(normal / np.linalg.norm(normal), 9) + 0.0
+        text = '%s|%s|%.9f|%.9f' % (body_hash, ','.join('%.9f' % value for value in normal), offset, tolerance)
+        return hashlib.sha1(text.encode('ascii')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        """
+        Returns the cached regions for a key or None, a hit marks the entry as recently used
+        :rtype: list
+        """
+        path = self._path(key)
+
+        try:
+            with np.load(path) as data:
+                regions = _unpack_regions(data)
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return regions
+
+    def put(self, key, regions):
+        """
+        Stores the regions of one section, the file is written atomically
+        """
+        handle, temp_path = tempfile.mkstemp(suffix='.npz', dir=self.directory)
+
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                np.savez(temp_file, **_pack_regions(regions))
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in max_bytes
+        :return: Number of entries removed
+        :rtype: int
+        """
+        entries = []
+        total = 0
+
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        return removed
+
+    def section_regions(self, vertices, faces, normal, offsets, tolerance, compute=None, body_hash=None):
+        """
+        Returns the regions of many parallel sections, computing only the ones not in the cache
+        All missing sections are computed together in a single call of compute.
+        :param vertices: Vertex array (n, 3)
+        :param faces: Triangle index array (m, 3)
+        :param normal: Common plane normal
+        :param offsets: Plane offsets along the normal
+        :param tolerance: Surface tolerance of the mesh, part of the key
+        :param compute: Function (vertices, faces, normal, offsets) returning region lists,
+                        defaults to MeshSection.section_regions_batch
+        :param body_hash: Precomputed mesh_hash of the mesh
+        :return: One list of SectionRegion per offset
+        :rtype: list
+        """
+        compute = compute or MeshSection.section_regions_batch
+        body_hash = body_hash or mesh_hash(vertices, faces)
+
+        keys = [self.key(body_hash, normal, offset, tolerance) for offset in offsets]
+        results = [self.get(key) for key in keys]
+        missing = [i for i, regions in enumerate(results) if regions is None]
+
+        if len(missing) > 0:
+            computed = compute(vertices, faces, normal, [offsets[i] for i in missing])
+
+            for i, regions in zip(missing, computed):
+                results[i] = regions
+                self.put(keys[i], regions)
+
+            self.evict()
+
+        return results
+
+
+# Flattens regions into arrays, every loop is stored with its region index and whether it is a hole
+def _pack_regions(regions):
+    loops = []
+    loop_region = []
+    loop_is_hole = []
+
+    for index, region in enumerate(regions):
+        for loop, is_hole in [(region.outer, False)] + [(hole, True) for hole in region.holes]:
+            loops.append(loop)
+            loop_region.append(index)
+            loop_is_hole.append(is_hole)
+
+    return {
+        'points': np.vstack(loops) if loops else np.zeros((0, 2)),
+        'loop_lengths': np.array([len(loop) for loop in loops], dtype=np.int64),
+        'loop_region': np.array(loop_region, dtype=np.int64),
+        'loop_is_hole': np.array(loop_is_hole, dtype=bool),
+        'area': np.array([region.area for region in regions], dtype=np.float64),
+        'centroid': np.array([region.centroid for region in regions], dtype=np.float64).reshape(-1, 2),
+        'is_material': np.array([region.is_material for region in regions], dtype=bool)
+    }
+
+
+def _unpack_regions(data):
+    loops = np.split(data['points'], np.cumsum(data['loop_lengths'])[:-1]) if len(data['loop_lengths']) else []
+    outers = {}
+    holes = {}
+
+    for loop, region, is_hole in zip(loops, data['loop_region'].tolist(), data['loop_is_hole'].tolist()):
+        if is_hole:
+            holes.setdefault(region, []).append(loop)
+        else:
+            outers[region] = loop
+
+    return [SectionRegion(outers[i], holes.get(i, []), float(area), centroid, bool(is_material))
+            for i, (area, centroid, is_material) in enumerate(zip(data['area'], data['centroid'],
+                                                                  data['is_material']))]
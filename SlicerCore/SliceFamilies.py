@@ -0,0 +1,156 @@
+from collections import namedtuple
+
+import numpy as np
+
+from . import MeshSection
+from .SlotPlanner import merge_posts, plan_posts
+
+# One direction of slices, normals (n, 3) and offsets (n,) hold the mid plane of every slice
+# Parallel families repeat one normal, a radial family turns its normal about an axis
+SliceFamily = namedtuple('SliceFamily', ('name', 'normals', 'offsets'))
+
+
+def parallel_family(name, normal, offsets):
+    """
+    Evenly or freely spaced slices sharing one normal
+    :param name: Family name, for example X_Slice
+    :param normal: Slice normal
+    :param offsets: Mid plane offsets along the normal
+    :rtype: SliceFamily
+    """
+    offsets = np.asarray(offsets, dtype=np.float64).reshape(-1)
+    normal = np.asarray(normal, dtype=np.float64)
+    normals = np.tile(normal / np.linalg.norm(normal), (len(offsets), 1))
+    return SliceFamily(name, normals, offsets)
+
+
+def radial_family(name, count, axis=(0.0, 0.0, 1.0), center=(0.0, 0.0, 0.0), start=(1.0, 0.0, 0.0)):
+    """
+    Fan of slices through an axis, count planes evenly spread over half a turn so no plane repeats
+    :param name: Family name
+    :param count: Number of slices
+    :param axis: Direction of the fan axis
+    :param center: Point on the fan axis
+    :param start: Normal of the first slice, only its part perpendicular to the axis is used
+    :rtype: SliceFamily
+    """
+    axis = np.asarray(axis, dtype=np.float64)
+    axis = axis / np.linalg.norm(axis)
+    start = np.asarray(start, dtype=np.float64)
+    start = start - start.dot(axis) * axis
+    if np.linalg.norm(start) < 1e-9:
+        start = MeshSection.plane_basis(axis)[0]
+    start = start / np.linalg.norm(start)
+
+    angles = np.arange(count) * np.pi / max(count, 1)
+    normals = np.cos(angles)[:, None] * start + np.sin(angles)[:, None] * np.cross(axis, start)
+    return SliceFamily(name, normals, normals.dot(np.asarray(center, dtype=np.float64)))
+
+
+def family_from_planes(name, normals, offsets):
+    """
+    Family of existing slice planes, for example the mid planes of created slices
+    :param normals: Normal of every slice
+    :param offsets: Mid plane offset of every slice
+    :rtype: SliceFamily
+    """
+    return SliceFamily(name, np.asarray(normals, dtype=np.float64).reshape(-1, 3),
+                       np.asarray(offsets, dtype=np.float64).reshape(-1))
+
+
+def normal_groups(family, tolerance=1e-9):
+    """
+    Groups the slices of a family by normal
+    :return: List of (normal, slice indices), one entry for a parallel family
+    :rtype: list
+    """
+    groups = []
+
+    for index, normal in enumerate(np.asarray(family.normals, dtype=np.float64)):
+        for group_normal, indices in groups:
+            if np.abs(group_normal - normal).max() < tolerance:
+                indices.append(index)
+                break
+        else:
+            groups.append((normal, [index]))
+
+    return [(normal, np.array(indices, dtype=np.int64)) for normal, indices in groups]
+
+
+def family_sections(families, thickness, compute):
+    """
+    Mid, plus and minus section regions of every slice of every family
+    All planes that share a normal are sectioned by one compute call, whatever family they belong to.
+    :param families: Sequence of SliceFamily
+    :param thickness: Slice thickness
+    :param compute: compute(normal, offsets) returning one list of SectionRegion per offset, for example
+                    MeshSection.section_regions_batch bound to a mesh
+    :return: One list per family with a (mid, plus, minus) tuple of (normal, offset, regions) per slice
+    :rtype: list
+    """
+    planes = []
+    for family_index, family in enumerate(families):
+        for normal, indices in normal_groups(family):
+            for index in indices.tolist():
+                offset = float(family.offsets[index])
+                planes.extend((normal, offset + delta, family_index, index, side)
+                              for side, delta in enumerate((0.0, thickness / 2, -thickness / 2)))
+
+    sections = [[[None] * 3 for _ in range(len(family.offsets))] for family in families]
+
+    while planes:
+        normal = planes[0][0]
+        batch = [plane for plane in planes if np.abs(plane[0] - normal).max() < 1e-9]
+        planes = [plane for plane in planes if np.abs(plane[0] - normal).max() >= 1e-9]
+
+        regions = compute(normal.tolist(), [plane[1] for plane in batch])
+        for (_, offset, family_index, index, side), plane_regions in zip(batch, regions):
+            sections[family_index][index][side] = (normal.tolist(), offset, plane_regions)
+
+    return [[tuple(slice_sections) for slice_sections in family_list] for family_list in sections]
+
+
+def plan_family_posts(families, plus_regions, minus_regions, thickness, up=(0.0, 0.0, 1.0)):
+    """
+    Slot posts of every pair of slices from two different families that are not parallel, in one pass
+    Parallel families are planned with one plan_posts call per family pair, a radial family with one call per slice.
+    Of two crossing families the one listed first is notched at the top end of its posts and the other at the
+    bottom end, so the notches of every pair interlock.
+    :param families: Sequence of SliceFamily
+    :param plus_regions: Per family, the plus plane regions of each slice
+    :param minus_regions: Per family, the minus plane regions of each slice
+    :param thickness: Slice thickness
+    :param up: Post direction hint, see SlotPlanner.plan_posts
+    :return: Per family the SlotPosts of its slices and a bool per post, True where the top end is notched.
+             target indexes the slices of the family, slice is a slice index over all families in order.
+    :rtype: list
+    """
+    first_slice = np.concatenate(([0], np.cumsum([len(family.offsets) for family in families])))
+    groups = [normal_groups(family) for family in families]
+    results = []
+
+    for target_index, target_groups in enumerate(groups):
+        posts_list = []
+        use_top = []
+
+        for slice_index, slice_groups in enumerate(groups):
+            if slice_index == target_index:
+                continue
+
+            for target_normal, targets in target_groups:
+                for slice_normal, slices in slice_groups:
+                    if np.linalg.norm(np.cross(target_normal, slice_normal)) < 1e-9:
+                        continue
+
+                    posts = plan_posts(target_normal, families[target_index].offsets[targets], slice_normal,
+                                       families[slice_index].offsets[slices],
+                                       [plus_regions[slice_index][i] for i in slices.tolist()],
+                                       [minus_regions[slice_index][i] for i in slices.tolist()], thickness, up)
+                    posts_list.append(posts._replace(target=targets[posts.target],
+                                                     slice=first_slice[slice_index] + slices[posts.slice]))
+                    use_top.append(np.full(len(posts.target), target_index < slice_index))
+
+        use_top = np.concatenate(use_top) if use_top else np.zeros(0, dtype=bool)
+        results.append((merge_posts(posts_list), use_top))
+
+    return results
@@ -0,0 +1,115 @@
+import hashlib
+import json
+from collections import namedtuple
+
+import numpy as np
+
+# One generated slice. direction is the slice family name, offset the world mid plane offset along its normal.
+# geometry_hash identifies the section geometry, tokens holds the Fusion entity tokens of what was created.
+SliceRecord = namedtuple('SliceRecord', ('name', 'direction', 'offset', 'thickness', 'geometry_hash', 'tokens'))
+
+# Result of diff_manifest, keep and move are (old, new) record pairs
+ManifestDiff = namedtuple('ManifestDiff', ('keep', 'move', 'create', 'delete'))
+
+# Decimal places in cm used when hashing geometry, well below tessellation noise between identical bodies
+HASH_DECIMALS = 5
+
+
+def section_hash(region_lists, decimals=HASH_DECIMALS):
+    """
+    Hashes the section regions of one slice
+    The loops are in the plane basis, so a slice of a prismatic body hashes the same at any offset.
+    :param region_lists: The region lists of the slice sections, for example mid, plus and minus
+    :param decimals: Rounding applied to loop coordinates before hashing
+    :return: Hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+
+    for regions in region_lists:
+        digest.update(b'section')
+        for region in regions:
+            digest.update(b'material' if region.is_material else b'void')
+            digest.update(np.round(region.outer, decimals).tobytes())
+
+    return digest.hexdigest()
+
+
+def slot_hash(centers, corners, decimals=HASH_DECIMALS):
+    """
+    Hashes the slot rectangles cut into one slice body, independent of their order
+    :param centers: Rectangle centers (n, 3)
+    :param corners: Rectangle corners (n, 3)
+    :return: Hex digest
+    :rtype: str
+    """
+    rows = np.round(np.hstack((np.asarray(centers, dtype=np.float64).reshape(-1, 3),
+                               np.asarray(corners, dtype=np.float64).reshape(-1, 3))), decimals)
+    rows = rows[np.lexsort(rows.T[::-1])] if len(rows) else rows
+    return hashlib.sha1(rows.tobytes()).hexdigest()
+
+
+def diff_manifest(old_records, new_records, tolerance=1e-6):
+    """
+    Compares the slices of a previous run with the slices wanted now
+    Slices with the same family, thickness, geometry and offset are kept. Slices whose geometry only reappears at
+    another offset are moved to the nearest such offset. Everything else is created or deleted.
+    :param old_records: Records of the previous run
+    :param new_records: Records of the wanted slices, tokens are not needed
+    :param tolerance: Offset and thickness tolerance in cm
+    :rtype: ManifestDiff
+    """
+    def key(record):
+        return record.direction, round(record.thickness / tolerance), record.geometry_hash
+
+    candidates = {}
+    for index, record in enumerate(old_records):
+        candidates.setdefault(key(record), []).append(index)
+
+    keep = []
+    move = []
+    create = []
+    used = set()
+
+    pending = []
+    for record in new_records:
+        same_geometry = [i for i in candidates.get(key(record), []) if i not in used]
+        exact = [i for i in same_geometry if abs(old_records[i].offset - record.offset) <= tolerance]
+
+        if exact:
+            used.add(exact[0])
+            keep.append((old_records[exact[0]], record))
+        else:
+            pending.append(record)
+
+    for record in pending:
+        same_geometry = [i for i in candidates.get(key(record), []) if i not in used]
+
+        if same_geometry:
+            nearest = min(same_geometry, key=lambda i: abs(old_records[i].offset - record.offset))
+            used.add(nearest)
+            move.append((old_records[nearest], record))
+        else:
+            create.append(record)
+
+    delete = [record for index, record in enumerate(old_records) if index not in used]
+
+    return ManifestDiff(keep, move, create, delete)
+
+
+def to_json(records, header=None):
+    """
+    Serializes slice records and an optional header dictionary
+    :rtype: str
+    """
+    return json.dumps({'header': header or {}, 'slices': [record._asdict() for record in records]})
+
+
+def from_json(text):
+    """
+    Reads records written by to_json
+    :return: The header dictionary and the list of SliceRecord
+    :rtype: tuple
+    """
+    data = json.loads(text)
+    return data.get('header', {}), [SliceRecord(**record) for record in data.get('slices', [])]
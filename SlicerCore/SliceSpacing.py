@@ -0,0 +1,117 @@
+import numpy as np
+
+from . import MeshSection
+
+# Number of sections sampled along an axis to find where the shape changes
+PROFILE_SAMPLES = 64
+
+# Share of the slice budget spread evenly, the rest follows the shape change
+UNIFORM_WEIGHT = 0.4
+
+
+def section_profile(vertices, faces, normal, offsets):
+    """
+    Material area and outline length of the sections at each offset
+    :param vertices: Mesh vertices (n, 3), a coarse tessellation is enough
+    :param faces: Triangle vertex indices (m, 3)
+    :param normal: Section plane normal
+    :param offsets: Plane offsets along the normal
+    :return: Areas and perimeters, one per offset
+    :rtype: tuple
+    """
+    areas = np.zeros(len(offsets))
+    perimeters = np.zeros(len(offsets))
+
+    for i, loops in enumerate(MeshSection.section_mesh_batch(vertices, faces, normal, offsets)):
+        areas[i] = sum(region.area for region in MeshSection.build_regions(loops) if region.is_material)
+        perimeters[i] = sum(float(np.linalg.norm(np.roll(loop, -1, axis=0) - loop, axis=1).sum())
+                            for loop in loops)
+
+    return areas, perimeters
+
+
+def spacing_weights(positions, areas, perimeters, uniform_weight=UNIFORM_WEIGHT):
+    """
+    Share of the slice budget of every interval between sample positions
+    Intervals where the section area or outline length changes get more slices. Both changes are measured relative
+    to their largest value, so a thin shell and a solid body of the same shape are spaced alike.
+    :param positions: Increasing sample positions (k,)
+    :param areas: Section area at each position (k,)
+    :param perimeters: Section outline length at each position (k,)
+    :param uniform_weight: Share spread evenly by length
+    :return: Interval weights (k - 1,) summing to 1
+    :rtype: np.ndarray
+    """
+    lengths = np.diff(positions)
+    change = np.zeros(len(lengths))
+
+    for values in (np.asarray(areas, dtype=np.float64), np.asarray(perimeters, dtype=np.float64)):
+        largest = np.abs(values).max() if len(values) else 0.0
+        if largest > 0:
+            change += np.abs(np.diff(values)) / largest
+
+    weights = uniform_weight * lengths / lengths.sum()
+    if change.sum() > 0:
+        weights += (1 - uniform_weight) * change / change.sum()
+    else:
+        weights += (1 - uniform_weight) * lengths / lengths.sum()
+
+    return weights
+
+
+def budget_offsets(positions, weights, count, min_gap=0.0):
+    """
+    Places count slices so each holds an equal share of the weights, between the first and last position
+    Even weights give the even spacing (max - min) / (count + 1).
+    :param positions: Increasing sample positions (k,)
+    :param weights: Interval weights (k - 1,) summing to 1, see spacing_weights
+    :param count: Slice budget
+    :param min_gap: Smallest distance between slices and from the ends, the slice thickness
+    :rtype: np.ndarray
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    low, high = positions[0], positions[-1]
+
+    cumulative = np.concatenate(([0.0], np.cumsum(weights)))
+    cumulative /= cumulative[-1]
+    offsets = np.interp(np.arange(1, count + 1) / (count + 1), cumulative, positions)
+
+    # Without room for the gaps the slices stay evenly spaced
+    if min_gap * (count + 1) >= high - low:
+        return low + (high - low) * np.arange(1, count + 1) / (count + 1)
+
+    previous = low
+    for i in range(count):
+        offsets[i] = previous = max(offsets[i], previous + min_gap)
+
+    following = high
+    for i in range(count - 1, -1, -1):
+        offsets[i] = following = min(offsets[i], following - min_gap)
+
+    return offsets
+
+
+def adaptive_offsets(vertices, faces, normal, min_value, max_value, count, min_gap=0.0, samples=PROFILE_SAMPLES):
+    """
+    Slice offsets along a normal placed where the cross section changes most
+    Sections are sampled strictly inside the extent, the body ends do not pull slices towards them.
+    :param vertices: Mesh vertices (n, 3), a coarse tessellation is enough
+    :param faces: Triangle vertex indices (m, 3)
+    :param normal: Slice normal
+    :param min_value: Lowest offset of the body along the normal
+    :param max_value: Highest offset of the body along the normal
+    :param count: Slice budget
+    :param min_gap: Smallest distance between slices, the slice thickness
+    :param samples: Number of sampled sections
+    :rtype: np.ndarray
+    """
+    positions = np.linspace(min_value, max_value, samples + 2)
+    areas = np.zeros(len(positions))
+    perimeters = np.zeros(len(positions))
+    areas[1:-1], perimeters[1:-1] = section_profile(vertices, faces, normal, positions[1:-1])
+
+    # The end intervals take the change of their inner neighbours instead of the jump from nothing
+    areas[0], areas[-1] = areas[1], areas[-2]
+    perimeters[0], perimeters[-1] = perimeters[1], perimeters[-2]
+
+    return budget_offsets(positions, spacing_weights(positions, areas, perimeters), count, min_gap)
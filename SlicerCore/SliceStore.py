@@ -0,0 +1,144 @@
+from collections import namedtuple
+
+import numpy as np
+
+# One row per slice face. face and body are rows of a TokenTable, lo and hi the corners of the face bounding box.
+FACE_DTYPE = np.dtype([('slice_index', np.int64), ('face', np.int64), ('body', np.int64),
+                       ('lo', np.float64, (3,)), ('hi', np.float64, (3,))])
+
+# One row per slot post, face is the row of the slice face the post cuts
+# up, across and width place the slot rectangle, see SlotPlanner.SlotPosts
+POST_DTYPE = np.dtype([('point', np.float64, (3,)), ('length', np.float64), ('face', np.int64),
+                       ('up', np.float64, (3,)), ('across', np.float64, (3,)), ('width', np.float64)])
+
+# Posts with the face rows and entity tokens they refer to
+PostTable = namedtuple('PostTable', ('posts', 'faces', 'tokens'))
+
+
+class TokenTable:
+    """
+    Side table between array rows and Fusion entities
+    Rows hold entity tokens, an entity is only looked up with find the first time it is needed. Entities that are
+    already at hand can be passed to add so they are never looked up.
+    """
+    def __init__(self, find=None):
+        self.find = find
+        self.tokens = []
+        self.rows = {}
+        self.entities = {}
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def add(self, token, entity=None):
+        """
+        Returns the row of a token, adding it when it is new
+        :rtype: int
+        """
+        row = self.rows.get(token)
+
+        if row is None:
+            row = len(self.tokens)
+            self.tokens.append(token)
+            self.rows[token] = row
+
+        if entity is not None:
+            self.entities[row] = entity
+
+        return row
+
+    def token(self, row):
+        return self.tokens[row]
+
+    def entity(self, row):
+        """
+        The entity of a row, None if it no longer exists
+        """
+        if row not in self.entities:
+            self.entities[row] = self.find(self.tokens[row])
+        return self.entities[row]
+
+
+def face_rows(rows):
+    """
+    Builds the face array from (slice_index, face row, body row, lo, hi) tuples
+    :rtype: np.ndarray
+    """
+    return np.array(list(rows), dtype=FACE_DTYPE)
+
+
+def empty_posts():
+    """
+    Post array without rows
+    :rtype: np.ndarray
+    """
+    return np.zeros(0, dtype=POST_DTYPE)
+
+
+def posts_on_faces(faces, targets, points, lengths, top, bottom, up, across, widths, tolerance=1e-4):
+    """
+    Assigns posts to the faces of their target slice they can reach
+    A slice can have several islands, a post belongs to every face of its slice whose bounding box overlaps the
+    bounding box of the post.
+    :param faces: Face array, see FACE_DTYPE
+    :param targets: Target slice index of every post (n,)
+    :param points: Post point used for the slot of every post (n, 3)
+    :param lengths: Post lengths (n,)
+    :param top: Upper post ends (n, 3)
+    :param bottom: Lower post ends (n, 3)
+    :param up: Unit post directions (n, 3)
+    :param across: Unit slot width directions (n, 3)
+    :param widths: Slot widths (n,)
+    :param tolerance: Bounding box tolerance in cm
+    :return: Post array, one row for every post and face pair
+    :rtype: np.ndarray
+    """
+    targets = np.asarray(targets, dtype=np.int64).reshape(-1)
+    order = np.argsort(faces['slice_index'], kind='stable')
+    sorted_slices = faces['slice_index'][order]
+
+    first = np.searchsorted(sorted_slices, targets, side='left')
+    counts = np.searchsorted(sorted_slices, targets, side='right') - first
+
+    post_rows = np.repeat(np.arange(len(targets)), counts)
+    face_index = order[np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) +
+                       np.repeat(first, counts)]
+
+    top = np.asarray(top, dtype=np.float64).reshape(-1, 3)[post_rows]
+    bottom = np.asarray(bottom, dtype=np.float64).reshape(-1, 3)[post_rows]
+    overlap = np.all((np.minimum(top, bottom) <= faces['hi'][face_index] + tolerance) &
+                     (np.maximum(top, bottom) >= faces['lo'][face_index] - tolerance), axis=1)
+
+    posts = np.zeros(int(overlap.sum()), dtype=POST_DTYPE)
+    posts['point'] = np.asarray(points, dtype=np.float64).reshape(-1, 3)[post_rows[overlap]]
+    posts['length'] = np.asarray(lengths, dtype=np.float64).reshape(-1)[post_rows[overlap]]
+    posts['face'] = face_index[overlap]
+    posts['up'] = np.asarray(up, dtype=np.float64).reshape(-1, 3)[post_rows[overlap]]
+    posts['across'] = np.asarray(across, dtype=np.float64).reshape(-1, 3)[post_rows[overlap]]
+    posts['width'] = np.asarray(widths, dtype=np.float64).reshape(-1)[post_rows[overlap]]
+    return posts
+
+
+def group_posts(table):
+    """
+    Groups posts by the body they cut, in first seen order
+    :param table: PostTable
+    :return: List of (body row, post indices)
+    :rtype: list
+    """
+    bodies = table.faces['body'][table.posts['face']]
+    unique, first, inverse = np.unique(bodies, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+
+    members = np.argsort(inverse, kind='stable')
+    splits = np.split(members, np.cumsum(np.bincount(inverse, minlength=len(unique)))[:-1])
+
+    return [(int(unique[i]), splits[i]) for i in order]
+
+
+def select_posts(table, indices):
+    """
+    A table with a subset of the posts and the same side tables
+    :rtype: PostTable
+    """
+    return table._replace(posts=table.posts[np.asarray(indices, dtype=np.int64)])
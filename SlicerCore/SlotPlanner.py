@@ -0,0 +1,307 @@
+from collections import namedtuple
+
+import numpy as np
+
+from . import MeshSection
+from .SpatialIndex import IntervalIndex
+
+# Slot posts for every pair of crossing slices, one row per post
+# target and slice are slice indices, top and bottom are (k, 3) world points, length is (k,)
+# up is the unit post direction from bottom to top, across the unit slot width direction in the target plane and
+# width the slot width of each post, wider than the thickness where a slice crosses at a slant
+SlotPosts = namedtuple('SlotPosts', ('target', 'slice', 'top', 'bottom', 'length', 'up', 'across', 'width'),
+                       defaults=(None, None, None))
+
+
+def loop_segments(region_lists):
+    """
+    Flattens the loops of many sections into one segment table
+    Every loop is the outer boundary of exactly one region, so only outer loops are collected.
+    :param region_lists: One list of SectionRegion per section
+    :return: Segment start points (m, 2), end points (m, 2) and the section index of each segment
+    :rtype: tuple
+    """
+    starts = []
+    ends = []
+    owners = []
+
+    for index, regions in enumerate(region_lists):
+        for region in regions:
+            starts.append(region.outer)
+            ends.append(np.roll(region.outer, -1, axis=0))
+            owners.append(np.full(len(region.outer), index, dtype=np.int64))
+
+    if len(starts) == 0:
+        return np.zeros((0, 2)), np.zeros((0, 2)), np.zeros(0, dtype=np.int64)
+
+    return np.vstack(starts), np.vstack(ends), np.concatenate(owners)
+
+
+def line_intervals(region_lists, direction, line_offsets, shifts=None):
+    """
+    Intersects the sections of a slice family with a family of parallel lines
+    Lines are direction . p + shift = offset in the section basis. Segments are indexed by their extent across the
+    lines so only segments that actually cross a line are evaluated.
+    :param region_lists: One list of SectionRegion per section
+    :param direction: Unit 2D normal of the lines in the section basis
+    :param line_offsets: Line offsets (q,)
+    :param shifts: Optional shift of the lines in each section (s,), where slanted planes meet them
+    :return: Section index, line index, interval start and interval end for every inside interval.
+             Positions are measured along the line.
+    :rtype: tuple
+    """
+    starts, ends, owners = loop_segments(region_lists)
+    direction = np.asarray(direction, dtype=np.float64)
+    along = np.array([-direction[1], direction[0]])
+
+    start_w = starts.dot(direction)
+    end_w = ends.dot(direction)
+
+    if shifts is not None and len(owners) > 0:
+        shift = np.asarray(shifts, dtype=np.float64).reshape(-1)[owners]
+        start_w = start_w + shift
+        end_w = end_w + shift
+
+    index = IntervalIndex(np.minimum(start_w, end_w), np.maximum(start_w, end_w))
+    segments, lines = index.stab(line_offsets)
+
+    if len(segments) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), np.zeros(0)
+
+    line_offsets = np.asarray(line_offsets, dtype=np.float64).reshape(-1)
+    w0 = start_w[segments] - line_offsets[lines]
+    w1 = end_w[segments] - line_offsets[lines]
+    crossing = starts[segments] + (w0 / (w0 - w1))[:, None] * (ends[segments] - starts[segments])
+    position = crossing.dot(along)
+
+    # Even-odd pairing of sorted crossings along each (section, line)
+    section = owners[segments]
+    order = np.lexsort((position, lines, section))
+    section = section[order]
+    lines = lines[order]
+    position = position[order]
+
+    group_start = np.ones(len(order), dtype=bool)
+    group_start[1:] = (section[1:] != section[:-1]) | (lines[1:] != lines[:-1])
+    group_first = np.maximum.accumulate(np.where(group_start, np.arange(len(order)), 0))
+    rank = np.arange(len(order)) - group_first
+
+    opening = np.flatnonzero((rank % 2 == 0)[:-1] & ~group_start[1:])
+    return section[opening], lines[opening], position[opening], position[opening + 1]
+
+
+def intersect_intervals(keys_a, start_a, end_a, keys_b, start_b, end_b):
+    """
+    Intersects two sets of keyed 1D intervals, each set a union of disjoint intervals per key
+    :param keys_a: Integer key of each interval in the first set
+    :param keys_b: Integer key of each interval in the second set
+    :return: Key, start and end of every overlap
+    :rtype: tuple
+    """
+    keys = np.concatenate((keys_a, keys_a, keys_b, keys_b))
+    positions = np.concatenate((start_a, end_a, start_b, end_b))
+    steps = np.concatenate((np.ones(len(keys_a)), -np.ones(len(keys_a)),
+                            np.ones(len(keys_b)), -np.ones(len(keys_b)))).astype(np.int64)
+
+    # Closing events sort before opening events at equal positions so touching intervals do not overlap
+    order = np.lexsort((steps, positions, keys))
+    keys = keys[order]
+    positions = positions[order]
+    coverage = np.cumsum(steps[order])
+
+    # Every key returns to zero coverage, so a global running sum is correct per key
+    both = np.flatnonzero(coverage[:-1] == 2)
+    overlap = positions[both + 1] > positions[both]
+    both = both[overlap]
+
+    return keys[both], positions[both], positions[both + 1]
+
+
+def plan_posts(target_normal, target_offsets, slice_normal, slice_offsets, plus_regions, minus_regions,
+               thickness, up=(0.0, 0.0, 1.0)):
+    """
+    Computes the slot posts where one family of slices crosses another without any modeling kernel projection
+    Every crossing gives one post on the line where the mid planes of both slices meet, the post make_posts reads
+    from the projected mid face. It spans the overlap of the plus and minus sections along that line.
+    A slice crossing the targets at a slant meets a target plane along a different line at each face. Posts only
+    keep the part where the slice is inside at both lines, so a slot never opens past the slice, and the slot is
+    widened to the footprint of the slanted slice through the whole target thickness.
+    :param target_normal: Normal of the slices receiving the slots
+    :param target_offsets: Mid plane offsets of the target slices
+    :param slice_normal: Normal of the crossing slices, must not be parallel to the target normal
+    :param slice_offsets: Mid plane offsets of the crossing slices
+    :param plus_regions: Plus plane regions of each crossing slice
+    :param minus_regions: Minus plane regions of each crossing slice
+    :param thickness: Slice thickness
+    :param up: Top is the post end furthest along up. Posts perpendicular to up are ordered along the X and then the
+               Y axis instead, so every post of a slice pair points the same way.
+    :return: The posts of all slice pairs
+    :rtype: SlotPosts
+    """
+    target_normal = np.asarray(target_normal, dtype=np.float64)
+    target_normal = target_normal / np.linalg.norm(target_normal)
+    slice_normal = np.asarray(slice_normal, dtype=np.float64)
+    slice_normal = slice_normal / np.linalg.norm(slice_normal)
+
+    u, v = MeshSection.plane_basis(slice_normal)
+    direction = np.array([u.dot(target_normal), v.dot(target_normal)])
+    sine = np.linalg.norm(direction)
+    if sine < 1e-9:
+        raise ValueError('Slot planning needs crossing slice families')
+
+    cosine = target_normal.dot(slice_normal)
+    direction /= sine
+    along = np.array([-direction[1], direction[0]])
+    target_offsets = np.asarray(target_offsets, dtype=np.float64).reshape(-1)
+    slice_offsets = np.asarray(slice_offsets, dtype=np.float64).reshape(-1)
+
+    # Every post of the pair runs along the same world direction, top is the end furthest along it
+    post_direction = along[0] * u + along[1] * v
+    for axis in (up, (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)):
+        side = post_direction.dot(axis)
+        if abs(side) > 1e-9:
+            break
+    if side < 0:
+        along = -along
+        post_direction = -post_direction
+
+    # A target plane meets the plane at height h of a crossing slice along direction . p = (offset - h cos) / sin
+    line_count = len(target_offsets)
+    line_offsets = target_offsets / sine
+    plus_heights = slice_offsets + thickness / 2
+    minus_heights = slice_offsets - thickness / 2
+
+    line_sets = [line_intervals(regions, direction, line_offsets, heights * cosine / sine)
+                 for heights in ((plus_heights, minus_heights) if abs(cosine) > 1e-9 else (plus_heights,))
+                 for regions in (plus_regions, minus_regions)]
+
+    keys, starts, ends = _key_intervals(line_sets[0], line_count)
+    for line_set in line_sets[1:]:
+        keys, starts, ends = intersect_intervals(keys, starts, ends, *_key_intervals(line_set, line_count))
+
+    slices = keys // line_count
+    targets = keys % line_count
+
+    # Post end points on the mid planes of both slices
+    heights = slice_offsets[slices]
+    base = (line_offsets[targets] - heights * cosine / sine)[:, None] * direction
+    start_points = _to_world(base + starts[:, None] * along, u, v, slice_normal, heights)
+    end_points = _to_world(base + ends[:, None] * along, u, v, slice_normal, heights)
+
+    # The slice is thickness / sine wide in the target plane and moves by thickness * cos / sin through the target
+    count = len(heights)
+    across = np.cross(target_normal, post_direction)
+    width = thickness * (1 + abs(cosine)) / sine
+
+    return SlotPosts(targets, slices, end_points, start_points, ends - starts, np.tile(post_direction, (count, 1)),
+                     np.tile(across, (count, 1)), np.full(count, width))
+
+
+# Line intervals keyed by section and line
+def _key_intervals(intervals, line_count):
+    sections, lines, starts, ends = intervals
+    return sections * line_count + lines, starts, ends
+
+
+def merge_posts(posts_list):
+    """
+    Concatenates the posts of several plans
+    :param posts_list: SlotPosts with up, across and width
+    :rtype: SlotPosts
+    """
+    if len(posts_list) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        points = np.zeros((0, 3))
+        return SlotPosts(empty, empty, points, points, np.zeros(0), points, points, np.zeros(0))
+
+    return SlotPosts(*[np.concatenate(fields) for fields in zip(*posts_list)])
+
+
+# Converts section basis points at heights along the normal to world points
+def _to_world(points, u, v, normal, heights):
+    return points[:, :1] * u + points[:, 1:2] * v + heights[:, None] * normal
+
+
+# Summary of a batched slot cut, features counts sketches and cut extrudes
+SlotBatch = namedtuple('SlotBatch', ('groups', 'rectangles', 'features', 'unbatched_features'))
+
+
+def group_slots(keys):
+    """
+    Groups slot indices by the body they cut, in first seen order
+    :param keys: One hashable key per slot, usually the target body
+    :return: List of (key, list of slot indices)
+    :rtype: list
+    """
+    groups = {}
+    for index, key in enumerate(keys):
+        groups.setdefault(key, []).append(index)
+
+    return list(groups.items())
+
+
+def slot_rectangles(points, lengths, direction, thickness, up=(0.0, 0.0, 1.0)):
+    """
+    Center and corner points of the slot rectangle of every post
+    The rectangle is thickness wide along direction and as tall as the post, centered on the post point.
+    direction, thickness and up are either shared by all posts or given per post.
+    :param points: Post points (n, 3)
+    :param lengths: Post lengths (n,)
+    :param direction: Unit slot width direction (3,) or (n, 3)
+    :param thickness: Slot width, a number or (n,)
+    :param up: Unit post direction (3,) or (n, 3)
+    :return: Centers (n, 3) and corners (n, 3)
+    :rtype: tuple
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    lengths = np.asarray(lengths, dtype=np.float64).reshape(-1)
+    direction = np.asarray(direction, dtype=np.float64).reshape(-1, 3)
+    thickness = np.asarray(thickness, dtype=np.float64).reshape(-1, 1)
+    up = np.asarray(up, dtype=np.float64).reshape(-1, 3)
+
+    corners = points + direction * (thickness / 2) + up * (lengths[:, None] / 2)
+
+    return points, corners
+
+
+def slot_corners(points, lengths, direction, thickness, up=(0.0, 0.0, 1.0)):
+    """
+    Three corners of the slot rectangle of every post, in order around the rectangle
+    Unlike a center and corner pair they also place rectangles that are turned in the sketch plane.
+    :param points: Post points (n, 3)
+    :param lengths: Post lengths (n,)
+    :param direction: Unit slot width direction (3,) or (n, 3)
+    :param thickness: Slot width, a number or (n,)
+    :param up: Unit post direction (3,) or (n, 3)
+    :return: Corners (n, 3, 3)
+    :rtype: np.ndarray
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    across = np.asarray(direction, dtype=np.float64).reshape(-1, 3) * \
+        (np.asarray(thickness, dtype=np.float64).reshape(-1, 1) / 2)
+    along = np.asarray(up, dtype=np.float64).reshape(-1, 3) * \
+        (np.asarray(lengths, dtype=np.float64).reshape(-1, 1) / 2)
+
+    return np.stack((points - across - along, points + across - along, points + across + along), axis=1)
+
+
+def notched_ends(posts, use_top):
+    """
+    The post end where each slot is notched, the top end where use_top is set and the bottom end elsewhere
+    :param posts: SlotPosts
+    :param use_top: A bool for all posts or one per post
+    :rtype: np.ndarray
+    """
+    use_top = np.broadcast_to(np.asarray(use_top, dtype=bool).reshape(-1), (len(posts.length),))
+    return np.where(use_top[:, None], np.asarray(posts.top).reshape(-1, 3), np.asarray(posts.bottom).reshape(-1, 3))
+
+
+def summarize_batch(groups):
+    """
+    Feature counts of a batched slot cut compared to one sketch and one extrude per slot
+    :param groups: Result of group_slots
+    :rtype: SlotBatch
+    """
+    rectangles = sum(len(indices) for _, indices in groups)
+    return SlotBatch(len(groups), rectangles, 2 * len(groups), 2 * rectangles)
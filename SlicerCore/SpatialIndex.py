@@ -0,0 +1,249 @@
+import heapq
+
+import numpy as np
+
+
+class IntervalIndex:
+    """
+    Sorted index over 1D intervals answering many stabbing queries in one vectorized call
+    An interval (lo, hi) is stabbed by a value v when lo < v <= hi, the same half open convention the mesh
+    sections use for vertices that lie exactly on a plane.
+    """
+    def __init__(self, lo, hi):
+        self.lo = np.asarray(lo, dtype=np.float64).reshape(-1)
+        self.hi = np.asarray(hi, dtype=np.float64).reshape(-1)
+
+    def __len__(self):
+        return len(self.lo)
+
+    def stab(self, values):
+        """
+        Finds every (interval, value) pair where the value falls in the interval
+        Cost is O((n + q) log q) plus the number of pairs returned.
+        :param values: Query values (q,)
+        :return: Interval indices and value indices of all hits
+        :rtype: tuple
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        order = np.argsort(values, kind='stable')
+        sorted_values = values[order]
+
+        first = np.searchsorted(sorted_values, self.lo, side='right')
+        last = np.searchsorted(sorted_values, self.hi, side='right')
+        counts = np.maximum(last - first, 0)
+
+        total = int(counts.sum())
+        items = np.repeat(np.arange(len(self.lo)), counts)
+        slots = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(first, counts)
+
+        return items, order[slots]
+
+
+class BoxIndex:
+    """
+    Sorted sweep over axis aligned boxes answering many overlap queries in one vectorized call
+    Boxes are sorted by their lower end along the axis where they are thinnest. A query only tests the boxes that
+    start between its lower end less the longest box and its upper end. Touching boxes count as overlapping.
+    """
+    def __init__(self, lo, hi):
+        self.lo = np.asarray(lo, dtype=np.float64)
+        self.lo = self.lo.reshape(len(self.lo), -1 if len(self.lo) else self.lo.shape[-1])
+        self.hi = np.asarray(hi, dtype=np.float64).reshape(self.lo.shape)
+
+        extents = self.hi - self.lo
+        self.axis = int(np.argmin(extents.max(axis=0))) if len(self.lo) else 0
+        self.longest = float(extents[:, self.axis].max()) if len(self.lo) else 0.0
+
+        self.order = np.argsort(self.lo[:, self.axis], kind='stable')
+        self.sorted_lo = self.lo[self.order, self.axis]
+
+    def __len__(self):
+        return len(self.lo)
+
+    def overlaps(self, lo, hi, tolerance=0.0):
+        """
+        Finds every (query, box) pair whose boxes overlap
+        :param lo: Query box minimums (q, d)
+        :param hi: Query box maximums (q, d)
+        :param tolerance: Gap still counted as overlapping
+        :return: Query indices and box indices of all overlapping pairs, by query then by box start
+        :rtype: tuple
+        """
+        lo = np.asarray(lo, dtype=np.float64).reshape(-1, self.lo.shape[1])
+        hi = np.asarray(hi, dtype=np.float64).reshape(lo.shape)
+
+        first = np.searchsorted(self.sorted_lo, lo[:, self.axis] - self.longest - tolerance, side='left')
+        last = np.searchsorted(self.sorted_lo, hi[:, self.axis] + tolerance, side='right')
+        counts = np.maximum(last - first, 0)
+
+        queries = np.repeat(np.arange(len(lo)), counts)
+        slots = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(first, counts)
+        boxes = self.order[slots]
+
+        overlap = np.all((lo[queries] <= self.hi[boxes] + tolerance) & (hi[queries] >= self.lo[boxes] - tolerance),
+                         axis=1)
+        return queries[overlap], boxes[overlap]
+
+
+class GridIndex:
+    """
+    Uniform grid over 2D boxes for incremental overlap queries
+    Each box is registered in every cell it touches, so with a cell size near the typical box size inserts and
+    queries touch a constant number of cells.
+    """
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        self.boxes = {}
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _cells(self, lo, hi):
+        i0, j0 = int(np.floor(lo[0] / self.cell_size)), int(np.floor(lo[1] / self.cell_size))
+        i1, j1 = int(np.floor(hi[0] / self.cell_size)), int(np.floor(hi[1] / self.cell_size))
+        return [(i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+
+    def insert(self, item, lo, hi):
+        """
+        Adds a box
+        :param item: Hashable key returned by query
+        :param lo: Box minimum (2,)
+        :param hi: Box maximum (2,)
+        """
+        self.boxes[item] = (float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1]), len(self.boxes))
+        for cell in self._cells(lo, hi):
+            self.cells.setdefault(cell, []).append(item)
+
+    def query(self, lo, hi):
+        """
+        Finds every box overlapping a query box, touching boxes count as overlapping
+        :return: Items in insertion order
+        :rtype: list
+        """
+        found = {}
+
+        for cell in self._cells(lo, hi):
+            for item in self.cells.get(cell, ()):
+                if item not in found:
+                    x0, y0, x1, y1, order = self.boxes[item]
+                    if x0 <= hi[0] and y0 <= hi[1] and lo[0] <= x1 and lo[1] <= y1:
+                        found[item] = order
+
+        return sorted(found, key=found.get)
+
+
+class KDTree:
+    """
+    k-d tree over points that supports removal, for nearest neighbour queries while a tour is built
+    Points are split at the median of the widest axis down to leaves of at most leaf_size points. Every node keeps
+    its bounding box and the number of points not removed yet, so searches skip empty subtrees.
+    """
+    def __init__(self, points, leaf_size=8):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.points = self.points.reshape(len(self.points), -1)
+        self.leaf_size = leaf_size
+        self.alive = np.ones(len(self.points), dtype=bool)
+
+        # Node fields as parallel lists, children are -1 for leaves
+        self.starts = []
+        self.ends = []
+        self.left = []
+        self.right = []
+        self.parent = []
+        self.counts = []
+        self.lo = []
+        self.hi = []
+
+        self.order = np.arange(len(self.points))
+        self.leaf_of = np.zeros(len(self.points), dtype=np.int64)
+
+        if len(self.points) > 0:
+            self._build(0, len(self.points), -1)
+
+    def __len__(self):
+        return self.counts[0] if self.counts else 0
+
+    def _build(self, start, end, parent):
+        node = len(self.starts)
+        members = self.order[start:end]
+        points = self.points[members]
+
+        self.starts.append(start)
+        self.ends.append(end)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.parent.append(parent)
+        self.counts.append(end - start)
+        self.lo.append(points.min(axis=0))
+        self.hi.append(points.max(axis=0))
+
+        if end - start <= self.leaf_size:
+            self.leaf_of[members] = node
+            return node
+
+        axis = int(np.argmax(self.hi[node] - self.lo[node]))
+        middle = (end - start) // 2
+        self.order[start:end] = members[np.argpartition(points[:, axis], middle)]
+
+        self.left[node] = self._build(start, start + middle, node)
+        self.right[node] = self._build(start + middle, end, node)
+        return node
+
+    def remove(self, index):
+        """
+        Removes a point from all further queries
+        :param index: Point index
+        """
+        if not self.alive[index]:
+            return
+
+        self.alive[index] = False
+        node = int(self.leaf_of[index])
+        while node != -1:
+            self.counts[node] -= 1
+            node = self.parent[node]
+
+    def _box_distance(self, node, point):
+        gap = np.maximum(self.lo[node] - point, 0) + np.maximum(point - self.hi[node], 0)
+        return float(np.sqrt(gap.dot(gap)))
+
+    def nearest(self, point, k=1):
+        """
+        Finds the k nearest points that were not removed
+        :param point: Query point
+        :param k: Number of neighbours
+        :return: Point indices and distances, nearest first
+        :rtype: tuple
+        """
+        point = np.asarray(point, dtype=np.float64).reshape(-1)
+        found_index = np.zeros(0, dtype=np.int64)
+        found_distance = np.zeros(0)
+
+        if len(self) == 0:
+            return found_index, found_distance
+
+        heap = [(self._box_distance(0, point), 0)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if len(found_distance) == k and distance > found_distance[-1]:
+                break
+
+            if self.left[node] == -1:
+                members = self.order[self.starts[node]:self.ends[node]]
+                members = members[self.alive[members]]
+                offsets = self.points[members] - point
+                distances = np.sqrt(np.einsum('ij,ij->i', offsets, offsets))
+
+                found_index = np.concatenate((found_index, members))
+                found_distance = np.concatenate((found_distance, distances))
+                best = np.argsort(found_distance, kind='stable')[:k]
+                found_index = found_index[best]
+                found_distance = found_distance[best]
+                continue
+
+            for child in (self.left[node], self.right[node]):
+                if self.counts[child] > 0:
+                    heapq.heappush(heap, (self._box_distance(child, point), child))
+
+        return found_index, found_distance
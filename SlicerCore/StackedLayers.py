@@ -0,0 +1,301 @@
+from collections import namedtuple
+
+import numpy as np
+
+from . import MeshSection
+from .SlotPlanner import loop_segments
+
+# Dowel between two adjacent layers, lower is the index of the lower layer and center its (x, y) in the layer basis
+# clearance is the distance from the center to the nearest outline of either layer
+Dowel = namedtuple('Dowel', ('lower', 'center', 'clearance'))
+
+# Dowels placed between every pair of adjacent layers, two keep the layers from turning
+DOWELS_PER_PAIR = 2
+
+# Candidate grid cells along the longer side of a layer pair
+DOWEL_SAMPLES = 24
+
+# Passes of the local search that refines the largest inscribed circle
+INSCRIBED_REFINEMENTS = 4
+
+# Straight segments of a round hole loop in cut files
+HOLE_SEGMENTS = 24
+
+# Tiles along the longer side of the points boundary_distance measures, each tile only measures nearby segments
+DISTANCE_TILES = 8
+
+
+def layer_offsets(min_value, max_value, thickness):
+    """
+    Mid plane offsets of stacked layers of one sheet thickness filling an extent, the top layer may overhang it
+    :param min_value: Lowest offset of the body along the layer normal
+    :param max_value: Highest offset of the body along the layer normal
+    :param thickness: Sheet thickness
+    :rtype: np.ndarray
+    """
+    count = max(int(np.ceil((max_value - min_value) / thickness - 1e-9)), 0)
+    return min_value + thickness * (np.arange(count) + 0.5)
+
+
+def material_mask(points, region_lists):
+    """
+    Tests which points are inside the material of every section, the intersection of the sections
+    Each loop is the outer boundary of one region, so material is where an odd number of loops contain a point.
+    :param points: Points (n, 2)
+    :param region_lists: One list of SectionRegion per section
+    :rtype: np.ndarray
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    inside = np.ones(len(points), dtype=bool)
+
+    for regions in region_lists:
+        candidates = np.flatnonzero(inside)
+        in_section = np.zeros(len(candidates), dtype=bool)
+        for region in regions:
+            in_section ^= MeshSection.points_in_polygon(points[candidates], region.outer)
+        inside[candidates] = in_section
+
+    return inside
+
+
+def boundary_distance(points, region_lists, tiles=DISTANCE_TILES):
+    """
+    Distance from every point to the nearest loop of any section
+    Inside the material of all sections this is the radius of the largest circle around the point that fits in the
+    intersection of the sections.
+    Points are grouped in square tiles. A segment further from a tile center than the nearest segment plus the tile
+    diagonal cannot be nearest to any point of the tile, so each tile only measures the segments around it.
+    :param points: Points (n, 2)
+    :param region_lists: One list of SectionRegion per section
+    :param tiles: Tiles along the longer side of the points
+    :rtype: np.ndarray
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    starts, ends, _ = loop_segments(region_lists)
+    distances = np.full(len(points), np.inf)
+
+    if len(starts) == 0 or len(points) == 0:
+        return distances
+
+    lo = points.min(axis=0)
+    size = max((points.max(axis=0) - lo).max() / tiles, 1e-9)
+    cells = np.floor((points - lo) / size).astype(np.int64)
+    keys = cells[:, 0] * (tiles + 1) + cells[:, 1]
+    unique, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    centers = lo + (np.column_stack((unique // (tiles + 1), unique % (tiles + 1))) + 0.5) * size
+    center_distances = _segment_distances(centers, starts, ends)
+    reach = center_distances.min(axis=1) + np.sqrt(2) * size
+
+    members = np.argsort(inverse, kind='stable')
+    splits = np.split(members, np.cumsum(np.bincount(inverse, minlength=len(unique)))[:-1])
+
+    for tile, tile_points in enumerate(splits):
+        near = center_distances[tile] <= reach[tile]
+        distances[tile_points] = _segment_distances(points[tile_points], starts[near], ends[near]).min(axis=1)
+
+    return distances
+
+
+# Distances between every point and every segment (n, m)
+def _segment_distances(points, starts, ends):
+    dx = points[:, :1] - starts[:, 0]
+    dy = points[:, 1:] - starts[:, 1]
+    ex = ends[:, 0] - starts[:, 0]
+    ey = ends[:, 1] - starts[:, 1]
+    t = np.clip((dx * ex + dy * ey) / np.maximum(ex * ex + ey * ey, 1e-18), 0.0, 1.0)
+    return np.hypot(dx - t * ex, dy - t * ey)
+
+
+# Cell centers of a grid over the common bounding box of the sections, with their clearance where they are inside
+# Returns the points inside all sections, their clearance and the cell size, or None when the sections do not overlap
+def _candidates(region_lists, samples):
+    lo = np.full(2, -np.inf)
+    hi = np.full(2, np.inf)
+
+    for regions in region_lists:
+        if len(regions) == 0:
+            return None
+        loops = np.vstack([region.outer for region in regions])
+        lo = np.maximum(lo, loops.min(axis=0))
+        hi = np.minimum(hi, loops.max(axis=0))
+
+    if np.any(hi <= lo):
+        return None
+
+    step = (hi - lo).max() / samples
+    x = np.arange(lo[0] + step / 2, hi[0], step)
+    y = np.arange(lo[1] + step / 2, hi[1], step)
+    points = np.column_stack([axis.reshape(-1) for axis in np.meshgrid(x, y)])
+
+    points = points[material_mask(points, region_lists)]
+    return points, boundary_distance(points, region_lists), step
+
+
+def inscribed_circle(region_lists, samples=DOWEL_SAMPLES, refinements=INSCRIBED_REFINEMENTS):
+    """
+    Center and radius of the largest circle inside the material of every section
+    A grid search finds the best cell, each refinement searches a finer grid around the best point so far.
+    :param region_lists: One list of SectionRegion per section
+    :param samples: Grid cells along the longer side of the common bounding box
+    :param refinements: Refinement passes, each one thirds the cell size
+    :return: Center (2,) and radius, None and 0 when the sections share no material
+    :rtype: tuple
+    """
+    candidates = _candidates(region_lists, samples)
+    if candidates is None or len(candidates[0]) == 0:
+        return None, 0.0
+
+    return _refine_circle(region_lists, *candidates, refinements)
+
+
+# Best grid point refined by searching finer grids around it
+def _refine_circle(region_lists, points, clearances, step, refinements):
+    best = int(np.argmax(clearances))
+    center, radius = points[best], float(clearances[best])
+
+    offsets = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)], dtype=np.float64)
+    for _ in range(refinements):
+        step /= 3
+        points = center + offsets * step
+        points = points[material_mask(points, region_lists)]
+        clearances = boundary_distance(points, region_lists)
+        if len(points) and clearances.max() > radius:
+            best = int(np.argmax(clearances))
+            center, radius = points[best], float(clearances[best])
+
+    return center, radius
+
+
+def place_dowels(region_lists, radius, count=DOWELS_PER_PAIR, wall=None, keep_out=(), samples=DOWEL_SAMPLES):
+    """
+    Dowel centers inside the material of every section, spread as far apart as the shape allows
+    The first dowel sits at the center of the largest inscribed circle, every further one at the candidate furthest
+    from the dowels placed so far. Dowels keep wall between their holes and from every outline.
+    :param region_lists: One list of SectionRegion per section
+    :param radius: Dowel hole radius
+    :param count: Most dowels to place
+    :param wall: Material left around a hole, the radius when None
+    :param keep_out: Centers of holes already in these sections, new holes keep wall from them
+    :param samples: Candidate grid cells along the longer side of the common bounding box
+    :return: Centers (k, 2) and clearances (k,), fewer than count where the sections are too narrow
+    :rtype: tuple
+    """
+    wall = radius if wall is None else wall
+    candidates = _candidates(region_lists, samples)
+    if candidates is None or len(candidates[0]) == 0:
+        return np.zeros((0, 2)), np.zeros(0)
+
+    points, clearances, step = candidates
+    keep_out = np.asarray(keep_out, dtype=np.float64).reshape(-1, 2)
+
+    center, inscribed = _refine_circle(region_lists, points, clearances, step, INSCRIBED_REFINEMENTS)
+    points = np.vstack((center, points))
+    clearances = np.concatenate(([inscribed], clearances))
+
+    spacing = 2 * radius + wall
+    valid = clearances >= radius + wall
+    if len(keep_out):
+        valid &= np.linalg.norm(points[:, None] - keep_out, axis=2).min(axis=1) >= spacing
+
+    chosen = []
+    nearest = np.full(len(points), np.inf)
+
+    for _ in range(count):
+        usable = np.flatnonzero(valid & (nearest >= spacing))
+        if len(usable) == 0:
+            break
+
+        # The first dowel takes the most room, later ones the most distance
+        score = clearances[usable] if len(chosen) == 0 else nearest[usable]
+        index = int(usable[np.argmax(score)])
+        chosen.append(index)
+        nearest = np.minimum(nearest, np.linalg.norm(points - points[index], axis=1))
+
+    return points[chosen], clearances[chosen]
+
+
+def stack_dowels(boundary_regions, radius, count=DOWELS_PER_PAIR, wall=None, samples=DOWEL_SAMPLES):
+    """
+    Dowels between every pair of adjacent layers
+    Layer k is the material between boundary sections k and k + 1, so a pair of layers is bounded by three sections.
+    A dowel passes through both layers of its pair, so it stays clear of the dowels of the pair below, which share
+    the lower layer.
+    :param boundary_regions: Regions of the sections between the layers, one more than there are layers
+    :param radius: Dowel hole radius
+    :param count: Most dowels per pair
+    :param wall: Material left around a hole, the radius when None
+    :param samples: Candidate grid cells along the longer side of a pair
+    :return: List of Dowel
+    :rtype: list
+    """
+    dowels = []
+    below = np.zeros((0, 2))
+
+    for lower in range(len(boundary_regions) - 2):
+        centers, clearances = place_dowels(boundary_regions[lower:lower + 3], radius, count, wall, below, samples)
+        dowels.extend(Dowel(lower, center, float(clearance)) for center, clearance in zip(centers, clearances))
+        below = centers
+
+    return dowels
+
+
+def layer_holes(dowels, layer_count):
+    """
+    Hole centers of every layer, a layer holds the dowels of the pairs above and below it
+    :param dowels: List of Dowel
+    :param layer_count: Number of layers
+    :return: One array (k, 2) per layer
+    :rtype: list
+    """
+    holes = [[] for _ in range(layer_count)]
+
+    for dowel in dowels:
+        holes[dowel.lower].append(dowel.center)
+        holes[dowel.lower + 1].append(dowel.center)
+
+    return [np.array(centers).reshape(-1, 2) for centers in holes]
+
+
+def hole_posts(holes, normals, offsets):
+    """
+    Layer holes as posts along the layer normal, the layout SliceStore.posts_on_faces takes
+    :param holes: One array of centers (k, 2) per layer, see layer_holes
+    :param normals: Normal of every layer, one for all (3,) or one per layer
+    :param offsets: Mid plane offset of every layer
+    :return: Layer index (n,), world points (n, 3), unit normals (n, 3) and unit width directions (n, 3)
+    :rtype: tuple
+    """
+    normals = np.broadcast_to(np.asarray(normals, dtype=np.float64).reshape(-1, 3), (len(holes), 3))
+    targets = []
+    points = []
+    ups = []
+    acrosses = []
+
+    for layer, (centers, normal, offset) in enumerate(zip(holes, normals, offsets)):
+        normal = normal / np.linalg.norm(normal)
+        u, _ = MeshSection.plane_basis(normal)
+        targets.append(np.full(len(centers), layer, dtype=np.int64))
+        points.append(MeshSection.unproject_points(centers, normal, offset))
+        ups.append(np.tile(normal, (len(centers), 1)))
+        acrosses.append(np.tile(u, (len(centers), 1)))
+
+    if len(targets) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((0, 3))
+
+    return np.concatenate(targets), np.vstack(points), np.vstack(ups), np.vstack(acrosses)
+
+
+def hole_loops(centers, radius, segments=HOLE_SEGMENTS):
+    """
+    Round holes as clockwise polygons, the orientation of section holes
+    :param centers: Hole centers (k, 2)
+    :param radius: Hole radius
+    :param segments: Straight segments of each hole
+    :return: One loop (segments, 2) per hole
+    :rtype: list
+    """
+    angles = -2 * np.pi * np.arange(segments) / segments
+    circle = radius * np.column_stack((np.cos(angles), np.sin(angles)))
+    return [center + circle for center in np.asarray(centers, dtype=np.float64).reshape(-1, 2)]
@@ -0,0 +1,370 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from . import MeshSection
+from .CutFiles import placed_parts
+from .SpatialIndex import KDTree
+
+# Cutter and machine settings in cm and cm per minute, the units of the slicing pipeline
+# step_down of None cuts the full depth in one pass
+ToolSettings = namedtuple('ToolSettings', ('radius', 'depth', 'step_down', 'safe_height', 'feed_rate',
+                                           'plunge_rate', 'spindle_speed'),
+                          defaults=(None, 0.5, 150.0, 50.0, 18000))
+
+# Closed tool center path of one loop, kind is one of 'slot', 'hole' and 'outer'
+ToolPath = namedtuple('ToolPath', ('kind', 'points'))
+
+# All tool paths of one part in cut order
+PartPaths = namedtuple('PartPaths', ('name', 'paths'))
+
+# Neighbours checked per point by the 2-opt pass
+TOUR_NEIGHBOURS = 8
+
+# Longest miter of an offset corner as a multiple of the offset distance
+MITER_LIMIT = 4.0
+
+
+def offset_loop(loop, distance, miter_limit=MITER_LIMIT):
+    """
+    Offsets a closed loop to the right of its direction of travel
+    Counter-clockwise loops grow and clockwise loops shrink for a positive distance. Vertices move along the
+    corner bisector so straight edges stay exactly distance away, sharp corners are clamped to miter_limit.
+    Edges shorter than the offset can come out reversed and tie the path into a swallowtail, those edges are
+    dropped and their neighbours extended to meet, so the result can have fewer points than the loop.
+    :param loop: Loop points (k, 2)
+    :param distance: Offset distance, negative offsets to the left
+    :rtype: np.ndarray
+    """
+    loop = np.asarray(loop, dtype=np.float64)
+    edges = np.roll(loop, -1, axis=0) - loop
+    lengths = np.linalg.norm(edges, axis=1)
+    keep = lengths > 1e-12
+    loop = loop[keep]
+    edges = edges[keep] / lengths[keep, None]
+
+    normals = np.column_stack((edges[:, 1], -edges[:, 0]))
+    previous = np.roll(normals, 1, axis=0)
+    bisector = normals + previous
+    scale = 1 + np.einsum('ij,ij->i', normals, previous)
+    scale = np.maximum(scale, 2.0 / miter_limit ** 2)
+
+    path = loop + bisector * (distance / scale)[:, None]
+    return _drop_inverted(path, loop + normals * distance, edges)
+
+
+# Removes offset edges that run against their loop edge, one at a time until none is left
+# The vertex between the two neighbours moves to the crossing of their offset lines. Neighbours running in
+# opposite directions never meet, the feature between them is thinner than the offset and goes as a whole.
+def _drop_inverted(path, anchors, edges):
+    while len(path) > 3:
+        steps = np.roll(path, -1, axis=0) - path
+        along = np.einsum('ij,ij->i', steps, edges)
+        if along.min() >= -1e-12:
+            break
+
+        count = len(path)
+        first = last = int(np.argmin(along))
+        before, after = (first - 1) % count, (last + 1) % count
+        if _cross(edges[before], edges[after]) ** 2 < 1e-18 and np.dot(edges[before], edges[after]) < 0:
+            if count < 5:
+                return path[:0]
+            first, last = first - 1, last + 1
+            before, after = (first - 1) % count, (last + 1) % count
+
+        corner = _line_crossing(anchors[before], edges[before], anchors[after], edges[after])
+        if corner is None:
+            corner = (path[first % count] + path[after]) / 2
+        path[after] = corner
+
+        removed = np.arange(first, last + 1) % count
+        path, anchors, edges = (np.delete(array, removed, axis=0) for array in (path, anchors, edges))
+
+    return path
+
+
+# Z component of the cross product of two 2D vectors
+def _cross(a, b):
+    return a[0] * b[1] - a[1] * b[0]
+
+
+# Crossing of the lines through a along u and through b along v, None for parallel lines
+def _line_crossing(a, u, b, v):
+    denominator = _cross(u, v)
+    if denominator ** 2 < 1e-18:
+        return None
+    return a + u * (_cross(b - a, v) / denominator)
+
+
+def dog_bone(path, corners, relieved, radius):
+    """
+    Adds a relief move into the relieved corners of an offset path, so a round tool clears square inside corners
+    The tool runs from the offset corner towards the true corner until its edge touches it, then back.
+    :param path: Offset path (k, 2), vertex i is the offset of corner i
+    :param corners: Corners before the offset (k, 2)
+    :param relieved: Bool per corner
+    :param radius: Tool radius
+    :rtype: np.ndarray
+    """
+    points = []
+
+    for point, corner, relief in zip(path, corners, relieved):
+        points.append(point)
+
+        reach = np.linalg.norm(corner - point)
+        if relief and reach > radius:
+            points.append(point + (corner - point) * ((reach - radius) / reach))
+            points.append(point)
+
+    return np.array(points)
+
+
+def inside_part(points, part):
+    """
+    Tests which points are inside the material of a part
+    :param points: Points (n, 2)
+    :param part: CutPart
+    :rtype: np.ndarray
+    """
+    inside = np.zeros(len(points), dtype=bool)
+
+    for outer in part.outers:
+        inside ^= MeshSection.points_in_polygon(points, outer)
+    for hole in part.holes:
+        inside ^= MeshSection.points_in_polygon(points, hole)
+
+    return inside
+
+
+def part_paths(part, radius):
+    """
+    Tool center paths of one part, slots and holes are cut before the outer loops so the part stays held
+    Loops narrower than the tool cannot be cut and are left out.
+    :param part: CutPart in sheet coordinates
+    :param radius: Tool radius
+    :rtype: PartPaths
+    """
+    paths = []
+
+    for slot in part.slots:
+        slot = np.asarray(slot, dtype=np.float64)
+        path = _offset_checked(slot, -radius)
+        if path is not None and len(path) == len(slot):
+            path = dog_bone(path, slot, inside_part(slot, part), radius)
+        if path is not None:
+            paths.append(ToolPath('slot', path))
+
+    for hole in part.holes:
+        path = _offset_checked(hole, radius)
+        if path is not None:
+            paths.append(ToolPath('hole', path))
+
+    inner_count = len(paths)
+    paths[:inner_count] = _order_paths(paths[:inner_count])
+
+    for outer in part.outers:
+        path = _offset_checked(outer, radius)
+        if path is not None:
+            paths.append(ToolPath('outer', path))
+
+    return PartPaths(part.name, paths)
+
+
+# Offsets a loop and drops it when the offset turned it inside out
+def _offset_checked(loop, distance):
+    loop = np.asarray(loop, dtype=np.float64)
+    area = MeshSection.loop_area(loop)
+    path = offset_loop(loop, distance)
+
+    if len(path) < 3 or MeshSection.loop_area(path) * area <= 0:
+        return None
+    if abs(MeshSection.loop_area(path)) > abs(area) and (distance > 0) != (area > 0):
+        return None
+
+    return path
+
+
+# Orders the inner paths of a part by a greedy nearest neighbour walk, parts hold only a few inner loops
+def _order_paths(paths):
+    ordered = []
+    remaining = list(paths)
+    position = np.zeros(2)
+
+    while remaining:
+        best = min(range(len(remaining)), key=lambda i: np.linalg.norm(remaining[i].points[0] - position))
+        path = remaining.pop(best)
+        ordered.append(path)
+        position = path.points[0]
+
+    return ordered
+
+
+def tour_order(points, start=(0.0, 0.0), max_passes=10):
+    """
+    Short open tour through points beginning at start, a greedy nearest neighbour walk improved by 2-opt
+    The walk and the 2-opt candidates use a KDTree, so the cost grows with n log n instead of n squared.
+    :param points: Points (n, 2)
+    :param start: Fixed start of the tour, not part of the result
+    :param max_passes: Most 2-opt passes over all points
+    :return: Point indices in visiting order
+    :rtype: list
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return list(range(len(points)))
+
+    tree = KDTree(points)
+    tour = []
+    position = np.asarray(start, dtype=np.float64)
+
+    while len(tree) > 0:
+        index = int(tree.nearest(position)[0][0])
+        tree.remove(index)
+        tour.append(index)
+        position = points[index]
+
+    # The start is node 0 of the 2-opt path and never moves
+    nodes = np.vstack((np.asarray(start, dtype=np.float64), points))
+    path = [0] + [index + 1 for index in tour]
+    _two_opt(nodes, path, max_passes)
+
+    return [node - 1 for node in path[1:]]
+
+
+# 2-opt on an open path with neighbour lists
+# For a node a with successor b, every neighbour c closer than b is tried as the new successor of a
+# Reversing the path between them swaps edges (a, b) and (c, d) for (a, c) and (b, d)
+def _two_opt(nodes, path, max_passes):
+    count = len(path)
+    neighbours = KDTree(nodes).nearest
+    candidates = [neighbours(nodes[node], TOUR_NEIGHBOURS + 1)[0][1:].tolist() for node in range(count)]
+    position = [0] * count
+    for i, node in enumerate(path):
+        position[node] = i
+
+    def distance(a, b):
+        return float(np.hypot(*(nodes[a] - nodes[b])))
+
+    def reverse(first, last):
+        path[first:last + 1] = path[first:last + 1][::-1]
+        for k in range(first, last + 1):
+            position[path[k]] = k
+
+    for _ in range(max_passes):
+        improved = False
+
+        for a in range(count):
+            i = position[a]
+            if i + 1 >= count:
+                continue
+
+            for c in candidates[a]:
+                b = path[i + 1]
+                ab = distance(a, b)
+                ac = distance(a, c)
+                if ac >= ab:
+                    break
+
+                j = position[c]
+                if j > i + 1:
+                    # An open path has no edge after its last node
+                    cd = distance(c, path[j + 1]) - distance(b, path[j + 1]) if j + 1 < count else 0.0
+                    if ab + cd - ac > 1e-9:
+                        reverse(i + 1, j)
+                        improved = True
+                elif j < i:
+                    d = path[j + 1]
+                    if distance(c, d) + ab - ac - distance(d, b) > 1e-9:
+                        reverse(j + 1, i)
+                        improved = True
+                        i = position[a]
+
+        if not improved:
+            break
+
+
+def tour_length(points, order, start=(0.0, 0.0)):
+    """
+    Travel length of an open tour from start through points in order
+    :rtype: float
+    """
+    points = np.vstack((np.asarray(start, dtype=np.float64), np.asarray(points, dtype=np.float64)[order]))
+    return float(np.linalg.norm(np.diff(points, axis=0), axis=1).sum())
+
+
+def plan_sheet(parts, placements, radius):
+    """
+    Tool paths of every part on one sheet in cut order
+    :param parts: Sequence of CutPart indexed by placement.part
+    :param placements: Placements of one sheet
+    :param radius: Tool radius
+    :rtype: list
+    """
+    sheet_paths = [paths for paths in (part_paths(part, radius) for part in placed_parts(parts, placements))
+                   if len(paths.paths) > 0]
+    order = tour_order([paths.paths[0].points[0] for paths in sheet_paths])
+    return [sheet_paths[i] for i in order]
+
+
+def gcode_lines(sheet_paths, settings, scale=10.0):
+    """
+    Streams the G-code of one sheet, every path is cut in passes of settings.step_down
+    :param sheet_paths: PartPaths in cut order, see plan_sheet
+    :param settings: ToolSettings
+    :param scale: Millimeters per cm, the program is written in millimeters
+    :rtype: generator
+    """
+    step_down = settings.step_down or settings.depth
+    depths = np.append(np.arange(step_down, settings.depth, step_down), settings.depth)
+    safe = settings.safe_height * scale
+
+    yield 'G21 G90 G17\n'
+    yield 'M3 S%d\n' % settings.spindle_speed
+    yield 'G0 Z%.3f\n' % safe
+
+    for part in sheet_paths:
+        yield '(%s)\n' % part.name
+        for path in part.paths:
+            points = path.points * scale
+            yield 'G0 X%.3f Y%.3f\n' % tuple(points[0])
+
+            for depth in depths.tolist():
+                yield 'G1 Z%.3f F%.1f\n' % (-depth * scale, settings.plunge_rate * scale)
+                yield 'G1 X%.3f Y%.3f F%.1f\n' % (points[1][0], points[1][1], settings.feed_rate * scale)
+                for x, y in points[2:].tolist() + [points[0].tolist()]:
+                    yield 'G1 X%.3f Y%.3f\n' % (x, y)
+
+            yield 'G0 Z%.3f\n' % safe
+
+    yield 'M5\n'
+    yield 'G0 X0 Y0\n'
+    yield 'M30\n'
+
+
+def write_gcode(parts, nest_result, directory, settings, base_name='Sheet'):
+    """
+    Writes one G-code program per sheet
+    :param parts: Sequence of CutPart, the parts that were nested
+    :param nest_result: NestResult of the part outer loops
+    :param directory: Output folder, created when missing
+    :param settings: ToolSettings
+    :param base_name: File name prefix, the sheet number is appended
+    :return: The written file names
+    :rtype: list
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    sheets = [[] for _ in range(nest_result.sheet_count)]
+    for placement in nest_result.placements:
+        sheets[placement.sheet].append(placement)
+
+    file_names = []
+    for index, placements in enumerate(sheets):
+        file_name = os.path.join(directory, '%s-%d.nc' % (base_name, index + 1))
+        with open(file_name, 'w') as gcode_file:
+            gcode_file.writelines(gcode_lines(plan_sheet(parts, placements, settings.radius), settings))
+        file_names.append(file_name)
+
+    return file_names
@@ -0,0 +1,118 @@
+import numpy as np
+
+
+def grid_mesh(points, closed_u=True):
+    """
+    Triangulates a (rows, columns, 3) grid of points that is periodic along the columns
+    :param points: Grid points, rows run from one end of the surface to the other
+    :param closed_u: Also connect the last row back to the first, for surfaces closed in both directions
+    :return: Vertices (n, 3) and triangles (m, 3)
+    :rtype: tuple
+    """
+    rows, columns = points.shape[:2]
+    index = np.arange(rows * columns).reshape(rows, columns)
+
+    row_count = rows if closed_u else rows - 1
+    a = index[:row_count]
+    b = np.roll(index, -1, axis=0)[:row_count]
+    c = np.roll(b, -1, axis=1)
+    d = np.roll(a, -1, axis=1)
+
+    faces = np.vstack((np.column_stack((a.ravel(), b.ravel(), c.ravel())),
+                       np.column_stack((a.ravel(), c.ravel(), d.ravel()))))
+    return points.reshape(-1, 3), faces
+
+
+def sphere(radius=5.0, segments=96, center=(0.0, 0.0, 0.0)):
+    """
+    Closed latitude longitude sphere with outward facing triangles
+    :rtype: tuple
+    """
+    rings = segments // 2
+    polar = np.linspace(0, np.pi, rings + 1)[1:-1]
+    azimuth = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    p, a = np.meshgrid(polar, azimuth, indexing='ij')
+
+    grid = np.stack((np.sin(p) * np.cos(a), np.sin(p) * np.sin(a), np.cos(p)), axis=-1) * radius
+    vertices, faces = grid_mesh(grid, closed_u=False)
+
+    # Fans to the two poles
+    count = len(vertices)
+    top = np.arange(segments)
+    bottom = (rings - 2) * segments + np.arange(segments)
+
+    top_faces = np.column_stack((np.full(segments, count), top, np.roll(top, -1)))
+    bottom_faces = np.column_stack((np.full(segments, count + 1), np.roll(bottom, -1), bottom))
+
+    vertices = np.vstack((vertices, [[0.0, 0.0, radius], [0.0, 0.0, -radius]]))
+    faces = np.vstack((faces, top_faces, bottom_faces))
+
+    return _oriented(vertices + np.asarray(center), faces)
+
+
+def torus(major_radius=6.0, minor_radius=2.0, segments=128, center=(0.0, 0.0, 0.0)):
+    """
+    Closed torus around the z axis with outward facing triangles
+    :rtype: tuple
+    """
+    tube = np.linspace(0, 2 * np.pi, segments // 2, endpoint=False)
+    azimuth = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    t, a = np.meshgrid(tube, azimuth, indexing='ij')
+
+    ring = major_radius + minor_radius * np.cos(t)
+    grid = np.stack((ring * np.cos(a), ring * np.sin(a), minor_radius * np.sin(t)), axis=-1)
+    vertices, faces = grid_mesh(grid, closed_u=True)
+
+    return _oriented(vertices + np.asarray(center), faces)
+
+
+def box(size=(8.0, 6.0, 4.0), center=(0.0, 0.0, 0.0)):
+    """
+    Closed axis aligned box with outward facing triangles, its sections do not change through a slice
+    :rtype: tuple
+    """
+    corners = np.array([[x, y, z] for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+    faces = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+                      [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]])
+
+    return _oriented(corners * np.asarray(size) + np.asarray(center), faces)
+
+
+def hollow_shell(radius=5.0, wall=0.5, segments=96, center=(0.0, 0.0, 0.0)):
+    """
+    Sphere with a concentric spherical void, the inner surface faces the void
+    :rtype: tuple
+    """
+    outer_vertices, outer_faces = sphere(radius, segments, center)
+    inner_vertices, inner_faces = sphere(radius - wall, segments, center)
+
+    vertices = np.vstack((outer_vertices, inner_vertices))
+    faces = np.vstack((outer_faces, inner_faces[:, ::-1] + len(outer_vertices)))
+    return vertices, faces
+
+
+# Flips the triangles if the signed volume of a closed mesh is negative
+def _oriented(vertices, faces):
+    a, b, c = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    volume = np.einsum('ij,ij->i', a, np.cross(b, c)).sum() / 6
+
+    if volume < 0:
+        faces = faces[:, ::-1]
+
+    return vertices, np.ascontiguousarray(faces)
+
+
+# Benchmark cases, each a model and the number of X and Y slices
+MODELS = {
+    'sphere': (sphere, {}),
+    'torus': (torus, {}),
+    'hollow_shell': (hollow_shell, {}),
+    'box': (box, {})
+}
+
+CASES = {
+    'sphere': ('sphere', 12, 12),
+    'torus': ('torus', 12, 12),
+    'hollow_shell': ('hollow_shell', 12, 12),
+    'stress_1000': ('sphere', 1000, 8)
+}
@@ -0,0 +1,337 @@
+"""
+Headless slicing benchmarks
+
+Runs the slicing functions of FusionSlicerLTCommand against the mock adsk package in this folder and records wall
+time and the number of API calls of every stage. Results are written as JSON so runs of different commits can be
+compared:
+
+    python benchmarks/SlicerBenchmark.py --output before.json
+    python benchmarks/SlicerBenchmark.py --output after.json --compare before.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+BENCHMARK_FOLDER = os.path.dirname(os.path.realpath(__file__))
+REPOSITORY_FOLDER = os.path.dirname(BENCHMARK_FOLDER)
+
+# Results of runs without --output, kept next to the benchmark and out of version control
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_FOLDER, 'benchmark.json')
+
+# The mock adsk package and the SlicerCore package it uses
+sys.path.insert(0, REPOSITORY_FOLDER)
+sys.path.insert(0, BENCHMARK_FOLDER)
+
+import numpy as np
+
+import adsk
+import adsk.core
+import adsk.fusion
+
+import BenchmarkModels
+
+# Package name the add-in is loaded under so its relative imports resolve
+PACKAGE_NAME = 'FusionSlicerLTAddIn'
+
+SLICE_THICKNESS = 0.3
+
+STAGES = ('adaptive_spacing', 'sections', 'create_slices2', 'create_slices2_deferred', 'create_slices2_fast',
+          'create_slices2_sections', 'make_posts', 'make_planned_posts', 'make_slots', 'make_slots_batched',
+          'family_slices', 'stacked_layers')
+
+# Stacked layers and radial slices of the family_slices stage
+FAMILY_Z_QTY = 3
+FAMILY_RADIAL_QTY = 4
+
+# Layers of the stacked_layers stage, their thickness follows from the body height, and the dowel diameter
+STACKED_LAYER_QTY = 200
+STACKED_DOWEL_DIAMETER = 0.2
+
+# Largest distance in cm of a planned post end from the kernel post it lies on
+POST_TOLERANCE = 1e-6
+
+
+def load_command_module():
+    """
+    Imports FusionSlicerLTCommand as part of a package rooted at the repository folder
+    """
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPOSITORY_FOLDER]
+        sys.modules[PACKAGE_NAME] = package
+
+    return importlib.import_module(PACKAGE_NAME + '.FusionSlicerLTCommand')
+
+
+class StageTimer:
+    """
+    Records wall time and API calls of named stages
+    """
+    def __init__(self):
+        self.results = {}
+
+    def run(self, name, function, *args):
+        adsk.reset_calls()
+        start = time.perf_counter()
+        result = function(*args)
+        wall = time.perf_counter() - start
+
+        calls = adsk.API_CALLS.most_common()
+        self.results[name] = {
+            'wall': wall,
+            'api_calls': sum(count for _, count in calls),
+            'top_calls': dict(calls[:15])
+        }
+        return result
+
+
+# Distances of a point to line segments from starts (n, 3) to ends (n, 3)
+def _segment_distances(point, starts, ends):
+    spans = ends - starts
+    t = np.clip(np.einsum('ij,ij->i', point - starts, spans) / np.maximum(np.einsum('ij,ij->i', spans, spans), 1e-30),
+                0, 1)
+    return np.linalg.norm(starts + t[:, None] * spans - point, axis=1)
+
+
+def check_planned_posts(kernel_points, post_table, sign, tolerance=POST_TOLERANCE):
+    """
+    Asserts that every planned post lies on a kernel post of its own
+    Planned posts only keep the part of a crossing inside both faces of the crossing slice, so they can be shorter
+    than the kernel posts projected from the mid face, and crossings that only graze the mid face are not planned.
+    :param kernel_points: Post_Point list of make_posts
+    :param post_table: Post table of make_planned_posts with the same post ends
+    :param sign: -1 where the posts are the top ends, 1 for the bottom ends
+    :return: Number of kernel posts without a planned post
+    :rtype: int
+    """
+    posts = post_table.posts
+    starts = np.array([post.line.startSketchPoint.worldGeometry.asArray() for post in kernel_points]).reshape(-1, 3)
+    ends = np.array([post.line.endSketchPoint.worldGeometry.asArray() for post in kernel_points]).reshape(-1, 3)
+    other_ends = posts['point'] + sign * posts['up'] * posts['length'][:, None]
+    unmatched = np.ones(len(kernel_points), dtype=bool)
+
+    for point, other_end in zip(posts['point'], other_ends):
+        distances = np.maximum(_segment_distances(point, starts, ends), _segment_distances(other_end, starts, ends))
+        candidates = np.flatnonzero((distances < tolerance) & unmatched)
+        assert len(candidates) > 0, 'Planned post at %s is not on a kernel post' % point
+        unmatched[candidates[0]] = False
+
+    return int(unmatched.sum())
+
+
+def run_case(command, name, stages=STAGES):
+    """
+    Slices one benchmark case in a fresh design
+    :return: Case description and stage results
+    :rtype: dict
+    """
+    model_name, x_qty, y_qty = BenchmarkModels.CASES[name]
+    model, arguments = BenchmarkModels.MODELS[model_name]
+    vertices, faces = model(**arguments)
+
+    design = adsk.fusion.new_design()
+    target_body = adsk.fusion.add_mesh_body(design.rootComponent, vertices, faces, model_name)
+
+    # Cold caches for every case
+    command.MESH_CACHE.clear()
+    command.SECTION_CACHE = command.SectionCache.SectionCache(tempfile.mkdtemp(prefix='SlicerBenchmark-'))
+    command.PROFILER.reset()
+
+    timer = StageTimer()
+    slicer_def = timer.run('slicer_def', command.SlicerDef, target_body, x_qty, y_qty, SLICE_THICKNESS, False)
+
+    # Same slice budget placed by the coarse mesh profile, the evenly spaced slices are kept for the other stages
+    if 'adaptive_spacing' in stages:
+        adaptive_def = command.SlicerDef(target_body, x_qty, y_qty, SLICE_THICKNESS, False)
+        timer.run('adaptive_spacing', command.adapt_slice_spacing, adaptive_def)
+
+    x_sections, y_sections = timer.run('sections', lambda: (
+        command.get_slice_sections(slicer_def.mesh, slicer_def.x_plane, slicer_def.x_spacing, x_qty,
+                                   SLICE_THICKNESS),
+        command.get_slice_sections(slicer_def.mesh, slicer_def.y_plane, slicer_def.y_spacing, y_qty,
+                                   SLICE_THICKNESS)))
+
+    def create(sections, mode=command.SliceMode()):
+        x_slices = command.create_slices2(target_body, slicer_def.x_spacing, x_qty, slicer_def.x_plane,
+                                          SLICE_THICKNESS, 'X_Slice', sections[0], mode)
+        y_slices = command.create_slices2(target_body, slicer_def.y_spacing, y_qty, slicer_def.y_plane,
+                                          SLICE_THICKNESS, 'Y_Slice', sections[1], mode)
+        return x_slices[1], y_slices[1]
+
+    if 'create_slices2' in stages:
+        timer.run('create_slices2', create, (None, None))
+
+    # Same slices in deferred compute mode, compare with create_slices2_sections
+    def create_deferred(sections):
+        return create(sections, command.SliceMode(compute_deferred=True))
+
+    if 'create_slices2_deferred' in stages:
+        timer.run('create_slices2_deferred', create_deferred, (x_sections, y_sections))
+
+    # Same slices from in-memory booleans without sketches or features
+    def create_fast(sections):
+        return create(sections, command.SliceMode(fast=True))
+
+    if 'create_slices2_fast' in stages:
+        timer.run('create_slices2_fast', create_fast, (x_sections, y_sections))
+
+    x_faces, y_faces = timer.run('create_slices2_sections', create, (x_sections, y_sections))
+
+    x_direction = target_body.parentComponent.xConstructionAxis.geometry.direction
+    y_direction = target_body.parentComponent.yConstructionAxis.geometry.direction
+
+    def posts():
+        return command.make_posts(x_faces, y_faces)[0], command.make_posts(y_faces, x_faces)[1]
+
+    def planned_posts():
+        return (command.make_planned_posts(x_faces, y_faces, x_sections, y_sections, SLICE_THICKNESS)[0],
+                command.make_planned_posts(y_faces, x_faces, y_sections, x_sections, SLICE_THICKNESS)[1])
+
+    slot_points = None
+    if 'make_posts' in stages:
+        slot_points = timer.run('make_posts', posts)
+
+    planned_points = timer.run('make_planned_posts', planned_posts)
+
+    # Planned posts stand in for the kernel posts, so both have to agree
+    unplanned_posts = None
+    if slot_points is not None:
+        unplanned_posts = (check_planned_posts(slot_points[0], planned_points[0], -1) +
+                           check_planned_posts(slot_points[1], planned_points[1], 1))
+    if slot_points is None and 'make_slots' in stages:
+        slot_points = [command.get_post_points(post_table) for post_table in planned_points]
+
+    if 'make_slots' in stages:
+        timer.run('make_slots', lambda: (
+            command.make_slots(target_body, slot_points[0], SLICE_THICKNESS, y_direction),
+            command.make_slots(target_body, slot_points[1], SLICE_THICKNESS, x_direction)))
+
+    if 'make_slots_batched' in stages:
+        timer.run('make_slots_batched', lambda: (
+            command.make_slots_batched(planned_points[0], SLICE_THICKNESS),
+            command.make_slots_batched(planned_points[1], SLICE_THICKNESS)))
+
+    # X, Y, Z and radial slices sectioned, planned and slotted together, as on_execute does
+    def family_slices():
+        family_def = command.SlicerDef(target_body, x_qty, y_qty, SLICE_THICKNESS, False, num_z=FAMILY_Z_QTY,
+                                       num_radial=FAMILY_RADIAL_QTY)
+        section_groups = command.get_family_sections(family_def.mesh, command.get_slice_families(family_def),
+                                                     SLICE_THICKNESS)
+        face_groups = []
+        for name, base_plane, slice_sections, radial_axis in (
+                ('X_Slice', family_def.x_plane, section_groups[0], None),
+                ('Y_Slice', family_def.y_plane, section_groups[1], None),
+                ('Z_Slice', family_def.z_plane, section_groups[2], None),
+                ('R_Slice', None, section_groups[3], family_def.radial_axis)):
+            face_groups.append(command.update_slices(target_body, base_plane, SLICE_THICKNESS, name, slice_sections,
+                                                     [], radial_axis)[1])
+
+        slot_tables = command.make_family_posts(face_groups, section_groups, SLICE_THICKNESS)
+        return [command.make_slots_batched(slot_table, SLICE_THICKNESS) for slot_table in slot_tables]
+
+    if 'family_slices' in stages:
+        timer.run('family_slices', family_slices)
+
+    # Stacked layers with dowel holes, as on_execute does with Stacked Layers checked
+    def stacked_layers():
+        bounding_box = target_body.boundingBox
+        thickness = (bounding_box.maxPoint.z - bounding_box.minPoint.z) / STACKED_LAYER_QTY
+        stacked_def = command.SlicerDef(target_body, 0, 0, thickness, False)
+        command.stack_layers(stacked_def)
+
+        z_sections = command.get_family_sections(stacked_def.mesh, command.get_slice_families(stacked_def),
+                                                 thickness)[2]
+        z_faces = command.update_slices(target_body, stacked_def.z_plane, thickness, 'Z_Slice', z_sections, [])[1]
+
+        layer_holes = command.get_layer_holes(z_sections, STACKED_DOWEL_DIAMETER)
+        dowel_table = command.make_dowel_posts(z_faces, z_sections, layer_holes, STACKED_DOWEL_DIAMETER)
+        return command.make_slots_batched(dowel_table, thickness)
+
+    if 'stacked_layers' in stages:
+        timer.run('stacked_layers', stacked_layers)
+
+    return {
+        'model': model_name,
+        'triangles': len(faces),
+        'x_qty': x_qty,
+        'y_qty': y_qty,
+        'slices': len(x_faces) + len(y_faces),
+        'posts': len(planned_points[0].posts) + len(planned_points[1].posts),
+        'unplanned_posts': unplanned_posts,
+        'stages': timer.results,
+        'profile': command.PROFILER.summary(),
+        'counters': dict(command.PROFILER.counters)
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPOSITORY_FOLDER,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    Prints the wall time and API call ratio of every stage against a baseline run
+    """
+    for case_name, case in results['cases'].items():
+        old_case = baseline.get('cases', {}).get(case_name)
+        if old_case is None:
+            continue
+
+        for stage_name, stage in case['stages'].items():
+            old_stage = old_case['stages'].get(stage_name)
+            if old_stage is None or old_stage['wall'] == 0:
+                continue
+
+            print('%-14s %-24s wall x%6.2f  calls x%6.2f' % (
+                case_name, stage_name, stage['wall'] / old_stage['wall'],
+                stage['api_calls'] / max(old_stage['api_calls'], 1)))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Headless FusionSlicerLT benchmarks')
+    parser.add_argument('--cases', nargs='*', default=list(BenchmarkModels.CASES), help='Cases to run')
+    parser.add_argument('--stages', nargs='*', default=list(STAGES), help='Optional stages to run')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON result file')
+    parser.add_argument('--compare', help='Previous JSON result file to compare against')
+    options = parser.parse_args(arguments)
+
+    command = load_command_module()
+
+    results = {
+        'commit': get_commit(),
+        'time': time.strftime("%Y-%m-%d-%H-%M-%S", time.gmtime()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cases': {}
+    }
+
+    for case_name in options.cases:
+        case = run_case(command, case_name, options.stages)
+        results['cases'][case_name] = case
+
+        for stage_name, stage in case['stages'].items():
+            print('%-14s %-24s %9.3f s %9d calls' % (case_name, stage_name, stage['wall'], stage['api_calls']))
+
+    with open(options.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            compare(results, json.load(baseline_file))
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Headless stand-in for the parts of the Fusion 360 API used by FusionSlicerLT
+Only meant for the benchmarks in this folder. Geometry is backed by triangle meshes and the SlicerCore
+section kernel, so the repository root must be on sys.path before adsk.fusion is imported.
+Every public attribute read, write and static constructor call of an API object is counted in API_CALLS.
+"""
+from collections import Counter
+
+# Number of API accesses keyed by 'Class.member'
+API_CALLS = Counter()
+
+
+def reset_calls():
+    API_CALLS.clear()
+
+
+def call_count():
+    return sum(API_CALLS.values())
+
+
+class ApiType(type):
+    def __getattribute__(cls, name):
+        if name[0] != '_':
+            API_CALLS[type.__getattribute__(cls, '__name__') + '.' + name] += 1
+        return type.__getattribute__(cls, name)
+
+
+class ApiObject(metaclass=ApiType):
+    def __getattribute__(self, name):
+        if name[0] != '_':
+            API_CALLS[type(self).__name__ + '.' + name] += 1
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        if name[0] != '_':
+            API_CALLS[type(self).__name__ + '.' + name] += 1
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def classType(cls):
+        return cls.__name__
+
+
+def field(private, writable=False):
+    """
+    Property exposing a private attribute as a counted API member
+    """
+    def getter(self):
+        return object.__getattribute__(self, private)
+
+    def setter(self, value):
+        object.__setattr__(self, private, value)
+
+    return property(getter, setter if writable else None)
+
+
+from . import core
+from . import fusion
@@ -0,0 +1,289 @@
+import math
+
+from . import ApiObject, field
+
+
+class Point3D(ApiObject):
+    x = field('_x', True)
+    y = field('_y', True)
+    z = field('_z', True)
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self._x = float(x)
+        self._y = float(y)
+        self._z = float(z)
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+    def _array(self):
+        return [self._x, self._y, self._z]
+
+    def asArray(self):
+        return self._array()
+
+    def asVector(self):
+        return Vector3D(self._x, self._y, self._z)
+
+    def copy(self):
+        return Point3D(self._x, self._y, self._z)
+
+    def translateBy(self, vector):
+        self._x += vector._x
+        self._y += vector._y
+        self._z += vector._z
+        return True
+
+    def distanceTo(self, point):
+        return math.sqrt((self._x - point._x) ** 2 + (self._y - point._y) ** 2 + (self._z - point._z) ** 2)
+
+
+class Vector3D(Point3D):
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Vector3D(x, y, z)
+
+    def copy(self):
+        return Vector3D(self._x, self._y, self._z)
+
+    def scaleBy(self, scale):
+        self._x *= scale
+        self._y *= scale
+        self._z *= scale
+        return True
+
+    def dotProduct(self, vector):
+        return self._x * vector._x + self._y * vector._y + self._z * vector._z
+
+    def normalize(self):
+        length = math.sqrt(self._x ** 2 + self._y ** 2 + self._z ** 2)
+        if length > 0:
+            self.scaleBy(1 / length)
+        return True
+
+    @property
+    def length(self):
+        return math.sqrt(self._x ** 2 + self._y ** 2 + self._z ** 2)
+
+
+class Matrix3D(ApiObject):
+    def __init__(self):
+        self._translation = Vector3D()
+
+    @staticmethod
+    def create():
+        return Matrix3D()
+
+    @staticmethod
+    def cast(matrix):
+        return matrix
+
+    @property
+    def translation(self):
+        return self._translation.copy()
+
+    @translation.setter
+    def translation(self, vector):
+        self._translation = vector.copy()
+
+    def transformBy(self, matrix):
+        self._translation.translateBy(matrix._translation)
+        return True
+
+
+class BoundingBox3D(ApiObject):
+    minPoint = field('_min_point')
+    maxPoint = field('_max_point')
+
+    def __init__(self, min_point, max_point):
+        self._min_point = min_point
+        self._max_point = max_point
+
+
+class Plane(ApiObject):
+    origin = field('_origin')
+    normal = field('_normal')
+    uDirection = field('_u_direction')
+    vDirection = field('_v_direction')
+
+    def __init__(self, origin, normal, u_direction=None, v_direction=None):
+        self._origin = origin
+        self._normal = normal
+        self._u_direction = u_direction
+        self._v_direction = v_direction
+
+
+class OrientedBoundingBox3D(ApiObject):
+    centerPoint = field('_center')
+    lengthDirection = field('_length_direction')
+    widthDirection = field('_width_direction')
+    length = field('_length')
+    width = field('_width')
+    height = field('_height')
+
+    def __init__(self, center, length_direction, width_direction, length, width, height):
+        self._center = center
+        self._length_direction = length_direction
+        self._width_direction = width_direction
+        self._length = length
+        self._width = width
+        self._height = height
+
+    @staticmethod
+    def create(center, length_direction, width_direction, length, width, height):
+        return OrientedBoundingBox3D(center, length_direction, width_direction, length, width, height)
+
+
+class InfiniteLine3D(ApiObject):
+    origin = field('_origin')
+    direction = field('_direction')
+
+    def __init__(self, origin, direction):
+        self._origin = origin
+        self._direction = direction
+
+
+class CurveEvaluator3D(ApiObject):
+    """
+    Evaluator of a curve given by its stroke points, the parameter is the point index
+    """
+    def __init__(self, points):
+        self._points = points
+
+    def getParameterExtents(self):
+        return True, 0.0, float(len(self._points) - 1)
+
+    def getStrokes(self, from_parameter, to_parameter, tolerance):
+        return True, [Point3D(*point) for point in self._points[int(from_parameter):int(to_parameter) + 1].tolist()]
+
+
+class NurbsCurve3D(ApiObject):
+    def __init__(self, points):
+        self._points = points
+
+    @property
+    def evaluator(self):
+        return CurveEvaluator3D(self._points)
+
+
+class ObjectCollection(ApiObject):
+    def __init__(self):
+        self._items = []
+
+    @staticmethod
+    def create():
+        return ObjectCollection()
+
+    def add(self, item):
+        self._items.append(item)
+        return True
+
+    def item(self, index):
+        return self._items[index]
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+
+class ValueInput(ApiObject):
+    realValue = field('_value')
+    stringValue = field('_string')
+
+    def __init__(self, value=0.0, string=''):
+        self._value = value
+        self._string = string
+
+    @staticmethod
+    def createByReal(value):
+        return ValueInput(float(value))
+
+    @staticmethod
+    def createByString(string):
+        return ValueInput(0.0, string)
+
+
+class Color(ApiObject):
+    @staticmethod
+    def create(red, green, blue, opacity):
+        return Color()
+
+
+class UserInterface(ApiObject):
+    def __init__(self):
+        self._messages = []
+
+    def messageBox(self, text, *args):
+        self._messages.append(text)
+        return 0
+
+
+class Application(ApiObject):
+    _application = None
+
+    def __init__(self):
+        self._ui = UserInterface()
+        self._product = None
+
+    @staticmethod
+    def get():
+        if Application._application is None:
+            Application._application = Application()
+        return Application._application
+
+    @staticmethod
+    def cast(application):
+        return application
+
+    userInterface = field('_ui')
+    activeProduct = field('_product')
+    activeDocument = field('_product')
+    importManager = field('_ui')
+
+
+# Base classes the command framework derives its event handlers from
+class CommandEventHandler:
+    pass
+
+
+class CommandCreatedEventHandler:
+    pass
+
+
+class InputChangedEventHandler:
+    pass
+
+
+class HTMLEventHandler:
+    pass
+
+
+class UserInterfaceGeneralEventHandler:
+    pass
+
+
+# Only used in annotations
+class Command(ApiObject):
+    pass
+
+
+class CommandInputs(ApiObject):
+    pass
+
+
+class HTMLEventArgs(ApiObject):
+    pass
+
+
+class Palette(ApiObject):
+    pass
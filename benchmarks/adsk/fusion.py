@@ -0,0 +1,1225 @@
+import itertools
+import math
+
+import numpy as np
+
+from SlicerCore import MeshSection
+from SlicerCore import SlotPlanner
+
+from . import ApiObject, field
+from .core import Application, BoundingBox3D, InfiniteLine3D, NurbsCurve3D, ObjectCollection, Plane, Point3D, \
+    Vector3D
+
+
+class FeatureOperations:
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+
+class PointContainment:
+    PointInsidePointContainment = 0
+    PointOnPointContainment = 1
+    PointOutsidePointContainment = 2
+    UnknownPointContainment = 3
+
+
+class CalculationAccuracy:
+    LowCalculationAccuracy = 0
+    MediumCalculationAccuracy = 1
+    HighCalculationAccuracy = 2
+    VeryHighCalculationAccuracy = 3
+
+
+class BooleanTypes:
+    DifferenceBooleanType = 0
+    IntersectionBooleanType = 1
+    UnionBooleanType = 2
+
+
+class DesignTypes:
+    DirectDesignType = 0
+    ParametricDesignType = 1
+
+
+class TriangleMeshQualityOptions:
+    LowQualityTriangleMesh = 8
+    NormalQualityTriangleMesh = 11
+    HighQualityTriangleMesh = 13
+    VeryHighQualityTriangleMesh = 15
+
+
+_TOKENS = itertools.count(1)
+
+
+def new_design():
+    """
+    Creates an empty design and makes it the active product
+    :rtype: Design
+    """
+    design = Design()
+    Application.get()._product = design
+    return design
+
+
+def add_mesh_body(component, vertices, faces, name='Body'):
+    """
+    Adds a solid body defined by a closed, outward oriented triangle mesh
+    :rtype: MeshBody
+    """
+    body = MeshBody(component, np.asarray(vertices, dtype=np.float64), np.asarray(faces, dtype=np.int64))
+    body._name = name
+    component._bodies._items.append(body)
+    return body
+
+
+# Plane frame shared by sketches and planar faces, 2D coordinates use the MeshSection plane basis
+class _Frame:
+    def __init__(self, normal, offset):
+        self.normal = np.asarray(normal, dtype=np.float64)
+        self.normal = self.normal / np.linalg.norm(self.normal)
+        self.offset = float(offset)
+        self.u, self.v = MeshSection.plane_basis(self.normal)
+
+    def plane(self):
+        return Plane(Point3D(*(self.normal * self.offset)), Vector3D(*self.normal), Vector3D(*self.u),
+                     Vector3D(*self.v))
+
+    def to_world(self, points, height=0.0):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return points[:, :1] * self.u + points[:, 1:2] * self.v + (self.offset + height) * self.normal
+
+    def to_plane(self, point):
+        point = np.asarray(point, dtype=np.float64)
+        return point.dot(self.u), point.dot(self.v), point.dot(self.normal) - self.offset
+
+
+def _frame_of(entity):
+    frame = getattr(entity, '_frame', None)
+    if frame is None:
+        raise ValueError('Entity has no planar geometry')
+    return frame
+
+
+def _bounding_box(points):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return BoundingBox3D(Point3D(*points.min(axis=0)), Point3D(*points.max(axis=0)))
+
+
+# A point strictly inside a region, the centroid when it is inside
+def _interior_point(region):
+    loops = [region.outer] + list(region.holes)
+    if _inside_region(region, region.centroid):
+        return np.asarray(region.centroid, dtype=np.float64)
+
+    height = region.centroid[1]
+    crossings = []
+    for loop in loops:
+        start = loop
+        end = np.roll(loop, -1, axis=0)
+        spans = (start[:, 1] > height) != (end[:, 1] > height)
+        t = (height - start[spans, 1]) / (end[spans, 1] - start[spans, 1])
+        crossings.extend(start[spans, 0] + t * (end[spans, 0] - start[spans, 0]))
+
+    crossings = sorted(crossings)
+    return np.array([(crossings[0] + crossings[1]) / 2, height])
+
+
+def _inside_region(region, point):
+    point = np.asarray(point, dtype=np.float64).reshape(1, 2)
+    if not MeshSection.points_in_polygon(point, region.outer)[0]:
+        return False
+    return not any(MeshSection.points_in_polygon(point, hole)[0] for hole in region.holes)
+
+
+# A region and its holes as separate material and void regions, the layout the section kernel returns
+def _region_boundaries(region):
+    voids = [MeshSection.SectionRegion(hole, [], -MeshSection.loop_area(hole), MeshSection.loop_centroid(hole), False)
+             for hole in region.holes]
+    return [region] + voids
+
+
+def _rectangle_region(center, corner):
+    center = np.asarray(center, dtype=np.float64)
+    half = np.abs(np.asarray(corner, dtype=np.float64) - center)
+    outer = center + half * np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float64)
+    return MeshSection.SectionRegion(outer, [], float(4 * half[0] * half[1]), center, True)
+
+
+class Entity(ApiObject):
+    name = field('_name', True)
+    isLightBulbOn = field('_light_bulb', True)
+    isVisible = field('_visible', True)
+
+    def __init__(self):
+        self._name = ''
+        self._light_bulb = True
+        self._visible = True
+        self._token = None
+        self._valid = True
+
+    @property
+    def entityToken(self):
+        if self._token is None:
+            self._token = 'token-%d' % next(_TOKENS)
+            Application.get()._product._entities[self._token] = self
+        return self._token
+
+    @property
+    def isValid(self):
+        return self._valid
+
+    def deleteMe(self):
+        self._valid = False
+        if self._token is not None:
+            Application.get()._product._entities.pop(self._token, None)
+        return True
+
+
+class Collection(ApiObject):
+    def __init__(self):
+        self._items = []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter([entry for entry in self._items if getattr(entry, '_valid', True)])
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+
+class TimelineObject(ApiObject):
+    def __init__(self, timeline):
+        self._timeline = timeline
+
+    def rollTo(self, roll_before):
+        return True
+
+
+class TimelineGroups(Collection):
+    def add(self, start_index, end_index):
+        self._items.append((start_index, end_index))
+        return True
+
+
+class Timeline(ApiObject):
+    markerPosition = field('_marker', True)
+    timelineGroups = field('_groups')
+
+    def __init__(self):
+        self._marker = 0
+        self._groups = TimelineGroups()
+
+    def _add(self):
+        self._marker += 1
+        return TimelineObject(self)
+
+    @property
+    def count(self):
+        return self._marker
+
+
+class Attribute(ApiObject):
+    value = field('_value', True)
+
+    def __init__(self, value):
+        self._value = value
+
+
+class Attributes(ApiObject):
+    def __init__(self):
+        self._items = {}
+
+    def add(self, group_name, name, value):
+        self._items[(group_name, name)] = Attribute(value)
+        return self._items[(group_name, name)]
+
+    def itemByName(self, group_name, name):
+        return self._items.get((group_name, name))
+
+
+class Design(ApiObject):
+    rootComponent = field('_root')
+    timeline = field('_timeline')
+    attributes = field('_attributes')
+    fusionUnitsManager = field('_root')
+    exportManager = field('_root')
+    designType = field('_design_type', True)
+
+    def __init__(self):
+        self._entities = {}
+        self._design_type = DesignTypes.ParametricDesignType
+        self._timeline = Timeline()
+        self._attributes = Attributes()
+        self._components = [Component(self, 'Root')]
+        self._root = self._components[0]
+
+    @staticmethod
+    def cast(product):
+        return product
+
+    @property
+    def allComponents(self):
+        return list(self._components)
+
+    def activateRootComponent(self):
+        return True
+
+    def findEntityByToken(self, token):
+        entity = self._entities.get(token)
+        return [entity] if entity is not None and entity._valid else []
+
+
+class ConstructionAxis(Entity):
+    geometry = field('_geometry')
+
+    def __init__(self, direction, origin=(0.0, 0.0, 0.0)):
+        Entity.__init__(self)
+        self._geometry = InfiniteLine3D(Point3D(*origin), Vector3D(*direction))
+
+
+class ConstructionAxisInput(ApiObject):
+    def __init__(self):
+        self._planes = None
+
+    def setByTwoPlanes(self, plane_one, plane_two):
+        self._planes = (plane_one, plane_two)
+        return True
+
+
+class ConstructionAxes(Collection):
+    def __init__(self, component):
+        Collection.__init__(self)
+        self._component = component
+
+    def createInput(self):
+        return ConstructionAxisInput()
+
+    def add(self, axis_input):
+        # Line where both planes cross, the point on it nearest to the origin
+        first, second = (_frame_of(plane) for plane in axis_input._planes)
+        direction = np.cross(first.normal, second.normal)
+        direction /= np.linalg.norm(direction)
+        matrix = np.vstack((first.normal, second.normal, direction))
+        origin = np.linalg.solve(matrix, [first.offset, second.offset, 0.0])
+
+        axis = ConstructionAxis(direction, origin)
+        self._items.append(axis)
+        self._component._design._timeline._add()
+        return axis
+
+
+class ConstructionPlaneDefinition(ApiObject):
+    def __init__(self, plane, base, offset):
+        self._plane = plane
+        self._base = base
+        self._offset = offset
+
+    @property
+    def offset(self):
+        return _OffsetParameter(self)
+
+
+class _OffsetParameter(ApiObject):
+    def __init__(self, definition):
+        self._definition = definition
+
+    @property
+    def value(self):
+        return self._definition._offset
+
+    @value.setter
+    def value(self, value):
+        definition = self._definition
+        definition._offset = value
+        base = _frame_of(definition._base)
+        definition._plane._frame = _Frame(base.normal, base.offset + value)
+
+
+class ConstructionPlane(Entity):
+    definition = field('_definition')
+
+    def __init__(self, component, frame):
+        Entity.__init__(self)
+        self._component = component
+        self._frame = frame
+        self._definition = None
+
+    @property
+    def geometry(self):
+        return self._frame.plane()
+
+    @property
+    def parentComponent(self):
+        return self._component
+
+
+class ConstructionPlaneInput(ApiObject):
+    def __init__(self):
+        self._base = None
+        self._offset = 0.0
+        self._axis = None
+        self._angle = 0.0
+
+    def setByOffset(self, base, offset):
+        self._base = base
+        self._offset = offset._value
+        return True
+
+    def setByAngle(self, axis, angle, base):
+        self._axis = axis
+        self._base = base
+        self._angle = angle._value
+        return True
+
+
+class ConstructionPlanes(Collection):
+    def __init__(self, component):
+        Collection.__init__(self)
+        self._component = component
+
+    def createInput(self):
+        return ConstructionPlaneInput()
+
+    def add(self, plane_input):
+        base = _frame_of(plane_input._base)
+
+        if plane_input._axis is not None:
+            # The base plane turned about the axis by the right hand rule, it keeps containing the axis
+            line = plane_input._axis.geometry
+            axis = line.direction._array() / np.linalg.norm(line.direction._array())
+            angle = plane_input._angle
+            normal = base.normal * math.cos(angle) + np.cross(axis, base.normal) * math.sin(angle)
+            plane = ConstructionPlane(self._component, _Frame(normal, normal.dot(line.origin._array())))
+            self._items.append(plane)
+            self._component._design._timeline._add()
+            return plane
+
+        plane = ConstructionPlane(self._component, _Frame(base.normal, base.offset + plane_input._offset))
+        plane._definition = ConstructionPlaneDefinition(plane, plane_input._base, plane_input._offset)
+        self._items.append(plane)
+        self._component._design._timeline._add()
+        return plane
+
+
+class SurfaceEvaluator(ApiObject):
+    area = field('_area')
+
+    def __init__(self, area):
+        self._area = area
+
+
+class BRepFace(Entity):
+    """
+    Planar face bounded by one section region at a height above its frame
+    """
+    def __init__(self, body, frame, region, height=0.0):
+        Entity.__init__(self)
+        self._body = body
+        self._frame = _Frame(frame.normal, frame.offset + height)
+        self._region = region
+
+    body = field('_body')
+
+    @property
+    def geometry(self):
+        return self._frame.plane()
+
+    @property
+    def evaluator(self):
+        return SurfaceEvaluator(abs(self._region.area))
+
+    @property
+    def area(self):
+        return abs(self._region.area)
+
+    @property
+    def centroid(self):
+        return Point3D(*self._frame.to_world(np.asarray(self._region.centroid).reshape(1, 2))[0])
+
+    @property
+    def pointOnFace(self):
+        return Point3D(*self._frame.to_world(_interior_point(self._region))[0])
+
+    @property
+    def boundingBox(self):
+        return _bounding_box(self._frame.to_world(self._region.outer))
+
+
+class BRepBody(Entity):
+    def __init__(self, component):
+        Entity.__init__(self)
+        self._component = component
+
+    @property
+    def parentComponent(self):
+        return self._component
+
+    def pointContainment(self, point):
+        return PointContainment.PointOutsidePointContainment
+
+
+class SurfaceBody(BRepBody):
+    """
+    Planar surface body of one section region, what a patch feature creates
+    """
+    def __init__(self, component, frame, region):
+        BRepBody.__init__(self, component)
+        self._frame = frame
+        self._regions = _region_boundaries(region)
+
+    @property
+    def boundingBox(self):
+        return _bounding_box(self._frame.to_world(self._regions[0].outer))
+
+    def _cut_lines(self, frame):
+        # Cut edges in a crossing plane are the inside intervals of the region along the intersection line
+        direction = np.array([self._frame.u.dot(frame.normal), self._frame.v.dot(frame.normal)])
+        length = np.linalg.norm(direction)
+        if length < 1e-9:
+            return []
+
+        direction /= length
+        along = np.array([-direction[1], direction[0]])
+        offset = (frame.offset - self._frame.offset * self._frame.normal.dot(frame.normal)) / length
+
+        _, _, starts, ends = SlotPlanner.line_intervals([self._regions], direction, [offset])
+        base = offset * direction
+        return [tuple(self._frame.to_world(np.vstack((base + start * along, base + end * along))))
+                for start, end in zip(starts, ends)]
+
+
+class BRepBodies(Collection):
+    def __init__(self, component=None):
+        Collection.__init__(self)
+        self._component = component
+
+    def add(self, body, base_feature=None):
+        # Temporary bodies become bodies of the component, inside the base feature when one is given
+        body._component = self._component
+        self._items.append(body)
+        if base_feature is not None:
+            base_feature._bodies.append(body)
+        return body
+
+
+class SectionBody(SurfaceBody):
+    """
+    Planar surface body of all section regions of a plane, what a plane intersection creates
+    """
+    def __init__(self, component, frame, regions):
+        BRepBody.__init__(self, component)
+        self._frame = frame
+        self._regions = [boundary for region in regions for boundary in _region_boundaries(region)]
+        self._faces = [BRepFace(self, frame, region) for region in regions]
+
+    @property
+    def faces(self):
+        return list(self._faces)
+
+
+class MeshBody(BRepBody):
+    """
+    Solid body of a closed triangle mesh
+    """
+    def __init__(self, component, vertices, faces):
+        BRepBody.__init__(self, component)
+        self._vertices = vertices
+        self._faces = faces
+        self._triangles = vertices[faces]
+
+    @property
+    def boundingBox(self):
+        return _bounding_box(self._vertices)
+
+    # Mesh bodies are never modified
+    @property
+    def revisionId(self):
+        return 'revision-0'
+
+    @property
+    def meshManager(self):
+        return MeshManager(self)
+
+    def pointContainment(self, point):
+        # Parity of crossings of a ray along +x, nudged off the axis grid so it misses mesh edges
+        origin = np.array(point._array()) + np.array([0.0, 1.234567e-7, 7.654321e-8])
+        a, b, c = self._triangles[:, 0], self._triangles[:, 1], self._triangles[:, 2]
+
+        d_ab = (b[:, 1] - a[:, 1]) * (origin[2] - a[:, 2]) - (b[:, 2] - a[:, 2]) * (origin[1] - a[:, 1])
+        d_bc = (c[:, 1] - b[:, 1]) * (origin[2] - b[:, 2]) - (c[:, 2] - b[:, 2]) * (origin[1] - b[:, 1])
+        d_ca = (a[:, 1] - c[:, 1]) * (origin[2] - c[:, 2]) - (a[:, 2] - c[:, 2]) * (origin[1] - c[:, 1])
+        hit = ((d_ab > 0) & (d_bc > 0) & (d_ca > 0)) | ((d_ab < 0) & (d_bc < 0) & (d_ca < 0))
+
+        total = d_ab[hit] + d_bc[hit] + d_ca[hit]
+        x = (d_bc[hit] * a[hit, 0] + d_ca[hit] * b[hit, 0] + d_ab[hit] * c[hit, 0]) / total
+
+        if np.count_nonzero(x > origin[0]) % 2 == 1:
+            return PointContainment.PointInsidePointContainment
+        return PointContainment.PointOutsidePointContainment
+
+
+class SlabBody(BRepBody):
+    """
+    Extruded body between two parallel planes, its cross section is the intersection of the regions recorded
+    at both planes
+    """
+    def __init__(self, component, frame, region, low, high):
+        BRepBody.__init__(self, component)
+        self._frame = frame
+        self._low = low
+        self._high = high
+        self._region = region
+        self._high_regions = _region_boundaries(region)
+        self._low_regions = self._high_regions
+        self._slots = 0
+
+    @property
+    def boundingBox(self):
+        points = [self._frame.to_world(region.outer, height)
+                  for height, regions in ((self._low, self._low_regions), (self._high, self._high_regions))
+                  for region in regions]
+        return _bounding_box(np.vstack(points))
+
+    def _cut_lines(self, frame):
+        # Cut edges in a perpendicular plane outline the section of the slab, a long edge in each of its faces
+        # wherever both face regions are inside and a short edge across the thickness at both ends
+        if abs(frame.normal.dot(self._frame.normal)) > 1e-9:
+            return []
+
+        direction = np.array([self._frame.u.dot(frame.normal), self._frame.v.dot(frame.normal)])
+        direction /= np.linalg.norm(direction)
+        along = np.array([-direction[1], direction[0]])
+        base = frame.offset * direction
+
+        _, _, high_starts, high_ends = SlotPlanner.line_intervals([self._high_regions], direction, [frame.offset])
+        _, _, low_starts, low_ends = SlotPlanner.line_intervals([self._low_regions], direction, [frame.offset])
+
+        lines = []
+        for high_start, high_end in zip(high_starts, high_ends):
+            for low_start, low_end in zip(low_starts, low_ends):
+                start, end = max(high_start, low_start), min(high_end, low_end)
+                if end - start < 1e-9:
+                    continue
+
+                ends = np.vstack((base + start * along, base + end * along))
+                low = self._frame.to_world(ends, self._low)
+                high = self._frame.to_world(ends, self._high)
+                lines.extend(((low[0], low[1]), (high[0], high[1]), (low[0], high[0]), (low[1], high[1])))
+
+        return lines
+
+
+class BoxBody(BRepBody):
+    """
+    Temporary box body, only used as the tool of a boolean
+    """
+    def __init__(self, box):
+        BRepBody.__init__(self, None)
+        self._box = box
+
+
+class TemporaryBody(BRepBody):
+    """
+    Temporary copy of a mesh body, an intersection with a box leaves one slab lump per section region of the
+    box mid plane
+    """
+    def __init__(self, body):
+        BRepBody.__init__(self, None)
+        self._body = body
+        self._lumps = []
+
+    @property
+    def lumps(self):
+        return list(self._lumps)
+
+
+class TemporaryBRepManager(ApiObject):
+    _instance = None
+
+    @staticmethod
+    def get():
+        if TemporaryBRepManager._instance is None:
+            TemporaryBRepManager._instance = TemporaryBRepManager()
+        return TemporaryBRepManager._instance
+
+    def copy(self, entity):
+        if isinstance(entity, SlabBody):
+            return SlabBody(None, entity._frame, entity._region, entity._low, entity._high)
+        return TemporaryBody(entity)
+
+    def createBox(self, box):
+        return BoxBody(box)
+
+    def booleanOperation(self, target, tool, boolean_type):
+        if boolean_type != BooleanTypes.IntersectionBooleanType or not isinstance(tool, BoxBody):
+            return False
+
+        box = tool._box
+        normal = np.cross(box._length_direction._array(), box._width_direction._array())
+        frame = _Frame(normal, np.dot(box._center._array(), normal / np.linalg.norm(normal)))
+        body = target._body
+        regions = MeshSection.section_regions(body._vertices, body._faces, frame.normal, frame.offset)
+
+        target._lumps = [SlabBody(None, frame, region, -box._height / 2, box._height / 2)
+                         for region in regions if region.is_material]
+        return True
+
+    def planeIntersection(self, body, plane):
+        frame = _Frame(plane._normal._array(), np.dot(plane._origin._array(), plane._normal._array()))
+        if isinstance(body, SlabBody):
+            return SectionBody(None, frame, [body._region])
+
+        regions = MeshSection.section_regions(body._vertices, body._faces, frame.normal, frame.offset)
+        return SectionBody(None, frame, [region for region in regions if region.is_material])
+
+
+class MeshManager(ApiObject):
+    def __init__(self, body):
+        self._body = body
+
+    def createMeshCalculator(self):
+        return MeshCalculator(self._body)
+
+
+class MeshCalculator(ApiObject):
+    surfaceTolerance = field('_tolerance', True)
+
+    def __init__(self, body):
+        self._body = body
+        self._tolerance = None
+
+    def setQuality(self, quality):
+        return True
+
+    def calculate(self):
+        return TriangleMesh(self._body._vertices.reshape(-1).tolist(), self._body._faces.reshape(-1).tolist())
+
+
+class TriangleMesh(ApiObject):
+    nodeCoordinatesAsDouble = field('_coordinates')
+    nodeIndices = field('_indices')
+
+    def __init__(self, coordinates, indices):
+        self._coordinates = coordinates
+        self._indices = indices
+
+
+class SketchPoint(ApiObject):
+    def __init__(self, sketch, point):
+        self._sketch = sketch
+        self._point = np.asarray(point, dtype=np.float64)
+
+    @property
+    def worldGeometry(self):
+        return Point3D(*self._point)
+
+
+class SketchCurve(Entity):
+    isConstruction = field('_construction', True)
+
+    def __init__(self):
+        Entity.__init__(self)
+        self._construction = False
+
+
+class SketchLine(SketchCurve):
+    def __init__(self, sketch, start, end):
+        SketchCurve.__init__(self)
+        self._start = SketchPoint(sketch, start)
+        self._end = SketchPoint(sketch, end)
+
+    startSketchPoint = field('_start')
+    endSketchPoint = field('_end')
+
+    @property
+    def length(self):
+        return float(np.linalg.norm(self._end._point - self._start._point))
+
+
+class SketchCircle(SketchCurve):
+    def __init__(self, sketch, center, radius):
+        SketchCurve.__init__(self)
+        self._center = SketchPoint(sketch, center)
+        self._radius = radius
+
+    centerSketchPoint = field('_center')
+    radius = field('_radius')
+
+
+class SketchFittedSpline(SketchCurve):
+    def __init__(self, points):
+        SketchCurve.__init__(self)
+        self._points = points
+
+
+class SketchLines(Collection):
+    def __init__(self, sketch):
+        Collection.__init__(self)
+        self._sketch = sketch
+
+    def _add_world(self, start, end):
+        line = SketchLine(self._sketch, start, end)
+        self._items.append(line)
+        self._sketch._curves.append(line)
+        return line
+
+    def addCenterPointRectangle(self, center_point, corner_point):
+        frame = self._sketch._frame
+        region = _rectangle_region(center_point._array()[:2], corner_point._array()[:2])
+        corners = frame.to_world(region.outer)
+        lines = ObjectCollection()
+        for i in range(4):
+            lines._items.append(self._add_world(corners[i], corners[(i + 1) % 4]))
+        self._sketch._regions.append(region)
+        return lines
+
+    def addThreePointRectangle(self, point_one, point_two, point_three):
+        frame = self._sketch._frame
+        first, second, third = (np.asarray(point._array()[:2], dtype=np.float64)
+                                 for point in (point_one, point_two, point_three))
+        outer = np.array([first, second, third, first + third - second])
+        area = MeshSection.loop_area(outer)
+        if area < 0:
+            outer = outer[::-1]
+        corners = frame.to_world(outer)
+        lines = ObjectCollection()
+        for i in range(4):
+            lines._items.append(self._add_world(corners[i], corners[(i + 1) % 4]))
+        self._sketch._regions.append(MeshSection.SectionRegion(outer, [], abs(area), outer.mean(axis=0), True))
+        return lines
+
+
+class SketchCircles(Collection):
+    def __init__(self, sketch):
+        Collection.__init__(self)
+        self._sketch = sketch
+
+    # The profile is a polygon of the circle
+    def addByCenterRadius(self, center_point, radius):
+        frame = self._sketch._frame
+        center = np.asarray(center_point._array()[:2], dtype=np.float64)
+        angles = 2 * np.pi * np.arange(24) / 24
+        outer = center + radius * np.column_stack((np.cos(angles), np.sin(angles)))
+        circle = SketchCircle(self._sketch, frame.to_world(center[None])[0], radius)
+        self._items.append(circle)
+        self._sketch._curves.append(circle)
+        self._sketch._regions.append(MeshSection.SectionRegion(outer, [], MeshSection.loop_area(outer), center, True))
+        return circle
+
+
+class SketchCurves(ApiObject):
+    def __init__(self, sketch):
+        self._sketch = sketch
+        self._lines = SketchLines(sketch)
+        self._circles = SketchCircles(sketch)
+
+    sketchLines = field('_lines')
+    sketchCircles = field('_circles')
+
+    def __iter__(self):
+        return iter(list(self._sketch._curves))
+
+    @property
+    def count(self):
+        return len(self._sketch._curves)
+
+
+class AreaProperties(ApiObject):
+    area = field('_area')
+    centroid = field('_centroid')
+
+    def __init__(self, area, centroid):
+        self._area = area
+        self._centroid = centroid
+
+
+class ProfileCurve(ApiObject):
+    geometry = field('_geometry')
+
+    def __init__(self, geometry):
+        self._geometry = geometry
+
+
+class ProfileLoop(ApiObject):
+    isOuter = field('_is_outer')
+    profileCurves = field('_curves')
+
+    def __init__(self, is_outer, curves):
+        self._is_outer = is_outer
+        self._curves = curves
+
+
+class ProfileLoops(Collection):
+    pass
+
+
+class Profile(ApiObject):
+    def __init__(self, sketch, region):
+        self._sketch = sketch
+        self._region = region
+
+    def areaProperties(self, accuracy=CalculationAccuracy.LowCalculationAccuracy):
+        return AreaProperties(abs(self._region.area), Point3D(self._region.centroid[0], self._region.centroid[1], 0))
+
+    # Each loop is split in two curves running in opposite directions, the order and direction Fusion returns
+    # profile curves in is not defined either
+    @property
+    def profileLoops(self):
+        loops = ProfileLoops()
+        for is_outer, loop in [(True, self._region.outer)] + [(False, hole) for hole in self._region.holes]:
+            closed = np.vstack((loop, loop[:1]))
+            closed = np.column_stack((closed, np.zeros(len(closed))))
+            middle = len(closed) // 2
+            curves = [ProfileCurve(NurbsCurve3D(closed[:middle + 1])),
+                      ProfileCurve(NurbsCurve3D(closed[middle:][::-1]))]
+            loops._items.append(ProfileLoop(is_outer, curves))
+        return loops
+
+    @property
+    def parentSketch(self):
+        return self._sketch
+
+
+class Profiles(Collection):
+    pass
+
+
+class Sketch(Entity):
+    isComputeDeferred = field('_deferred', True)
+
+    def __init__(self, component, frame):
+        Entity.__init__(self)
+        self._component = component
+        self._frame = frame
+        self._curves = []
+        self._regions = []
+        self._deferred = False
+        self._sketch_curves = SketchCurves(self)
+
+    sketchCurves = field('_sketch_curves')
+
+    @property
+    def profiles(self):
+        profiles = Profiles()
+        profiles._items = [Profile(self, region) for region in self._regions]
+        return profiles
+
+    @property
+    def parentComponent(self):
+        return self._component
+
+    def projectCutEdges(self, body):
+        result = ObjectCollection()
+
+        if isinstance(body, MeshBody):
+            regions = MeshSection.section_regions(body._vertices, body._faces, self._frame.normal, self._frame.offset)
+            for region in regions:
+                for loop in [region.outer] + list(region.holes):
+                    curve = SketchFittedSpline(self._frame.to_world(loop))
+                    self._curves.append(curve)
+                    result.add(curve)
+            self._regions.extend(regions)
+
+        elif isinstance(body, (SlabBody, SurfaceBody)):
+            for start, end in body._cut_lines(self._frame):
+                result.add(self._sketch_curves._lines._add_world(start, end))
+
+        return result
+
+    def project(self, entity):
+        return ObjectCollection()
+
+    def modelToSketchSpace(self, point):
+        return Point3D(*self._frame.to_plane(point._array()))
+
+    def sketchToModelSpace(self, point):
+        coordinates = point._array()
+        return Point3D(*self._frame.to_world(coordinates[:2], coordinates[2])[0])
+
+    @property
+    def originPoint(self):
+        return SketchPoint(self, self._frame.to_world([0.0, 0.0])[0])
+
+
+class Sketches(Collection):
+    def __init__(self, component):
+        Collection.__init__(self)
+        self._component = component
+
+    def add(self, plane):
+        sketch = Sketch(self._component, _frame_of(plane))
+        self._items.append(sketch)
+        self._component._design._timeline._add()
+        return sketch
+
+
+class PatchFeatureInput(ApiObject):
+    def __init__(self, profile, operation):
+        self._profile = profile
+        self._operation = operation
+
+
+class PatchFeature(Entity):
+    def __init__(self, component, profile):
+        Entity.__init__(self)
+        self._body = SurfaceBody(component, profile._sketch._frame, profile._region)
+        self._faces = [BRepFace(self._body, profile._sketch._frame, profile._region)]
+
+    @property
+    def faces(self):
+        return list(self._faces)
+
+    @property
+    def bodies(self):
+        return [self._body]
+
+    def deleteMe(self):
+        self._body.deleteMe()
+        return Entity.deleteMe(self)
+
+
+class PatchFeatures(Collection):
+    def __init__(self, component):
+        Collection.__init__(self)
+        self._component = component
+
+    def createInput(self, profile, operation):
+        return PatchFeatureInput(profile, operation)
+
+    def add(self, patch_input):
+        feature = PatchFeature(self._component, patch_input._profile)
+        self._items.append(feature)
+        self._component._design._timeline._add()
+        return feature
+
+
+class ExtrudeFeatureInput(ApiObject):
+    participantBodies = field('_participants', True)
+
+    def __init__(self, profiles, operation):
+        self._profiles = profiles
+        self._operation = operation
+        self._distance = 0.0
+        self._symmetric = False
+        self._participants = None
+
+    def setSymmetricExtent(self, distance, is_full_length):
+        self._distance = distance._value
+        self._symmetric = True
+        return True
+
+    def setDistanceExtent(self, is_symmetric, distance):
+        self._distance = distance._value
+        self._symmetric = is_symmetric
+        return True
+
+
+class ExtrudeFeature(Entity):
+    def __init__(self, component, bodies, end_faces):
+        Entity.__init__(self)
+        self._component = component
+        self._bodies = bodies
+        self._end_faces = end_faces
+        self._participants = None
+        self._timeline_object = component._design._timeline._add()
+
+    @property
+    def bodies(self):
+        return list(self._bodies)
+
+    @property
+    def endFaces(self):
+        return list(self._end_faces)
+
+    timelineObject = field('_timeline_object')
+    parentComponent = field('_component')
+
+    @property
+    def participantBodies(self):
+        return list(self._participants or [])
+
+    @participantBodies.setter
+    def participantBodies(self, bodies):
+        self._participants = list(bodies)
+
+
+class ExtrudeFeatures(Collection):
+    def __init__(self, component):
+        Collection.__init__(self)
+        self._component = component
+
+    def createInput(self, profiles, operation):
+        return ExtrudeFeatureInput(profiles, operation)
+
+    def addSimple(self, profiles, distance, operation):
+        extrude_input = ExtrudeFeatureInput(profiles, operation)
+        extrude_input._distance = distance._value
+        return self.add(extrude_input)
+
+    def add(self, extrude_input):
+        profiles = extrude_input._profiles
+        profiles = list(profiles._items) if isinstance(profiles, ObjectCollection) else [profiles]
+        operation = extrude_input._operation
+        distance = extrude_input._distance
+
+        if extrude_input._symmetric:
+            low, high = -distance / 2, distance / 2
+        else:
+            low, high = min(0.0, distance), max(0.0, distance)
+
+        bodies = []
+        end_faces = []
+
+        if operation == FeatureOperations.NewBodyFeatureOperation:
+            for profile in profiles:
+                frame = profile._sketch._frame
+                body = SlabBody(self._component, frame, profile._region, low, high)
+                self._component._bodies._items.append(body)
+                bodies.append(body)
+                end_faces.append(BRepFace(body, frame, profile._region, distance))
+
+        elif operation == FeatureOperations.IntersectFeatureOperation:
+            participants = extrude_input._participants or [body for body in self._component._bodies._items
+                                                           if isinstance(body, SlabBody)]
+            regions = [boundary for profile in profiles for boundary in _region_boundaries(profile._region)]
+            for body in participants:
+                body._low_regions = regions
+                bodies.append(body)
+
+        elif operation == FeatureOperations.CutFeatureOperation:
+            for body in extrude_input._participants or []:
+                body._slots += len(profiles)
+                bodies.append(body)
+
+        feature = ExtrudeFeature(self._component, bodies, end_faces)
+        self._items.append(feature)
+        return feature
+
+
+class BaseFeature(Entity):
+    def __init__(self, component):
+        Entity.__init__(self)
+        self._component = component
+        self._bodies = []
+        self._timeline_object = component._design._timeline._add()
+
+    @property
+    def bodies(self):
+        return list(self._bodies)
+
+    timelineObject = field('_timeline_object')
+
+    def startEdit(self):
+        return True
+
+    def finishEdit(self):
+        return True
+
+
+class BaseFeatures(Collection):
+    def __init__(self, component):
+        Collection.__init__(self)
+        self._component = component
+
+    def add(self):
+        feature = BaseFeature(self._component)
+        self._items.append(feature)
+        return feature
+
+
+class Features(ApiObject):
+    def __init__(self, component):
+        self._patches = PatchFeatures(component)
+        self._extrudes = ExtrudeFeatures(component)
+        self._base_features = BaseFeatures(component)
+
+    patchFeatures = field('_patches')
+    extrudeFeatures = field('_extrudes')
+    baseFeatures = field('_base_features')
+
+
+class Occurrence(Entity):
+    isGrounded = field('_grounded', True)
+    transform = field('_transform', True)
+
+    def __init__(self, component, transform):
+        Entity.__init__(self)
+        self._component = component
+        self._transform = transform
+        self._grounded = False
+
+    component = field('_component')
+
+    def activate(self):
+        return True
+
+    @property
+    def boundingBox(self):
+        boxes = [body.boundingBox for body in self._component._bodies._items if body._valid]
+        if len(boxes) == 0:
+            return _bounding_box(np.zeros((1, 3)))
+        return _bounding_box([[box._min_point._array(), box._max_point._array()] for box in boxes])
+
+
+class Occurrences(Collection):
+    def __init__(self, component):
+        Collection.__init__(self)
+        self._component = component
+
+    def addNewComponent(self, transform):
+        design = self._component._design
+        component = Component(design, 'Component%d' % len(design._components))
+        design._components.append(component)
+        occurrence = Occurrence(component, transform)
+        self._items.append(occurrence)
+        return occurrence
+
+
+class Component(Entity):
+    def __init__(self, design, name):
+        Entity.__init__(self)
+        self._design = design
+        self._name = name
+        self._bodies = BRepBodies(self)
+        self._sketches = Sketches(self)
+        self._features = Features(self)
+        self._planes = ConstructionPlanes(self)
+        self._axes = ConstructionAxes(self)
+        self._occurrences = Occurrences(self)
+        self._yz_plane = ConstructionPlane(self, _Frame((1, 0, 0), 0.0))
+        self._xz_plane = ConstructionPlane(self, _Frame((0, 1, 0), 0.0))
+        self._xy_plane = ConstructionPlane(self, _Frame((0, 0, 1), 0.0))
+        self._x_axis = ConstructionAxis((1, 0, 0))
+        self._y_axis = ConstructionAxis((0, 1, 0))
+        self._z_axis = ConstructionAxis((0, 0, 1))
+
+    bRepBodies = field('_bodies')
+    sketches = field('_sketches')
+    features = field('_features')
+    constructionPlanes = field('_planes')
+    constructionAxes = field('_axes')
+    occurrences = field('_occurrences')
+    allOccurrences = field('_occurrences')
+    yZConstructionPlane = field('_yz_plane')
+    xZConstructionPlane = field('_xz_plane')
+    xYConstructionPlane = field('_xy_plane')
+    xConstructionAxis = field('_x_axis')
+    yConstructionAxis = field('_y_axis')
+    zConstructionAxis = field('_z_axis')
+
+
+# Only used in annotations
+class BRepFaces(Collection):
+    pass
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# The benchmark folder holds the mock adsk package and loads the add-in the same way the tests need it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'benchmarks'))
+
+import SlicerBenchmark
+
+
+@pytest.fixture(scope='session')
+def command():
+    return SlicerBenchmark.load_command_module()
@@ -0,0 +1,150 @@
+import adsk.core
+import adsk.fusion
+import numpy as np
+
+import BenchmarkModels
+from SlicerCore import MeshSection
+from SlicerCore.Containment import ContainmentGrid
+
+# Nested boxes, a solid with a box shaped void that holds a free island, and a plain solid box next to it
+NESTED_SIZES = ((8.0, 8.0, 4.0), (4.0, 4.0, 3.0), (2.0, 2.0, 2.0))
+
+
+def nested_mesh():
+    vertex_list, face_list, count = [], [], 0
+
+    for depth, size in enumerate(NESTED_SIZES):
+        vertices, faces = BenchmarkModels.box(size)
+        vertex_list.append(vertices)
+        face_list.append((faces if depth % 2 == 0 else faces[:, ::-1]) + count)
+        count += len(vertices)
+
+    vertices, faces = BenchmarkModels.box((2.0, 2.0, 2.0), center=(7.0, 0.0, 0.0))
+    vertex_list.append(vertices)
+    face_list.append(faces + count)
+
+    return np.vstack(vertex_list), np.vstack(face_list)
+
+
+# World x and y points (n, 2) in the plane basis of horizontal sections
+def project(points):
+    points = np.asarray(points, dtype=np.float64)
+    return MeshSection.project_points(np.column_stack((points, np.zeros(len(points)))), (0.0, 0.0, 1.0))
+
+
+# Even-odd containment of points (n, 2) in a set of loops
+def even_odd(points, loops):
+    crossings = sum(MeshSection.points_in_polygon(points, loop).astype(int) for loop in loops)
+    return crossings % 2 == 1
+
+
+def test_section_regions_of_nested_loops_and_holes():
+    vertices, faces = nested_mesh()
+    regions = MeshSection.section_regions(vertices, faces, (0.0, 0.0, 1.0), 0.0)
+
+    assert sorted((round(region.area, 6), region.is_material) for region in regions) == [
+        (4.0, True), (4.0, True), (12.0, False), (48.0, True)]
+
+    # Every region classified by its own area and centroid is material exactly where the even-odd rule says so
+    contained, matched = MeshSection.classify_profiles([region.area for region in regions],
+                                                       [region.centroid for region in regions], regions)
+    assert matched.all()
+    assert contained.tolist() == [region.is_material for region in regions]
+
+    loops = MeshSection.section_mesh(vertices, faces, (0.0, 0.0, 1.0), 0.0)
+    samples = project([[3.0, 0.0], [1.5, 0.0], [0.0, 0.0], [7.0, 0.0]])
+    for region in regions:
+        inside = MeshSection.points_in_polygon(samples, region.outer)
+        for hole in region.holes:
+            inside &= ~MeshSection.points_in_polygon(samples, hole)
+        assert inside.sum() == 1
+        assert even_odd(samples[inside], loops)[0] == region.is_material
+
+
+def test_containment_grid_matches_even_odd_sections():
+    vertices, faces = nested_mesh()
+    grid = ContainmentGrid(vertices, faces, tolerance=0.01)
+
+    x, y = np.meshgrid(np.linspace(-5.0, 9.0, 57), np.linspace(-5.0, 5.0, 41), indexing='ij')
+    points = np.column_stack((x.ravel(), y.ravel()))
+
+    for height in (-0.9, 0.0, 0.7):
+        contained, matched = grid.classify(np.column_stack((points, np.full(len(points), height))))
+        loops = MeshSection.section_mesh(vertices, faces, (0.0, 0.0, 1.0), height)
+        expected = even_odd(project(points), loops)
+
+        assert matched.mean() > 0.5
+        assert contained[matched].tolist() == expected[matched].tolist()
+        assert expected[matched].any() and not expected[matched].all()
+
+
+# Torus cut through its middle, the ring of material has a hole that holds its area centroid
+def torus_sketch(command):
+    design = adsk.fusion.new_design()
+    vertices, faces = BenchmarkModels.torus(segments=48)
+    body = adsk.fusion.add_mesh_body(design.rootComponent, vertices, faces, 'torus')
+    plane = command.create_offset_plane(design.rootComponent, 0.0, design.rootComponent.xYConstructionPlane)
+    sketch = design.rootComponent.sketches.add(plane)
+    sketch.projectCutEdges(body)
+    return body, sketch
+
+
+def test_contained_profiles_without_patches(command):
+    body, sketch = torus_sketch(command)
+    patches = body.parentComponent.features.patchFeatures
+
+    profiles = command.get_contained_profiles(sketch, patches, body)
+
+    assert sketch.profiles.count == 2
+    assert profiles.count == 1
+    area = profiles.item(0).areaProperties().area
+    np.testing.assert_allclose(area, np.pi * (8.0 ** 2 - 4.0 ** 2), rtol=0.02)
+    assert patches.count == 0
+
+
+def test_contained_mid_plane_profiles_keep_their_patch(command):
+    body, sketch = torus_sketch(command)
+    patches = body.parentComponent.features.patchFeatures
+    mid_slices = []
+
+    profiles = command.get_contained_profiles(sketch, patches, body, True, mid_slices)
+
+    assert profiles.count == 1
+    assert patches.count == 1
+    assert mid_slices == [patches.item(0).faces[0]]
+
+
+def test_containment_grid_agrees_with_the_kernel_away_from_the_surface():
+    design = adsk.fusion.new_design()
+    vertices, faces = BenchmarkModels.torus(6.0, 2.0, 48)
+    body = adsk.fusion.add_mesh_body(design.rootComponent, vertices, faces, 'torus')
+    grid = ContainmentGrid(vertices, faces, tolerance=0.05, cells=48)
+
+    points = np.random.default_rng(24).uniform(-9.0, 9.0, (3000, 3)) * [1.0, 1.0, 0.3]
+    contained, matched = grid.classify(points)
+
+    kernel = np.array([body.pointContainment(adsk.core.Point3D.create(*point)) ==
+                       adsk.fusion.PointContainment.PointInsidePointContainment for point in points.tolist()])
+    assert matched.mean() > 0.6
+    assert contained[matched].tolist() == kernel[matched].tolist()
+    assert kernel[matched].any() and not kernel[matched].all()
+
+    # Nothing closer to the surface than the tolerance is answered
+    tube = np.hypot(np.hypot(points[:, 0], points[:, 1]) - 6.0, points[:, 2])
+    assert np.all(np.abs(tube - 2.0)[matched] > 0.05)
+
+
+def test_containment_grid_points_outside_are_matched():
+    vertices, faces = BenchmarkModels.box((2.0, 2.0, 2.0))
+    grid = ContainmentGrid(vertices, faces)
+
+    contained, matched = grid.classify([[5.0, 0.0, 0.0], [0.0, 0.0, -3.0], [0.0, 0.0, 0.0]])
+
+    assert contained.tolist() == [False, False, True]
+    assert matched.tolist() == [True, True, True]
+
+
+def test_containment_grid_of_an_empty_mesh():
+    contained, matched = ContainmentGrid(np.zeros((0, 3)), np.zeros((0, 3))).classify([[0.0, 0.0, 0.0]])
+
+    assert contained.tolist() == [False] and matched.tolist() == [True]
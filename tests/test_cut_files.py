@@ -0,0 +1,27 @@
+import numpy as np
+
+from SlicerCore import CutFiles, MeshSection, SliceFamilies
+
+THICKNESS = 0.3
+
+
+# Square section of side 2 * half around the origin of the slice plane basis
+def square_regions(half):
+    outer = np.array([[-half, -half], [half, -half], [half, half], [-half, half]])
+    return [MeshSection.SectionRegion(outer, [], 4 * half * half, np.zeros(2), True)]
+
+
+def test_slot_notches_one_rectangle_per_post():
+    families = [SliceFamilies.parallel_family('X', (1.0, 0.0, 0.0), [-1.0, 0.0, 1.0]),
+                SliceFamilies.parallel_family('Y', (0.0, 1.0, 0.0), [-0.5, 0.5])]
+    regions = [[square_regions(5.0)] * len(family.offsets) for family in families]
+    (posts, use_top), _ = SliceFamilies.plan_family_posts(families, regions, regions, THICKNESS)
+
+    notches = CutFiles.slot_notches(posts, 3, families[0].normals, use_top)
+
+    assert [len(loops) for loops in notches] == [2, 2, 2]
+    for loops in notches:
+        for loop in loops:
+            extent = np.sort(loop.max(axis=0) - loop.min(axis=0))
+            np.testing.assert_allclose(extent, [THICKNESS, 10.0], atol=1e-9)
+            assert MeshSection.loop_area(loop) > 0
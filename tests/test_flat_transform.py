@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from SlicerCore import MeshSection, Nesting
+
+NORMALS = [(1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0), (0.0, 0.0, -1.0), (0.6, 0.8, 0.0),
+           (1.0, -2.0, 0.5)]
+
+# A slice outline in its plane basis, an L shape away from the basis origin
+OUTLINE = np.array([[2.0, 1.0], [6.0, 1.0], [6.0, 2.0], [3.0, 2.0], [3.0, 5.0], [2.0, 5.0]])
+
+
+def transform_points(matrix, points):
+    return points.dot(matrix[:3, :3].T) + matrix[:3, 3]
+
+
+def assert_rigid(matrix):
+    rotation = matrix[:3, :3]
+    np.testing.assert_allclose(rotation.dot(rotation.T), np.identity(3), atol=1e-12)
+    assert np.linalg.det(rotation) == pytest.approx(1.0)
+    np.testing.assert_allclose(matrix[3], [0.0, 0.0, 0.0, 1.0])
+
+
+@pytest.mark.parametrize('normal', NORMALS)
+def test_flat_transform_lays_the_mid_plane_on_xy(normal):
+    matrix = Nesting.flat_transform(normal, 2.5, lift=0.15)
+    assert_rigid(matrix)
+
+    points = MeshSection.unproject_points(OUTLINE, normal, 2.5)
+    flat = transform_points(matrix, points)
+
+    # The plane lands at the lift height and the loops keep their plane basis coordinates
+    np.testing.assert_allclose(flat[:, 2], 0.15, atol=1e-12)
+    np.testing.assert_allclose(flat[:, :2], OUTLINE, atol=1e-12)
+
+
+@pytest.mark.parametrize('normal', NORMALS)
+@pytest.mark.parametrize('rotation', [0, 90, 180, 270])
+def test_sheet_transform_places_the_part_box_at_its_placement(normal, rotation):
+    result = Nesting.nest_parts([[OUTLINE]], 20.0, 20.0, margin=1.0, rotations=(rotation,))
+    placement = result.placements[0]
+    origin = (40.0, -3.0, 0.3)
+
+    matrix = Nesting.sheet_transform(normal, -1.2, placement, origin, lift=0.15)
+    assert_rigid(matrix)
+
+    sheet = transform_points(matrix, MeshSection.unproject_points(OUTLINE, normal, -1.2))
+    np.testing.assert_allclose(sheet[:, 2], origin[2] + 0.15, atol=1e-12)
+    np.testing.assert_allclose(sheet[:, :2] - origin[:2], Nesting.apply_placement([OUTLINE], placement)[0],
+                               atol=1e-9)
+
+    # Bottom left fill puts the bounding box of the part in the corner of the sheet inside its margin
+    np.testing.assert_allclose(sheet[:, :2].min(axis=0) - origin[:2], [1.0, 1.0], atol=1e-6)
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from SlicerCore import MeshCache
+
+# Two triangles sharing an edge, the shared nodes are repeated as a Fusion TriangleMesh returns them
+COORDINATES = [0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0,
+               1.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 1.0, 0.0]
+INDICES = [0, 1, 2, 3, 4, 5]
+
+
+# Counts the tessellations it is asked for
+class Tessellator:
+    def __init__(self):
+        self.tolerances = []
+
+    def __call__(self, tolerance):
+        self.tolerances.append(tolerance)
+        return COORDINATES, INDICES
+
+
+def test_mesh_is_tessellated_once_per_tolerance():
+    cache = MeshCache.TessellationCache()
+    tessellate = Tessellator()
+
+    first = cache.mesh('body', 1, 0.01, tessellate)
+    second = cache.mesh('body', 1, 0.01, tessellate)
+    cache.mesh('body', 1, 0.1, tessellate)
+
+    assert first[0] is second[0] and first[1] is second[1]
+    assert tessellate.tolerances == [0.01, 0.1]
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert first[0].shape == (4, 3) and first[1].shape == (2, 3)
+
+
+def test_meshes_are_read_only():
+    vertices, faces = MeshCache.TessellationCache().mesh('body', 1, 0.01, Tessellator())
+
+    with pytest.raises(ValueError):
+        vertices[0, 0] = 5.0
+    with pytest.raises(ValueError):
+        faces[0, 0] = 3
+
+
+def test_new_revision_drops_the_old_meshes_and_derived_objects():
+    cache = MeshCache.TessellationCache()
+    tessellate = Tessellator()
+    cache.mesh('body', 1, 0.01, tessellate)
+    cache.derived('body', 1, 'grid', lambda: 'old')
+
+    cache.mesh('body', 2, 0.01, tessellate)
+
+    assert tessellate.tolerances == [0.01, 0.01]
+    assert cache.invalidations == 1
+    assert cache.derived('body', 2, 'grid', lambda: 'new') == 'new'
+
+
+def test_derived_objects_are_built_once():
+    cache = MeshCache.TessellationCache()
+    built = []
+
+    def build():
+        built.append(1)
+        return np.arange(3)
+
+    first = cache.derived('body', 1, 'containment-0.01', build)
+
+    assert cache.derived('body', 1, 'containment-0.01', build) is first
+    assert len(built) == 1
+
+
+def test_least_recently_used_body_is_dropped():
+    cache = MeshCache.TessellationCache(max_bodies=2)
+    tessellate = Tessellator()
+    cache.mesh('a', 1, 0.01, tessellate)
+    cache.mesh('b', 1, 0.01, tessellate)
+    cache.mesh('a', 1, 0.01, tessellate)
+
+    cache.mesh('c', 1, 0.01, tessellate)
+
+    assert list(cache.bodies) == ['a', 'c']
+    cache.mesh('b', 1, 0.01, tessellate)
+    assert len(tessellate.tolerances) == 4
+    assert len(cache) == 2
+
+
+def test_invalidate_and_clear():
+    cache = MeshCache.TessellationCache()
+    tessellate = Tessellator()
+    cache.mesh('a', 1, 0.01, tessellate)
+    cache.mesh('b', 1, 0.01, tessellate)
+
+    cache.invalidate('a')
+    cache.invalidate('missing')
+
+    assert cache.invalidations == 1 and list(cache.bodies) == ['b']
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,37 @@
+import numpy as np
+
+from SlicerCore import MeshSection
+
+
+def test_match_faces_prefers_boxes_overlapping_in_the_plane():
+    # End faces are half a slice above the mid faces, the centroid of the first mid face is closer to the wrong body
+    boxes = [[[0.0, 0.0, 0.0], [4.0, 10.0, 0.0]], [[4.2, 4.8, 0.0], [5.6, 5.2, 0.0]]]
+    end_boxes = [[[0.0, 0.0, 0.15], [4.0, 10.0, 0.15]], [[4.2, 4.8, 0.15], [5.6, 5.2, 0.15]]]
+
+    matches = MeshSection.match_faces([40.0, 0.56], [[3.9, 5.0, 0.0], [5.5, 5.0, 0.0]], boxes,
+                                      [40.0, 0.56], [[3.0, 5.0, 0.15], [4.25, 5.0, 0.15]], end_boxes, (0, 0, 1))
+
+    assert matches.tolist() == [0, 1]
+
+
+# Square of side 10 with a square hole of side 6, the centroid of the material lies in the hole
+def square_ring():
+    outer = np.array([[-5.0, -5.0], [5.0, -5.0], [5.0, 5.0], [-5.0, 5.0]])
+    return outer, outer[::-1] * 0.6
+
+
+def test_interior_point_of_split_and_reversed_polylines():
+    outer, hole = square_ring()
+    closed_outer, closed_hole = np.vstack((outer, outer[:1])), np.vstack((hole, hole[:1]))
+    polylines = [closed_hole[2:], closed_outer[:3][::-1], closed_hole[:3], closed_outer[2:][::-1]]
+
+    point = MeshSection.interior_point(polylines)
+
+    assert MeshSection.points_in_polygon([point], outer)[0]
+    assert not MeshSection.points_in_polygon([point], hole)[0]
+    assert min(np.abs(point).max() - 3.0, 5.0 - np.abs(point).max()) >= 0.5
+
+
+def test_interior_point_without_a_region():
+    assert MeshSection.interior_point([]) is None
+    assert MeshSection.interior_point([[[0.0, 0.0], [1.0, 0.0]]]) is None
@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+
+from SlicerCore import MeshSection, Nesting
+
+KERF = 0.2
+
+
+def l_shape(size):
+    return [np.array([[0.0, 0.0], [size, 0.0], [size, size / 3], [size / 3, size / 3], [size / 3, size],
+                      [0.0, size]])]
+
+
+def circle(radius, count=24):
+    angles = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    return [np.column_stack((np.cos(angles), np.sin(angles))) * radius]
+
+
+# Distances from the points (n, 2) to the closest of the loop edges
+def edge_distances(points, loop):
+    starts, ends = loop, np.roll(loop, -1, axis=0)
+    spans = ends - starts
+    t = np.clip(np.einsum('pij,ij->pi', points[:, None] - starts, spans) / np.einsum('ij,ij->i', spans, spans), 0, 1)
+    return np.linalg.norm(starts + t[..., None] * spans - points[:, None], axis=2).min(axis=1)
+
+
+def test_nested_parts_stay_on_their_sheets_and_apart():
+    parts = [l_shape(6.0) for _ in range(6)] + [circle(2.0) for _ in range(6)]
+    result = Nesting.nest_parts(parts, 20.0, 15.0, kerf=KERF, margin=0.5)
+
+    assert result.unplaced == []
+    assert sorted(placement.part for placement in result.placements) == list(range(len(parts)))
+    assert result.sheet_count == 1 + max(placement.sheet for placement in result.placements)
+
+    placed = {placement.part: Nesting.apply_placement(parts[placement.part], placement)[0]
+              for placement in result.placements}
+    for loop in placed.values():
+        assert loop.min() >= 0.5 - 1e-6
+        assert np.all(loop.max(axis=0) <= np.array([20.0, 15.0]) - 0.5 + 1e-6)
+
+    # Outlines on one sheet neither overlap nor come closer than the kerf, a small tolerance covers the slide steps
+    for a, b in itertools.combinations(result.placements, 2):
+        if a.sheet != b.sheet:
+            continue
+        first, second = placed[a.part], placed[b.part]
+        assert not MeshSection.points_in_polygon(first, second).any()
+        assert not MeshSection.points_in_polygon(second, first).any()
+        assert edge_distances(first, second).min() >= KERF * 0.9
+
+
+def test_parts_overflow_onto_more_sheets():
+    result = Nesting.nest_parts([circle(4.0) for _ in range(5)], 10.0, 10.0, kerf=KERF)
+
+    assert result.sheet_count == 5
+    assert all(0 < utilization < 1 for utilization in result.utilization)
+
+
+def test_parts_larger_than_the_sheet_are_unplaced():
+    result = Nesting.nest_parts([l_shape(30.0), circle(1.0)], 10.0, 10.0)
+
+    assert result.unplaced == [0]
+    assert [placement.part for placement in result.placements] == [1]
@@ -0,0 +1,23 @@
+import pytest
+
+from Fusion360Utilities.Fusion360DebugUtilities import Profiler, _percentile
+
+
+@pytest.mark.parametrize('count, percent, expected', [(10, 50, 5), (20, 95, 19), (100, 95, 95), (10, 100, 10),
+                                                      (10, 10, 1), (10, 0, 1), (1, 50, 1)])
+def test_percentile_nearest_rank(count, percent, expected):
+    assert _percentile(list(range(1, count + 1)), percent) == expected
+
+
+def test_percentile_of_nothing():
+    assert _percentile([], 95) == 0.0
+
+
+def test_counters_add_up_and_set():
+    profiler = Profiler()
+    profiler.count('dowels', 3)
+    profiler.count('dowels', 2)
+    profiler.set('slot_features', 4)
+    profiler.set('slot_features', 6)
+
+    assert profiler.counters == {'dowels': 5, 'slot_features': 6}
@@ -0,0 +1,49 @@
+import numpy as np
+
+import BenchmarkModels
+from SlicerCore import MeshSection, SectionPool
+
+
+def test_small_meshes_are_sectioned_without_a_pool(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError('A process pool was started')
+
+    monkeypatch.setattr(SectionPool, 'ProcessPoolExecutor', no_pool)
+    vertices, faces = BenchmarkModels.sphere()
+    offsets = np.linspace(-4.5, 4.5, 64)
+
+    results = SectionPool.section_regions_parallel(vertices, faces, (1.0, 0.0, 0.0), offsets, max_workers=4)
+
+    expected = MeshSection.section_regions_batch(vertices, faces, (1.0, 0.0, 0.0), offsets)
+    assert [len(regions) for regions in results] == [len(regions) for regions in expected]
+
+
+def test_estimate_crossings_counts_triangle_plane_pairs():
+    vertices, faces = BenchmarkModels.sphere(segments=256)
+    offsets = np.linspace(-4.9, 4.9, 200)
+
+    heights = vertices[:, 0][faces]
+    exact = sum(int(np.count_nonzero((heights.min(axis=1) < offset) & (offset <= heights.max(axis=1))))
+                for offset in offsets)
+
+    assert SectionPool.estimate_crossings(vertices, faces, (1.0, 0.0, 0.0), offsets, samples=len(faces)) == exact
+    assert abs(SectionPool.estimate_crossings(vertices, faces, (1.0, 0.0, 0.0), offsets, samples=4096) - exact) < \
+        0.05 * exact
+
+
+def test_large_sections_start_a_pool(monkeypatch):
+    started = []
+
+    def failing_pool(*args, **kwargs):
+        started.append(kwargs.get('max_workers'))
+        raise RuntimeError('No pool in tests')
+
+    monkeypatch.setattr(SectionPool, 'ProcessPoolExecutor', failing_pool)
+    monkeypatch.setattr(SectionPool, 'MIN_PARALLEL_CROSSINGS', 1000)
+    vertices, faces = BenchmarkModels.sphere()
+    offsets = np.linspace(-4.5, 4.5, 64)
+
+    results = SectionPool.section_regions_parallel(vertices, faces, (1.0, 0.0, 0.0), offsets, max_workers=4)
+
+    assert started == [4]
+    assert len(results) == len(offsets)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from SlicerCore import SliceFamilies
+
+
+def test_parallel_family_repeats_the_unit_normal():
+    family = SliceFamilies.parallel_family('X_Slice', (2.0, 0.0, 0.0), [1.0, 2.0, 3.0])
+
+    np.testing.assert_allclose(family.normals, np.tile([1.0, 0.0, 0.0], (3, 1)))
+    np.testing.assert_allclose(family.offsets, [1.0, 2.0, 3.0])
+
+
+def test_radial_family_spreads_over_half_a_turn_through_the_center():
+    center = np.array([3.0, -2.0, 7.0])
+
+    family = SliceFamilies.radial_family('R_Slice', 4, center=center, start=(1.0, 0.0, 1.0))
+
+    angles = np.degrees(np.arctan2(family.normals[:, 1], family.normals[:, 0]))
+    np.testing.assert_allclose(angles, [0.0, 45.0, 90.0, 135.0], atol=1e-9)
+    np.testing.assert_allclose(family.normals[:, 2], 0.0, atol=1e-12)
+    np.testing.assert_allclose(family.offsets, family.normals.dot(center))
+
+
+def test_normal_groups_of_parallel_and_radial_families():
+    parallel = SliceFamilies.parallel_family('Z_Slice', (0.0, 0.0, 1.0), [0.0, 1.0, 2.0])
+    mixed = SliceFamilies.family_from_planes('Mixed', [[1, 0, 0], [0, 1, 0], [1, 0, 0]], [0.0, 0.0, 1.0])
+
+    assert [indices.tolist() for _, indices in SliceFamilies.normal_groups(parallel)] == [[0, 1, 2]]
+    assert [indices.tolist() for _, indices in SliceFamilies.normal_groups(mixed)] == [[0, 2], [1]]
+
+
+def test_family_sections_batch_planes_by_normal():
+    families = [SliceFamilies.parallel_family('X_Slice', (1.0, 0.0, 0.0), [1.0, 2.0]),
+                SliceFamilies.family_from_planes('Mixed', [[0, 1, 0], [1, 0, 0]], [5.0, 4.0])]
+    calls = []
+
+    def compute(normal, offsets):
+        calls.append((tuple(normal), list(offsets)))
+        return [('regions', offset) for offset in offsets]
+
+    sections = SliceFamilies.family_sections(families, 0.2, compute)
+
+    assert [normal for normal, _ in calls] == [(1.0, 0.0, 0.0), (0.0, 1.0, 0.0)]
+    assert len(calls[0][1]) == 9 and len(calls[1][1]) == 3
+
+    mid, plus, minus = sections[1][1]
+    assert mid == ([1.0, 0.0, 0.0], 4.0, ('regions', 4.0))
+    np.testing.assert_allclose([plus[1], minus[1]], [4.1, 3.9])
+    assert [len(family_sections) for family_sections in sections] == [2, 2]
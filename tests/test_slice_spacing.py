@@ -0,0 +1,58 @@
+import numpy as np
+
+import BenchmarkModels
+from SlicerCore import SliceSpacing
+
+
+def test_box_is_sliced_evenly():
+    vertices, faces = BenchmarkModels.box((8.0, 6.0, 4.0))
+
+    offsets = SliceSpacing.adaptive_offsets(vertices, faces, (1.0, 0.0, 0.0), -4.0, 4.0, 7, 0.3)
+
+    np.testing.assert_allclose(offsets, -4.0 + np.arange(1, 8), atol=1e-9)
+
+
+def test_sphere_slices_crowd_where_the_section_changes():
+    vertices, faces = BenchmarkModels.sphere(5.0, 48)
+
+    offsets = SliceSpacing.adaptive_offsets(vertices, faces, (0.0, 0.0, 1.0), -5.0, 5.0, 9, 0.3)
+    gaps = np.diff(offsets)
+
+    assert np.all(gaps >= 0.3 - 1e-9)
+    np.testing.assert_allclose(offsets, -offsets[::-1], atol=0.2)
+    assert gaps[len(gaps) // 2] > 1.5 * min(gaps[0], gaps[-1])
+
+
+def test_spacing_weights_follow_the_change():
+    positions = np.arange(5.0)
+
+    weights = SliceSpacing.spacing_weights(positions, [1.0, 1.0, 3.0, 3.0, 3.0], [4.0, 4.0, 4.0, 4.0, 4.0])
+
+    np.testing.assert_allclose(weights.sum(), 1.0)
+    np.testing.assert_allclose(weights, [0.1, 0.7, 0.1, 0.1])
+
+
+def test_spacing_weights_without_change_are_even():
+    weights = SliceSpacing.spacing_weights([0.0, 1.0, 3.0], [2.0, 2.0, 2.0], [0.0, 0.0, 0.0])
+
+    np.testing.assert_allclose(weights, [1 / 3, 2 / 3])
+
+
+def test_budget_offsets_keep_the_gap():
+    positions = np.linspace(0.0, 10.0, 11)
+    weights = np.zeros(10)
+    weights[4] = 1.0
+
+    offsets = SliceSpacing.budget_offsets(positions, weights, 5, 0.5)
+
+    assert np.all(np.diff(offsets) >= 0.5 - 1e-9)
+    assert offsets[0] >= 0.5 - 1e-9 and offsets[-1] <= 9.5 + 1e-9
+    # All weight is between 4 and 5, the gap pushes the later slices out of it
+    assert 4.0 <= offsets[0] <= 5.0
+    assert offsets[-1] <= offsets[0] + 4 * 0.5 + 1e-9
+
+
+def test_budget_offsets_without_room_are_even():
+    offsets = SliceSpacing.budget_offsets([0.0, 1.0, 2.0], [1.0, 0.0], 3, 0.6)
+
+    np.testing.assert_allclose(offsets, [0.5, 1.0, 1.5])
@@ -0,0 +1,87 @@
+import numpy as np
+
+from SlicerCore import SliceStore
+
+
+def test_token_table_adds_each_token_once():
+    tokens = SliceStore.TokenTable()
+
+    rows = [tokens.add(token) for token in ('a', 'b', 'a', 'c', 'b')]
+
+    assert rows == [0, 1, 0, 2, 1]
+    assert len(tokens) == 3
+    assert [tokens.token(row) for row in range(3)] == ['a', 'b', 'c']
+
+
+def test_token_table_looks_entities_up_once():
+    found = []
+
+    def find(token):
+        found.append(token)
+        return None if token == 'gone' else token.upper()
+
+    tokens = SliceStore.TokenTable(find)
+    known = tokens.add('known', 'entity')
+    lazy = tokens.add('lazy')
+    gone = tokens.add('gone')
+
+    assert [tokens.entity(row) for row in (known, lazy, gone, lazy, gone)] == ['entity', 'LAZY', None, 'LAZY', None]
+    assert found == ['lazy', 'gone']
+
+
+# Slice 0 has two islands side by side along x, slice 1 one face, all of them in planes of constant y
+def island_faces():
+    return SliceStore.face_rows([(0, 0, 0, (0.0, 0.0, 0.0), (4.0, 0.0, 4.0)),
+                                 (0, 1, 1, (6.0, 0.0, 0.0), (10.0, 0.0, 4.0)),
+                                 (1, 2, 2, (0.0, 5.0, 0.0), (10.0, 5.0, 4.0))])
+
+
+def vertical_posts(targets, x, y):
+    count = len(targets)
+    top = np.column_stack((x, y, np.full(count, 4.0)))
+    bottom = np.column_stack((x, y, np.zeros(count)))
+    up = np.tile([0.0, 0.0, 1.0], (count, 1))
+    across = np.tile([1.0, 0.0, 0.0], (count, 1))
+    return targets, top, np.full(count, 4.0), top, bottom, up, across, np.full(count, 0.3)
+
+
+def test_posts_on_faces_pick_the_island_they_reach():
+    faces = island_faces()
+
+    posts = SliceStore.posts_on_faces(faces, *vertical_posts([0, 0, 1, 0], [2.0, 8.0, 3.0, 5.0],
+                                                             [0.0, 0.0, 5.0, 0.0]))
+
+    # The post between the islands reaches neither of them
+    assert posts['face'].tolist() == [0, 1, 2]
+    np.testing.assert_allclose(posts['point'][:, 0], [2.0, 8.0, 3.0])
+    np.testing.assert_allclose(posts['width'], 0.3)
+    np.testing.assert_allclose(posts['up'], np.tile([0.0, 0.0, 1.0], (3, 1)))
+
+
+def test_posts_on_faces_without_posts():
+    posts = SliceStore.posts_on_faces(island_faces(), *vertical_posts([], [], []))
+
+    assert posts.dtype == SliceStore.POST_DTYPE
+    assert len(posts) == 0
+
+
+def test_group_posts_by_body_in_first_seen_order():
+    faces = island_faces()
+    posts = SliceStore.posts_on_faces(faces, *vertical_posts([1, 0, 1, 0, 0], [1.0, 1.0, 9.0, 7.0, 3.0],
+                                                             [5.0, 0.0, 5.0, 0.0, 0.0]))
+    table = SliceStore.PostTable(posts, faces, SliceStore.TokenTable())
+
+    groups = SliceStore.group_posts(table)
+
+    assert [(body, indices.tolist()) for body, indices in groups] == [(2, [0, 2]), (0, [1, 4]), (1, [3])]
+
+
+def test_select_posts_keeps_the_side_tables():
+    faces = island_faces()
+    posts = SliceStore.posts_on_faces(faces, *vertical_posts([0, 0, 1], [2.0, 8.0, 3.0], [0.0, 0.0, 5.0]))
+    table = SliceStore.PostTable(posts, faces, SliceStore.TokenTable())
+
+    selected = SliceStore.select_posts(table, [2, 0])
+
+    assert selected.posts['face'].tolist() == [2, 0]
+    assert selected.faces is faces and selected.tokens is table.tokens
@@ -0,0 +1,77 @@
+import adsk.fusion
+
+import BenchmarkModels
+
+
+def add_box(design, name='box', center=(0.0, 0.0, 0.0)):
+    vertices, faces = BenchmarkModels.box(center=center)
+    return adsk.fusion.add_mesh_body(design.rootComponent, vertices, faces, name)
+
+
+def test_slicer_def_creates_fresh_base_planes(command):
+    design = adsk.fusion.new_design()
+    body = add_box(design)
+    planes = body.parentComponent.constructionPlanes
+
+    first = command.SlicerDef(body, 3, 3, 0.3, False, num_radial=2)
+    count = planes.count
+    second = command.SlicerDef(body, 3, 3, 0.3, False, num_radial=2)
+
+    assert planes.count == 2 * count
+    assert second.x_plane is not first.x_plane
+    assert second.radial_axis.axis is not first.radial_axis.axis
+
+
+def test_slicer_def_reuses_base_planes_of_the_same_body(command):
+    design = adsk.fusion.new_design()
+    body = add_box(design)
+    planes = body.parentComponent.constructionPlanes
+
+    first = command.SlicerDef(body, 3, 3, 0.3, False, num_radial=2)
+    count = planes.count
+    last_planes = command.get_last_planes(design, command.get_slicer_state(first), body)
+    second = command.SlicerDef(body, 4, 2, 0.3, False, num_radial=2, last_planes=last_planes)
+
+    assert planes.count == count
+    assert body.parentComponent.constructionAxes.count == 1
+    assert (second.x_plane, second.y_plane, second.z_plane) == (first.x_plane, first.y_plane, first.z_plane)
+    assert second.radial_axis.axis is first.radial_axis.axis
+    assert not second.moved_planes
+
+
+def test_slicer_def_ignores_base_planes_of_another_body(command):
+    design = adsk.fusion.new_design()
+    body = add_box(design)
+    other = add_box(design, 'other', (20.0, 0.0, 0.0))
+
+    first = command.SlicerDef(body, 3, 3, 0.3, False)
+
+    assert command.get_last_planes(design, command.get_slicer_state(first), other) == {}
+    assert command.get_last_planes(design, None, body) == {}
+
+
+def test_slicer_def_moves_base_planes_to_the_body(command):
+    design = adsk.fusion.new_design()
+    body = add_box(design)
+    first = command.SlicerDef(body, 3, 3, 0.3, False)
+    first.x_plane.definition.offset.value += 1.0
+
+    last_planes = command.get_last_planes(design, command.get_slicer_state(first), body)
+    second = command.SlicerDef(body, 3, 3, 0.3, False, last_planes=last_planes)
+
+    assert second.moved_planes
+    assert second.x_plane is first.x_plane
+    assert abs(command.get_plane_offset(second.x_plane) - body.boundingBox.minPoint.x) < 1e-9
+
+
+def test_slicer_def_recreates_deleted_base_planes(command):
+    design = adsk.fusion.new_design()
+    body = add_box(design)
+    first = command.SlicerDef(body, 3, 3, 0.3, False)
+    state = command.get_slicer_state(first)
+    first.x_plane.deleteMe()
+
+    second = command.SlicerDef(body, 3, 3, 0.3, False, last_planes=command.get_last_planes(design, state, body))
+
+    assert second.x_plane is not first.x_plane
+    assert second.y_plane is first.y_plane
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+import adsk.fusion
+
+import BenchmarkModels
+from SlicerCore import SliceFamilies, SlotPlanner
+
+THICKNESS = 0.3
+
+
+# X and Y slice faces and their sections of a box, whose sections are the same on both faces of every slice
+def slice_box(command, x_qty, y_qty):
+    design = adsk.fusion.new_design()
+    vertices, faces = BenchmarkModels.box()
+    target_body = adsk.fusion.add_mesh_body(design.rootComponent, vertices, faces, 'box')
+    command.MESH_CACHE.clear()
+
+    slicer_def = command.SlicerDef(target_body, x_qty, y_qty, THICKNESS, False)
+    x_sections = command.get_slice_sections(slicer_def.mesh, slicer_def.x_plane, slicer_def.x_spacing, x_qty,
+                                            THICKNESS)
+    y_sections = command.get_slice_sections(slicer_def.mesh, slicer_def.y_plane, slicer_def.y_spacing, y_qty,
+                                            THICKNESS)
+    x_faces = command.create_slices2(target_body, slicer_def.x_spacing, x_qty, slicer_def.x_plane, THICKNESS,
+                                     'X_Slice', x_sections)[1]
+    y_faces = command.create_slices2(target_body, slicer_def.y_spacing, y_qty, slicer_def.y_plane, THICKNESS,
+                                     'Y_Slice', y_sections)[1]
+
+    return x_faces, y_faces, x_sections, y_sections
+
+
+def sorted_points(points):
+    points = np.round(np.asarray(points, dtype=np.float64).reshape(-1, 3), 6)
+    return points[np.lexsort(points.T[::-1])]
+
+
+@pytest.mark.parametrize('quantities', [(3, 4), (5, 2)])
+def test_planned_posts_match_kernel_posts(command, quantities):
+    x_faces, y_faces, x_sections, y_sections = slice_box(command, *quantities)
+
+    for target_faces, intersect_faces, target_sections, intersect_sections in (
+            (x_faces, y_faces, x_sections, y_sections), (y_faces, x_faces, y_sections, x_sections)):
+        top_points, bottom_points = command.make_posts(target_faces, intersect_faces)
+        top_table, bottom_table = command.make_planned_posts(target_faces, intersect_faces, target_sections,
+                                                             intersect_sections, THICKNESS)
+
+        assert len(top_table.posts) == len(top_points) == len(target_faces) * len(intersect_faces)
+        assert len(bottom_table.posts) == len(bottom_points)
+
+        np.testing.assert_allclose(sorted_points(top_table.posts['point']),
+                                   sorted_points([post.point.asArray() for post in top_points]), atol=1e-6)
+        np.testing.assert_allclose(sorted_points(bottom_table.posts['point']),
+                                   sorted_points([post.point.asArray() for post in bottom_points]), atol=1e-6)
+        np.testing.assert_allclose(np.sort(top_table.posts['length']),
+                                   np.sort([post.length for post in top_points]), atol=1e-6)
+        np.testing.assert_allclose(top_table.posts['width'], THICKNESS)
+
+
+# Square section of side 2 * half around the origin of the slice plane basis
+def square_regions(half):
+    outer = np.array([[-half, -half], [half, -half], [half, half], [-half, half]])
+    return [SlotPlanner.MeshSection.SectionRegion(outer, [], 4 * half * half, np.zeros(2), True)]
+
+
+@pytest.mark.parametrize('angle', [90.0, 60.0, 30.0])
+def test_plan_posts_single_post_per_crossing(angle):
+    radians = np.radians(angle)
+    slice_normal = (np.cos(radians), np.sin(radians), 0.0)
+    regions = [square_regions(5.0)] * 2
+
+    posts = SlotPlanner.plan_posts((1.0, 0.0, 0.0), [-1.0, 0.0, 1.0], slice_normal, [-0.5, 0.5], regions, regions,
+                                   THICKNESS)
+
+    assert len(posts.target) == 6
+    assert sorted(zip(posts.target.tolist(), posts.slice.tolist())) == [(t, s) for t in range(3) for s in range(2)]
+    np.testing.assert_allclose(posts.width, THICKNESS * (1 + abs(np.cos(radians))) / np.sin(radians))
+
+    # Both post ends lie on the mid planes of the target and the crossing slice
+    for ends in (posts.top, posts.bottom):
+        np.testing.assert_allclose(ends[:, 0], np.array([-1.0, 0.0, 1.0])[posts.target], atol=1e-9)
+        np.testing.assert_allclose(ends.dot(slice_normal), np.array([-0.5, 0.5])[posts.slice], atol=1e-9)
+
+
+def test_plan_family_posts_notches_each_post_once():
+    families = [SliceFamilies.parallel_family('X', (1.0, 0.0, 0.0), [-1.0, 0.0, 1.0]),
+                SliceFamilies.parallel_family('Y', (0.0, 1.0, 0.0), [-0.5, 0.5])]
+    regions = [[square_regions(5.0)] * len(family.offsets) for family in families]
+
+    (x_posts, x_top), (y_posts, y_top) = SliceFamilies.plan_family_posts(families, regions, regions, THICKNESS)
+
+    assert len(x_posts.target) == len(y_posts.target) == 6
+    assert x_top.tolist() == [True] * 6
+    assert y_top.tolist() == [False] * 6
+    np.testing.assert_allclose(x_posts.width, THICKNESS)
+
+
+def test_slot_rectangles_and_corners_span_the_slot():
+    points = np.array([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0]])
+    across = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    up = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, 1.0]])
+
+    centers, corners = SlotPlanner.slot_rectangles(points, [4.0, 2.0], across, [0.3, 0.6], up)
+    np.testing.assert_allclose(centers, points)
+    np.testing.assert_allclose(corners, [[1.15, 2.0, 5.0], [0.0, 0.3, 1.0]])
+
+    three = SlotPlanner.slot_corners(points, [4.0, 2.0], across, [0.3, 0.6], up)
+    assert three.shape == (2, 3, 3)
+    np.testing.assert_allclose(three[0], [[0.85, 2.0, 1.0], [1.15, 2.0, 1.0], [1.15, 2.0, 5.0]])
+    np.testing.assert_allclose(three[:, 2], corners)
+
+    # A shared direction and width apply to every post
+    np.testing.assert_allclose(SlotPlanner.slot_corners(points, [4.0, 2.0], (1.0, 0.0, 0.0), 0.3)[1, 0],
+                               [-0.15, 0.0, -1.0])
+
+
+def test_group_slots_and_batch_summary():
+    groups = SlotPlanner.group_slots(['b', 'a', 'b', 'c', 'a', 'b'])
+
+    assert groups == [('b', [0, 2, 5]), ('a', [1, 4]), ('c', [3])]
+    assert SlotPlanner.summarize_batch(groups) == SlotPlanner.SlotBatch(3, 6, 6, 12)
+    assert SlotPlanner.summarize_batch([]) == SlotPlanner.SlotBatch(0, 0, 0, 0)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from SlicerCore import SpatialIndex
+
+
+def random_boxes(rng, count, dimensions=3, longest=4.0):
+    lo = rng.uniform(0.0, 20.0, (count, dimensions))
+    return lo, lo + rng.uniform(0.0, longest, (count, dimensions))
+
+
+# Every (query, box) pair whose boxes overlap, by query then by box
+def brute_force_overlaps(query_lo, query_hi, lo, hi, tolerance=0.0):
+    overlap = np.all((query_lo[:, None] <= hi[None] + tolerance) & (query_hi[:, None] >= lo[None] - tolerance), axis=2)
+    return set(zip(*np.nonzero(overlap)))
+
+
+@pytest.mark.parametrize('tolerance', [0.0, 0.5])
+def test_box_index_matches_brute_force(tolerance):
+    rng = np.random.default_rng(23)
+    lo, hi = random_boxes(rng, 300)
+    query_lo, query_hi = random_boxes(rng, 200)
+
+    queries, boxes = SpatialIndex.BoxIndex(lo, hi).overlaps(query_lo, query_hi, tolerance)
+
+    pairs = list(zip(queries.tolist(), boxes.tolist()))
+    assert len(pairs) == len(set(pairs))
+    assert set(pairs) == brute_force_overlaps(query_lo, query_hi, lo, hi, tolerance)
+    assert queries.tolist() == sorted(queries.tolist())
+
+
+def test_box_index_sweeps_along_the_thinnest_axis():
+    # Slice bodies are flat along their normal
+    rng = np.random.default_rng(3)
+    lo, hi = random_boxes(rng, 50)
+    hi[:, 1] = lo[:, 1] + 0.1
+
+    index = SpatialIndex.BoxIndex(lo, hi)
+    queries, boxes = index.overlaps(lo[:5], hi[:5])
+
+    assert index.axis == 1
+    assert set(zip(queries.tolist(), boxes.tolist())) == brute_force_overlaps(lo[:5], hi[:5], lo, hi)
+
+
+def test_box_index_counts_touching_boxes():
+    index = SpatialIndex.BoxIndex([[0.0, 0.0, 0.0]], [[1.0, 1.0, 1.0]])
+
+    queries, boxes = index.overlaps([[1.0, 0.0, 0.0], [1.001, 0.0, 0.0]], [[2.0, 1.0, 1.0], [2.0, 1.0, 1.0]])
+
+    assert queries.tolist() == [0] and boxes.tolist() == [0]
+
+
+def test_empty_box_index():
+    index = SpatialIndex.BoxIndex(np.zeros((0, 3)), np.zeros((0, 3)))
+
+    queries, boxes = index.overlaps([[0.0, 0.0, 0.0]], [[1.0, 1.0, 1.0]])
+
+    assert len(index) == 0 and len(queries) == 0 and len(boxes) == 0
+
+
+def test_interval_index_is_half_open():
+    index = SpatialIndex.IntervalIndex([0.0, 1.0, 2.0], [1.0, 3.0, 2.5])
+
+    items, values = index.stab([1.0, 2.0, 0.0, 2.5])
+
+    assert sorted(zip(items.tolist(), values.tolist())) == [(0, 0), (1, 1), (1, 3), (2, 3)]
+
+
+def test_grid_index_matches_brute_force():
+    rng = np.random.default_rng(7)
+    lo, hi = random_boxes(rng, 100, 2)
+    index = SpatialIndex.GridIndex(2.0)
+    for item, (box_lo, box_hi) in enumerate(zip(lo, hi)):
+        index.insert(item, box_lo, box_hi)
+
+    for query_lo, query_hi in zip(*random_boxes(rng, 20, 2)):
+        expected = [item for _, item in sorted(brute_force_overlaps(query_lo[None], query_hi[None], lo, hi))]
+        assert index.query(query_lo, query_hi) == expected
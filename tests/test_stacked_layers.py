@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import BenchmarkModels
+from SlicerCore import MeshSection, StackedLayers
+
+RADIUS = 0.3
+
+
+# Sections of a sphere of radius 5 at the boundaries between layers of thickness 1
+@pytest.fixture(scope='module')
+def sphere_boundaries():
+    vertices, faces = BenchmarkModels.sphere(5.0, 48)
+    boundaries = np.arange(-4.0, 4.5, 1.0)
+    return MeshSection.section_regions_batch(vertices, faces, (0.0, 0.0, 1.0), boundaries)
+
+
+def test_layer_offsets_fill_the_extent():
+    np.testing.assert_allclose(StackedLayers.layer_offsets(0.0, 0.9, 0.3), [0.15, 0.45, 0.75])
+    np.testing.assert_allclose(StackedLayers.layer_offsets(0.0, 1.0, 0.3), [0.15, 0.45, 0.75, 1.05])
+    assert len(StackedLayers.layer_offsets(1.0, 1.0, 0.3)) == 0
+
+
+def test_inscribed_circle_of_a_square():
+    square = np.array([[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0]])
+    region = MeshSection.SectionRegion(square, [], 100.0, np.array([5.0, 5.0]), True)
+
+    center, radius = StackedLayers.inscribed_circle([[region]])
+
+    np.testing.assert_allclose(center, [5.0, 5.0], atol=0.05)
+    np.testing.assert_allclose(radius, 5.0, atol=0.05)
+
+
+def test_dowels_stay_inside_both_layers_and_apart(sphere_boundaries):
+    dowels = StackedLayers.stack_dowels(sphere_boundaries, RADIUS)
+    spacing = 3 * RADIUS
+
+    assert len(dowels) == StackedLayers.DOWELS_PER_PAIR * (len(sphere_boundaries) - 2)
+    for dowel in dowels:
+        sections = sphere_boundaries[dowel.lower:dowel.lower + 3]
+        assert StackedLayers.material_mask([dowel.center], sections)[0]
+        distance = StackedLayers.boundary_distance([dowel.center], sections)[0]
+        assert distance >= 2 * RADIUS - 1e-9
+        np.testing.assert_allclose(dowel.clearance, distance)
+
+    # Dowels of one pair and of neighbouring pairs share a layer, their holes keep a wall between them
+    for first in range(len(dowels)):
+        for second in range(first + 1, len(dowels)):
+            if abs(dowels[first].lower - dowels[second].lower) <= 1:
+                assert np.linalg.norm(dowels[first].center - dowels[second].center) >= spacing - 1e-9
+
+
+def test_no_dowels_without_room():
+    square = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    region = MeshSection.SectionRegion(square, [], 1.0, np.array([0.5, 0.5]), True)
+
+    assert StackedLayers.stack_dowels([[region]] * 3, RADIUS) == []
+
+
+def test_layer_holes_hold_the_dowels_above_and_below():
+    dowels = [StackedLayers.Dowel(0, np.array([1.0, 0.0]), 1.0), StackedLayers.Dowel(1, np.array([2.0, 0.0]), 1.0)]
+
+    holes = StackedLayers.layer_holes(dowels, 3)
+
+    assert [centers[:, 0].tolist() for centers in holes] == [[1.0], [1.0, 2.0], [2.0]]
+
+
+def test_hole_loops_are_clockwise_circles():
+    loops = StackedLayers.hole_loops([[1.0, 2.0], [4.0, 0.0]], RADIUS)
+
+    assert len(loops) == 2
+    for loop, center in zip(loops, ([1.0, 2.0], [4.0, 0.0])):
+        assert MeshSection.loop_area(loop) < 0
+        np.testing.assert_allclose(np.linalg.norm(loop - center, axis=1), RADIUS)
+
+
+def test_hole_posts_run_along_the_layer_normal():
+    holes = [np.array([[1.0, 2.0]]), np.zeros((0, 2)), np.array([[3.0, 4.0], [5.0, 6.0]])]
+
+    targets, points, ups, acrosses = StackedLayers.hole_posts(holes, (0.0, 0.0, 1.0), [0.5, 1.5, 2.5])
+
+    assert targets.tolist() == [0, 2, 2]
+    np.testing.assert_allclose(points[:, 2], [0.5, 2.5, 2.5])
+    np.testing.assert_allclose(MeshSection.project_points(points, (0.0, 0.0, 1.0)), np.vstack(holes))
+    np.testing.assert_allclose(ups, np.tile([0.0, 0.0, 1.0], (3, 1)))
+    np.testing.assert_allclose(np.einsum('ij,ij->i', ups, acrosses), 0.0)
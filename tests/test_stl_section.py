@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from SlicerCore import MeshSection
+
+FIXTURES = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures')
+
+SPHERE_RADIUS = 5.0
+
+
+def test_read_ascii_stl_welds_the_cube():
+    vertices, faces = MeshSection.read_stl(os.path.join(FIXTURES, 'cube_ascii.stl'))
+
+    assert vertices.shape == (8, 3)
+    assert faces.shape == (12, 3)
+    np.testing.assert_allclose(np.abs(vertices), 1.0)
+
+
+def test_read_binary_stl_welds_the_sphere():
+    vertices, faces = MeshSection.read_stl(os.path.join(FIXTURES, 'sphere_binary.stl'))
+
+    # 24 segments by 11 rings plus both poles, every triangle shares its edges
+    assert len(vertices) == 24 * 11 + 2
+    assert len(faces) == 528
+    edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    assert np.all(np.unique(edges, axis=0, return_counts=True)[1] == 2)
+    np.testing.assert_allclose(np.linalg.norm(vertices, axis=1), SPHERE_RADIUS, rtol=1e-6)
+
+
+@pytest.mark.parametrize('normal', [(0.0, 0.0, 1.0), (1.0, 0.0, 0.0), (0.6, 0.0, 0.8)])
+def test_sphere_sections_are_single_circles(normal):
+    vertices, faces = MeshSection.read_stl(os.path.join(FIXTURES, 'sphere_binary.stl'))
+    offsets = [-3.0, 0.5, 2.0]
+
+    sections = MeshSection.section_mesh_batch(vertices, faces, normal, offsets)
+
+    for offset, loops in zip(offsets, sections):
+        assert len(loops) == 1
+        radius = np.sqrt(SPHERE_RADIUS ** 2 - offset ** 2)
+        np.testing.assert_allclose(np.linalg.norm(loops[0], axis=1), radius, rtol=0.03)
+        assert abs(abs(MeshSection.loop_area(loops[0])) - np.pi * radius ** 2) < 0.05 * np.pi * radius ** 2
+
+
+def test_chain_segments_closes_loops_and_drops_open_chains():
+    points = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [5.0, 5.0], [6.0, 5.0]])
+    segments = np.array([[2, 3], [0, 1], [3, 0], [1, 2], [4, 5]])
+
+    loops = MeshSection.chain_segments(segments, points)
+
+    assert len(loops) == 1
+    assert len(loops[0]) == 4
+    assert abs(MeshSection.loop_area(loops[0])) == pytest.approx(1.0)
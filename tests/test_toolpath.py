@@ -0,0 +1,145 @@
+import numpy as np
+
+from SlicerCore import CutFiles, MeshSection, Toolpath
+
+
+# Counter-clockwise square of side size with its lower left corner at the origin
+def square(size):
+    return np.array([[0.0, 0.0], [size, 0.0], [size, size], [0.0, size]])
+
+
+# Square of side 10 with a tab of width 2 and height 5 on its top edge, counter-clockwise
+def tabbed_square():
+    return np.array([[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [6.0, 10.0], [6.0, 15.0], [4.0, 15.0], [4.0, 10.0],
+                     [0.0, 10.0]])
+
+
+# Edges of a closed path that do not run along the direction of the nearest loop edge
+def reversed_edges(path, loop):
+    loop_edges = np.roll(loop, -1, axis=0) - loop
+    path_edges = np.roll(path, -1, axis=0) - path
+    middles = path + path_edges / 2
+    reversed_count = 0
+    for middle, edge in zip(middles, path_edges):
+        nearest = np.argmin([segment_distance(middle, a, a + e) for a, e in zip(loop, loop_edges)])
+        reversed_count += np.dot(edge, loop_edges[nearest]) < 0
+    return reversed_count
+
+
+def segment_distance(point, a, b):
+    t = np.clip(np.dot(point - a, b - a) / np.dot(b - a, b - a), 0.0, 1.0)
+    return np.linalg.norm(point - (a + t * (b - a)))
+
+
+def test_offset_square_grows_and_shrinks():
+    grown = Toolpath.offset_loop(square(10.0), 1.0)
+    shrunk = Toolpath.offset_loop(square(10.0), -1.0)
+
+    np.testing.assert_allclose(grown, [[-1, -1], [11, -1], [11, 11], [-1, 11]], atol=1e-12)
+    np.testing.assert_allclose(shrunk, [[1, 1], [9, 1], [9, 9], [1, 9]], atol=1e-12)
+
+
+def test_offset_clockwise_loop_shrinks():
+    shrunk = Toolpath.offset_loop(square(10.0)[::-1], 1.0)
+
+    np.testing.assert_allclose(MeshSection.loop_area(shrunk), -64.0)
+
+
+def test_offset_drops_tab_thinner_than_the_offset():
+    loop = tabbed_square()
+
+    path = Toolpath.offset_loop(loop, -1.5)
+
+    np.testing.assert_allclose(MeshSection.loop_area(path), 7.0 * 7.0)
+    assert path[:, 1].max() <= 8.5 + 1e-9
+    assert reversed_edges(path, loop) == 0
+
+
+def test_offset_keeps_tab_wider_than_the_offset():
+    path = Toolpath.offset_loop(tabbed_square(), -0.5)
+
+    assert len(path) == 8
+    np.testing.assert_allclose(MeshSection.loop_area(path), 9.0 * 9.0 + 1.0 * 5.0)
+
+
+def test_offset_shrinks_small_loop_to_nothing():
+    assert len(Toolpath.offset_loop(square(2.0), -1.5)) == 0
+
+
+def test_part_paths_leave_out_loops_narrower_than_the_tool():
+    hole = square(0.5)[::-1] + 4.0
+    part = CutFiles.CutPart('Part', [square(10.0)], [hole], [])
+
+    paths = Toolpath.part_paths(part, 0.5)
+
+    assert [path.kind for path in paths.paths] == ['outer']
+
+
+def test_dog_bone_reaches_into_relieved_corners():
+    radius = 0.25
+    slot = square(2.0)[::-1]
+    path = Toolpath.offset_loop(slot, -radius)
+
+    relieved = Toolpath.dog_bone(path, slot, np.array([True, False, True, False]), radius)
+
+    assert len(relieved) == len(slot) + 2 * 2
+    for index, corner in ((1, slot[0]), (5, slot[2])):
+        np.testing.assert_allclose(np.linalg.norm(relieved[index] - corner), radius)
+        np.testing.assert_allclose(relieved[index + 1], relieved[index - 1])
+
+
+def test_tour_order_visits_every_point_once():
+    rng = np.random.default_rng(5)
+    points = rng.uniform(0.0, 100.0, (200, 2))
+
+    order = Toolpath.tour_order(points)
+
+    assert sorted(order) == list(range(len(points)))
+
+
+def test_tour_order_walks_a_line_from_the_start():
+    points = np.column_stack((np.arange(10.0), np.zeros(10)))[np.random.default_rng(1).permutation(10)]
+
+    order = Toolpath.tour_order(points, start=(-1.0, 0.0))
+
+    np.testing.assert_allclose(points[order, 0], np.arange(10.0))
+    np.testing.assert_allclose(Toolpath.tour_length(points, order, start=(-1.0, 0.0)), 10.0)
+
+
+def test_tour_order_is_no_longer_than_the_greedy_walk():
+    rng = np.random.default_rng(9)
+    points = rng.uniform(0.0, 100.0, (300, 2))
+
+    greedy = []
+    remaining = list(range(len(points)))
+    position = np.zeros(2)
+    while remaining:
+        nearest = min(remaining, key=lambda i: np.linalg.norm(points[i] - position))
+        remaining.remove(nearest)
+        greedy.append(nearest)
+        position = points[nearest]
+
+    assert Toolpath.tour_length(points, Toolpath.tour_order(points)) <= Toolpath.tour_length(points, greedy) + 1e-9
+
+
+def test_gcode_lines_cut_every_path_in_passes():
+    settings = Toolpath.ToolSettings(0.3, 1.2, 0.5)
+    paths = [Toolpath.PartPaths('Part', [Toolpath.ToolPath('outer', square(2.0))])]
+
+    lines = list(Toolpath.gcode_lines(paths, settings))
+
+    assert lines[:3] == ['G21 G90 G17\n', 'M3 S18000\n', 'G0 Z5.000\n']
+    assert lines[-3:] == ['M5\n', 'G0 X0 Y0\n', 'M30\n']
+    plunges = [line for line in lines if line.startswith('G1 Z')]
+    assert plunges == ['G1 Z-5.000 F500.0\n', 'G1 Z-10.000 F500.0\n', 'G1 Z-12.000 F500.0\n']
+    assert lines.count('G1 X0.000 Y0.000\n') == 3
+    assert '(Part)\n' in lines
+
+
+def test_gcode_lines_single_pass_without_step_down():
+    settings = Toolpath.ToolSettings(0.3, 1.2)
+    paths = [Toolpath.PartPaths('Part', [Toolpath.ToolPath('outer', square(2.0))])]
+
+    plunges = [line for line in Toolpath.gcode_lines(paths, settings) if line.startswith('G1 Z')]
+
+    assert plunges == ['G1 Z-12.000 F500.0\n']